@@ -14,6 +14,12 @@ def create_app(config_name=None):
     app = Flask(__name__)
     app.config.from_object(config[config_name])
 
+    # 反向代理之后按信任的代理层数还原客户端IP与协议
+    if app.config.get('PROXY_FIX_X_FOR') or app.config.get('PROXY_FIX_X_PROTO'):
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config.get('PROXY_FIX_X_FOR', 0),
+                                x_proto=app.config.get('PROXY_FIX_X_PROTO', 0))
+
     # 初始化扩展
     register_extensions(app)
 
@@ -26,11 +32,61 @@ def create_app(config_name=None):
     # 注册JWT回调
     register_jwt_callbacks(app)
 
+    # 注册连接池统计
+    from app.utils.pool_metrics import init_pool_metrics
+    init_pool_metrics(app)
+
+    # 注册搜索索引同步
+    from app.utils.search_index import register_search_index
+    register_search_index()
+
+    # 初始化自动补全索引
+    from app.utils.autocomplete import init_autocomplete
+    init_autocomplete(app)
+
+    # 初始化端口占用索引
+    from app.utils.port_index import init_port_index
+    init_port_index(app)
+
+    # 注册表版本号维护（ETag 与响应缓存）
+    from app.utils.table_versions import register_table_versions
+    register_table_versions()
+
+    # 注册变更日志（增量同步）
+    from app.utils.change_journal import register_change_journal
+    register_change_journal()
+
+    # 初始化变更事件推送
+    from app.utils.event_stream import init_event_stream
+    init_event_stream(app)
+
+    # 初始化用户身份缓存
+    from app.utils.identity import init_identity_cache
+    init_identity_cache(app)
+
+    # 初始化登录保护（密码哈希线程池与限流）
+    from app.utils.login_guard import init_login_guard
+    init_login_guard(app)
+
+    # 初始化 Token 吊销代数表
+    from app.utils.auth_tokens import init_token_denylist
+    init_token_denylist(app)
+
+    # 初始化响应缓存
+    from app.utils.response_cache import init_response_cache
+    init_response_cache(app)
+
+    # 初始化审计日志写入器
+    from app.utils.audit_writer import init_audit_writer
+    init_audit_writer(app)
+
     return app
 
 
 def register_extensions(app):
     """注册Flask扩展"""
+    from app.utils.pool_metrics import engine_options
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_ENGINE_OPTIONS'])
     db.init_app(app)
     migrate.init_app(app, db)
     jwt.init_app(app)
@@ -52,6 +108,10 @@ def register_blueprints(app):
     from app.routes.users import users_bp
     from app.routes.import_export import import_export_bp
     from app.routes.preferences import preferences_bp
+    from app.routes.port_mappings import port_mappings_bp
+    from app.routes.metrics import metrics_bp
+    from app.routes.sync import sync_bp
+    from app.routes.events import events_bp
 
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(servers_bp, url_prefix='/api/servers')
@@ -65,15 +125,41 @@ def register_blueprints(app):
     app.register_blueprint(users_bp, url_prefix='/api/users')
     app.register_blueprint(import_export_bp, url_prefix='/api/import-export')
     app.register_blueprint(preferences_bp, url_prefix='/api/user/preferences')
+    app.register_blueprint(port_mappings_bp, url_prefix='/api/port-mappings')
+    app.register_blueprint(metrics_bp, url_prefix='/api/metrics')
+    app.register_blueprint(sync_bp, url_prefix='/api/sync')
+    app.register_blueprint(events_bp, url_prefix='/api/events')
 
 
 def register_error_handlers(app):
     """注册全局错误处理"""
+    from sqlalchemy.exc import DBAPIError, TimeoutError as SQLAlchemyTimeoutError
+    from app.utils import InvalidCursorError
+
     @app.errorhandler(ValidationError)
     def handle_validation_error(e):
         """处理Marshmallow验证错误"""
         return jsonify(code=400, message='参数验证失败', data={'errors': e.messages}), 400
 
+    @app.errorhandler(InvalidCursorError)
+    def handle_invalid_cursor(e):
+        """处理无法解析的分页游标"""
+        return jsonify(code=400, message='无效的分页游标', data=None), 400
+
+    @app.errorhandler(SQLAlchemyTimeoutError)
+    def handle_pool_timeout(e):
+        """连接池已满且等待超时"""
+        db.session.rollback()
+        return jsonify(code=503, message='数据库繁忙，请稍后再试', data=None), 503, {'Retry-After': '1'}
+
+    @app.errorhandler(DBAPIError)
+    def handle_database_error(e):
+        """数据库连接断开：连接池已失效并将重连，客户端可以重试"""
+        db.session.rollback()
+        if e.connection_invalidated:
+            return jsonify(code=503, message='数据库连接中断，请重试', data=None), 503, {'Retry-After': '1'}
+        raise e
+
     @app.errorhandler(400)
     def bad_request(e):
         return jsonify(code=400, message='请求参数错误', data=None), 400
@@ -102,6 +188,14 @@ def register_error_handlers(app):
 def register_jwt_callbacks(app):
     """注册JWT回调函数"""
     import sys
+    from app.utils.auth_tokens import is_token_revoked, verify_token_scope
+
+    jwt.token_in_blocklist_loader(is_token_revoked)
+    jwt.token_verification_loader(verify_token_scope)
+
+    @jwt.revoked_token_loader
+    def revoked_token_callback(jwt_header, jwt_payload):
+        return jsonify(code=401, message='Token已失效，请重新登录', data=None), 401
 
     @jwt.expired_token_loader
     def expired_token_callback(jwt_header, jwt_payload):
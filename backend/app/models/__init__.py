@@ -9,6 +9,11 @@ from app.models.service import Service
 from app.models.gpu import GPU
 from app.models.audit_log import AuditLog
 from app.models.user_preference import UserPreference
+from app.models.search_document import SearchDocument
+from app.models.resource_checkpoint import ResourceCheckpoint
+from app.models.table_version import TableVersion
+from app.models.change_journal import ChangeJournal
+from app.models.token_revocation import TokenRevocation
 
 __all__ = [
     'User',
@@ -20,5 +25,10 @@ __all__ = [
     'Service',
     'GPU',
     'AuditLog',
-    'UserPreference'
+    'UserPreference',
+    'SearchDocument',
+    'ResourceCheckpoint',
+    'TableVersion',
+    'ChangeJournal',
+    'TokenRevocation',
 ]
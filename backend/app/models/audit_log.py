@@ -2,11 +2,21 @@
 from datetime import datetime
 import json
 from app.extensions import db
+from app.models.compressed_text import CompressedText
 
 
 class AuditLog(db.Model):
     """审计日志表"""
     __tablename__ = 'audit_logs'
+    __table_args__ = (
+        # 列表筛选组合：等值条件 + 按时间倒序
+        db.Index('ix_audit_logs_user_created', 'user_id', 'created_at'),
+        db.Index('ix_audit_logs_action_created', 'action', 'created_at'),
+        db.Index('ix_audit_logs_type_created', 'resource_type', 'created_at'),
+        db.Index('ix_audit_logs_type_action_created', 'resource_type', 'action', 'created_at'),
+        # 单个资源的历史与按时间点还原
+        db.Index('ix_audit_logs_resource_created', 'resource_type', 'resource_id', 'created_at'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
@@ -18,9 +28,11 @@ class AuditLog(db.Model):
     resource_id = db.Column(db.Integer, nullable=False)
     resource_name = db.Column(db.String(128), nullable=True)  # 资源名称
 
-    # 变更内容 (JSON格式)
-    changes = db.Column(db.Text, nullable=True)  # {"field": {"old": "...", "new": "..."}}
-    snapshot = db.Column(db.Text, nullable=True)  # 操作前的完整快照 (用于删除操作)
+    # 变更内容 (JSON格式，压缩存储；延迟加载，列表查询不读取)
+    # changes: {"field": {"old": "...", "new": "..."}}
+    # snapshot: 操作前的完整快照 (用于删除操作)
+    changes = db.deferred(db.Column(CompressedText, nullable=True), group='details')
+    snapshot = db.deferred(db.Column(CompressedText, nullable=True), group='details')
 
     # 客户端信息
     ip_address = db.Column(db.String(45), nullable=True)
@@ -71,26 +83,61 @@ class AuditLog(db.Model):
             data['user_agent'] = self.user_agent
         return data
 
+    @staticmethod
+    def build_row(user, action, resource_type, resource_id, resource_name=None,
+                  changes=None, snapshot=None, ip_address=None, user_agent=None):
+        """生成审计日志表行（时间在调用时确定，而不是写入时）"""
+        return {
+            'user_id': user.id if user else None,
+            'username': user.username if user else 'system',
+            'action': action,
+            'resource_type': resource_type,
+            'resource_id': resource_id,
+            'resource_name': resource_name,
+            'changes': json.dumps(changes, ensure_ascii=False) if changes else None,
+            'snapshot': json.dumps(snapshot, ensure_ascii=False) if snapshot else None,
+            'ip_address': ip_address,
+            'user_agent': user_agent,
+            'created_at': datetime.utcnow(),
+        }
+
     @staticmethod
     def log_action(user, action, resource_type, resource_id, resource_name=None,
-                   changes=None, snapshot=None, ip_address=None, user_agent=None):
-        """记录操作日志"""
-        log = AuditLog(
-            user_id=user.id if user else None,
-            username=user.username if user else 'system',
-            action=action,
-            resource_type=resource_type,
-            resource_id=resource_id,
-            resource_name=resource_name,
-            ip_address=ip_address,
-            user_agent=user_agent,
-        )
-        if changes:
-            log.set_changes(changes)
-        if snapshot:
-            log.set_snapshot(snapshot)
-        db.session.add(log)
-        return log
+                   changes=None, snapshot=None, ip_address=None, user_agent=None, durable=False):
+        """
+        记录操作日志
+
+        默认交给审计写入器异步批量写入，调用方无需再次提交；
+        durable=True 时加入当前会话，随业务变更在同一事务中提交（删除操作使用）。
+        """
+        from app.utils.audit_writer import get_audit_writer
+
+        row = AuditLog.build_row(user, action, resource_type, resource_id, resource_name,
+                                 changes, snapshot, ip_address, user_agent)
+        writer = get_audit_writer()
+        if durable or writer is None:
+            log = AuditLog(**row)
+            db.session.add(log)
+            return log
+        writer.submit(row)
+        return None
+
+    @staticmethod
+    def log_actions(user, action, resource_type, entries, ip_address=None, user_agent=None):
+        """
+        批量记录操作日志（单条批量 INSERT，随当前事务提交，用于集合操作）
+
+        entries: [{'resource_id', 'resource_name', 'changes', 'snapshot'}]
+        """
+        rows = [
+            AuditLog.build_row(user, action, resource_type, entry['resource_id'],
+                               entry.get('resource_name'), entry.get('changes'),
+                               entry.get('snapshot'), ip_address, user_agent)
+            for entry in entries
+        ]
+        if rows:
+            db.session.execute(AuditLog.__table__.insert(), rows)
+        return len(rows)
 
     def __repr__(self):
         return f'<AuditLog {self.action} {self.resource_type}:{self.resource_id}>'
@@ -0,0 +1,21 @@
+"""变更日志模型"""
+from datetime import datetime
+from app.extensions import db
+
+
+class ChangeJournal(db.Model):
+    """资源变更日志表
+
+    每次写入资源（服务器、容器、GPU、服务、端口映射）时在同一事务内追加一行，
+    自增ID即变更序号，按提交顺序递增，供增量同步接口按序号读取。
+    """
+    __tablename__ = 'change_journal'
+
+    id = db.Column(db.Integer, primary_key=True)
+    resource_type = db.Column(db.String(32), nullable=False)
+    resource_id = db.Column(db.Integer, nullable=False)
+    op = db.Column(db.String(16), nullable=False)  # upsert, delete
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f'<ChangeJournal {self.id} {self.op} {self.resource_type}:{self.resource_id}>'
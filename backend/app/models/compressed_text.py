@@ -0,0 +1,66 @@
+"""压缩文本列
+
+审计日志的 changes / snapshot 是 JSON 文本，写入时压缩、读取时透明解压：
+- 存储为 '<编码>:<base64>'，安装 zstandard 时使用 zstd，否则使用 zlib
+- 短文本或压缩后不更短的值按原文存储
+- 原文（未压缩的旧数据）以 JSON 字符开头，读取时原样返回
+沿用 Text 列类型，已有的表无需修改结构；旧数据用 `flask compress-audit-logs` 分批压缩。
+"""
+import base64
+import zlib
+from app.extensions import db
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MIN_COMPRESS_SIZE = 128  # 小于该字节数的文本不压缩
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 3
+
+_CODECS = ('zstd:', 'zlib:')
+
+
+def is_compressed(value):
+    return isinstance(value, str) and value.startswith(_CODECS)
+
+
+def compress_text(value):
+    """压缩文本，返回存储值（不值得压缩时返回原文）"""
+    if value is None or is_compressed(value):
+        return value
+    raw = value.encode('utf-8')
+    if len(raw) < MIN_COMPRESS_SIZE:
+        return value
+    if zstandard is not None:
+        # ZstdCompressor 不是线程安全的，按次创建
+        prefix, data = 'zstd:', zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw)
+    else:
+        prefix, data = 'zlib:', zlib.compress(raw, ZLIB_LEVEL)
+    stored = prefix + base64.b64encode(data).decode('ascii')
+    return stored if len(stored) < len(raw) else value
+
+
+def decompress_text(value):
+    """存储值还原为文本"""
+    if not is_compressed(value):
+        return value
+    data = base64.b64decode(value[5:])
+    if value.startswith('zlib:'):
+        return zlib.decompress(data).decode('utf-8')
+    if zstandard is None:
+        raise RuntimeError('读取 zstd 压缩的数据需要安装 zstandard')
+    return zstandard.ZstdDecompressor().decompress(data).decode('utf-8')
+
+
+class CompressedText(db.TypeDecorator):
+    """写入时压缩、读取时解压的文本列"""
+    impl = db.Text
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return compress_text(value)
+
+    def process_result_value(self, value, dialect):
+        return decompress_text(value)
@@ -36,7 +36,7 @@ class Container(db.Model):
     sort_order = db.Column(db.Integer, default=0)  # 排序顺序
 
     # 时间戳
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # 关联
@@ -49,8 +49,16 @@ class Container(db.Model):
         """服务数量"""
         return self.services.count()
 
-    def to_dict(self, include_children=False):
-        """转换为字典"""
+    def to_dict(self, include_children=False, counts=None, port_mappings=None):
+        """转换为字典
+
+        counts: 预先批量统计好的 {'service_count': n}，不传时按需 COUNT
+        port_mappings: 预先批量加载好的端口映射列表，不传时按需查询
+        """
+        if counts is None:
+            counts = {'service_count': self.service_count}
+        if port_mappings is None:
+            port_mappings = self.port_mappings
         data = {
             'id': self.id,
             'name': self.name,
@@ -70,8 +78,8 @@ class Container(db.Model):
             'status': self.status,
             'description': self.description,
             'sort_order': self.sort_order,
-            'service_count': self.service_count,
-            'port_mappings': [pm.to_dict() for pm in self.port_mappings],
+            'service_count': counts.get('service_count', 0),
+            'port_mappings': [pm.to_dict() for pm in port_mappings],
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
         }
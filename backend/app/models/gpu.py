@@ -6,6 +6,9 @@ from app.extensions import db
 class GPU(db.Model):
     """GPU资源表"""
     __tablename__ = 'gpus'
+    __table_args__ = (
+        db.Index('ix_gpus_server_id_index', 'server_id', 'index'),  # 列表排序及游标分页
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     server_id = db.Column(db.Integer, db.ForeignKey('servers.id'), nullable=False)
@@ -0,0 +1,34 @@
+"""IP地址排序键
+
+IP字符串旁额外保存 16 字节大端序的地址整数（IPv4 以 IPv4-mapped IPv6 形式存储），
+定长二进制的字节序与数值序一致，普通B树索引即可支持前缀、CIDR 和区间的范围查询。
+"""
+import ipaddress
+from app.extensions import db
+
+IP_KEY_LENGTH = 16
+
+
+def ip_to_key(value):
+    """IP字符串转排序键，无法解析时返回 None"""
+    if not value:
+        return None
+    try:
+        address = ipaddress.ip_address(str(value).strip())
+    except ValueError:
+        return None
+    if address.version == 4:
+        address = ipaddress.IPv6Address(f'::ffff:{address}')
+    return address.packed
+
+
+def int_to_key(value, version):
+    """地址整数转排序键"""
+    if version == 4:
+        value |= 0xFFFF << 32
+    return value.to_bytes(IP_KEY_LENGTH, 'big')
+
+
+def ip_key_column():
+    """带索引的排序键列"""
+    return db.Column(db.VARBINARY(IP_KEY_LENGTH), nullable=True, index=True)
@@ -1,6 +1,7 @@
 """端口映射模型 - 三层端口结构"""
 from datetime import datetime
 from app.extensions import db
+from app.models.ip_key import ip_to_key, ip_key_column
 
 
 class PortMapping(db.Model):
@@ -16,6 +17,8 @@ class PortMapping(db.Model):
     internal_port = db.Column(db.Integer, nullable=False)   # 内网映射端口 (如: 20020)
     external_ip = db.Column(db.String(45), nullable=True)   # 外网IP (防火墙IP)
     external_port = db.Column(db.Integer, nullable=True)    # 外网映射端口 (如: 8000, 可为空)
+    internal_ip_key = ip_key_column()  # 内网IP排序键，用于范围检索
+    external_ip_key = ip_key_column()  # 外网IP排序键
 
     # 协议和描述
     protocol = db.Column(db.String(10), default='tcp')  # tcp, udp
@@ -24,6 +27,12 @@ class PortMapping(db.Model):
     # 时间戳
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    @db.validates('internal_ip', 'external_ip')
+    def _sync_ip_key(self, key, value):
+        """IP变更时同步排序键"""
+        setattr(self, f'{key}_key', ip_to_key(value))
+        return value
+
     @property
     def internal_address(self):
         """内网访问地址"""
@@ -40,9 +49,14 @@ class PortMapping(db.Model):
     @property
     def mapping_chain(self):
         """端口映射链路描述"""
-        chain = f"{self.container_port} → {self.internal_address}"
-        if self.external_address:
-            chain += f" → {self.external_address}"
+        return self.format_chain(self.container_port, self.internal_address, self.external_address)
+
+    @staticmethod
+    def format_chain(container_port, internal_address, external_address=None):
+        """按端口与地址拼接映射链路（供按列查询的导出复用）"""
+        chain = f"{container_port} → {internal_address}"
+        if external_address:
+            chain += f" → {external_address}"
         return chain
 
     def to_dict(self):
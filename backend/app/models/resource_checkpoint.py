@@ -0,0 +1,30 @@
+"""资源状态检查点模型"""
+from datetime import datetime
+import json
+from app.extensions import db
+from app.models.compressed_text import CompressedText
+
+
+class ResourceCheckpoint(db.Model):
+    """资源状态检查点表
+
+    定期保存变更频繁的资源的完整状态（to_dict），按时间点还原资源时
+    从时间点之后最早的检查点开始回放审计日志，回放条数不超过检查点间隔。
+    """
+    __tablename__ = 'resource_checkpoints'
+    __table_args__ = (
+        db.Index('ix_resource_checkpoints_resource', 'resource_type', 'resource_id', 'created_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    resource_type = db.Column(db.String(32), nullable=False)
+    resource_id = db.Column(db.Integer, nullable=False)
+    state = db.Column(CompressedText, nullable=False)  # 资源状态 (JSON格式，压缩存储)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    def get_state(self):
+        """获取资源状态"""
+        return json.loads(self.state)
+
+    def __repr__(self):
+        return f'<ResourceCheckpoint {self.resource_type}:{self.resource_id} {self.created_at}>'
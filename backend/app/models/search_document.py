@@ -0,0 +1,61 @@
+"""搜索文档模型 - 全文检索的反范式化索引表"""
+from datetime import datetime
+from sqlalchemy import DDL, event
+from app.extensions import db
+
+
+class SearchDocument(db.Model):
+    """搜索文档表
+
+    每个可搜索资源（服务器、容器、服务）对应一行，由会话事件在写入时维护。
+    SQLite 下附带 FTS5 trigram 虚拟表，MySQL 下附带 ngram FULLTEXT 索引。
+    """
+    __tablename__ = 'search_documents'
+    __table_args__ = (
+        db.UniqueConstraint('resource_type', 'resource_id', name='uq_search_documents_resource'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    resource_type = db.Column(db.String(32), nullable=False)  # server, container, service
+    resource_id = db.Column(db.Integer, nullable=False)
+    title = db.Column(db.String(128), nullable=False, default='')  # 资源名称
+    content = db.Column(db.Text, nullable=False, default='')  # 其余可搜索字段拼接
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<SearchDocument {self.resource_type}:{self.resource_id}>'
+
+
+# SQLite: FTS5 外部内容表，通过触发器与 search_documents 保持同步
+SQLITE_FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_documents_fts USING fts5("
+    "title, content, content='search_documents', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS search_documents_ai AFTER INSERT ON search_documents BEGIN "
+    "INSERT INTO search_documents_fts(rowid, title, content) VALUES (new.id, new.title, new.content); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS search_documents_ad AFTER DELETE ON search_documents BEGIN "
+    "INSERT INTO search_documents_fts(search_documents_fts, rowid, title, content) "
+    "VALUES ('delete', old.id, old.title, old.content); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS search_documents_au AFTER UPDATE ON search_documents BEGIN "
+    "INSERT INTO search_documents_fts(search_documents_fts, rowid, title, content) "
+    "VALUES ('delete', old.id, old.title, old.content); "
+    "INSERT INTO search_documents_fts(rowid, title, content) VALUES (new.id, new.title, new.content); "
+    "END",
+]
+
+# MySQL: ngram 分词的全文索引（标题单独一个索引用于按名称检索）
+MYSQL_FULLTEXT_DDL = [
+    "ALTER TABLE search_documents "
+    "ADD FULLTEXT INDEX ft_search_documents (title, content) WITH PARSER ngram, "
+    "ADD FULLTEXT INDEX ft_search_documents_title (title) WITH PARSER ngram",
+]
+
+event.listen(SearchDocument.__table__, 'before_drop',
+             DDL('DROP TABLE IF EXISTS search_documents_fts').execute_if(dialect='sqlite'))
+for _statement in SQLITE_FTS_DDL:
+    event.listen(SearchDocument.__table__, 'after_create',
+                 DDL(_statement).execute_if(dialect='sqlite'))
+for _statement in MYSQL_FULLTEXT_DDL:
+    event.listen(SearchDocument.__table__, 'after_create',
+                 DDL(_statement).execute_if(dialect='mysql'))
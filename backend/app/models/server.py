@@ -1,6 +1,7 @@
 """服务器模型"""
 from datetime import datetime
 from app.extensions import db
+from app.models.ip_key import ip_to_key, ip_key_column
 
 
 class Server(db.Model):
@@ -15,6 +16,8 @@ class Server(db.Model):
     # 网络配置
     internal_ip = db.Column(db.String(45), nullable=False, index=True)  # 内网IP
     external_ip = db.Column(db.String(45), nullable=True)  # 外网IP (可选)
+    internal_ip_key = ip_key_column()  # 内网IP排序键，用于范围检索
+    external_ip_key = ip_key_column()  # 外网IP排序键
 
     # 硬件配置
     cpu_cores = db.Column(db.Integer, nullable=True)
@@ -37,13 +40,19 @@ class Server(db.Model):
     ssh_user = db.Column(db.String(32), default='root')
 
     # 时间戳
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # 关联
     containers = db.relationship('Container', backref='server', lazy='dynamic', cascade='all, delete-orphan')
     gpus = db.relationship('GPU', backref='server', lazy='dynamic', cascade='all, delete-orphan')
 
+    @db.validates('internal_ip', 'external_ip')
+    def _sync_ip_key(self, key, value):
+        """IP变更时同步排序键"""
+        setattr(self, f'{key}_key', ip_to_key(value))
+        return value
+
     @property
     def container_count(self):
         """容器数量"""
@@ -57,10 +66,21 @@ class Server(db.Model):
     @property
     def ssh_command(self):
         """生成SSH命令"""
-        return f"ssh -p {self.ssh_port} {self.ssh_user}@{self.internal_ip}"
+        return self.format_ssh_command(self.ssh_port, self.ssh_user, self.internal_ip)
+
+    @staticmethod
+    def format_ssh_command(ssh_port, ssh_user, internal_ip):
+        """按端口、用户与IP拼接SSH命令（供按时间点还原的状态复用）"""
+        return f"ssh -p {ssh_port} {ssh_user}@{internal_ip}"
+
+    def to_dict(self, include_children=False, counts=None):
+        """转换为字典
 
-    def to_dict(self, include_children=False):
-        """转换为字典"""
+        counts: 预先批量统计好的 {'container_count': n, 'gpu_count': n}，
+                不传时按需逐条 COUNT
+        """
+        if counts is None:
+            counts = {'container_count': self.container_count, 'gpu_count': self.gpu_count}
         data = {
             'id': self.id,
             'name': self.name,
@@ -84,8 +104,8 @@ class Server(db.Model):
             'ssh_port': self.ssh_port,
             'ssh_user': self.ssh_user,
             'ssh_command': self.ssh_command,
-            'container_count': self.container_count,
-            'gpu_count': self.gpu_count,
+            'container_count': counts.get('container_count', 0),
+            'gpu_count': counts.get('gpu_count', 0),
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
         }
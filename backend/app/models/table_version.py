@@ -0,0 +1,19 @@
+"""表版本号模型"""
+from datetime import datetime
+from app.extensions import db
+
+
+class TableVersion(db.Model):
+    """表版本号表
+
+    每张资源表一行，写入该表的事务在提交前递增版本号（与数据同一事务，多工作进程一致），
+    用于 ETag / 条件请求与响应缓存失效。
+    """
+    __tablename__ = 'table_versions'
+
+    table_name = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<TableVersion {self.table_name}={self.version}>'
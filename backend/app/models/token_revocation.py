@@ -0,0 +1,19 @@
+"""Token 代数模型"""
+from datetime import datetime
+from app.extensions import db
+
+
+class TokenRevocation(db.Model):
+    """用户 Token 代数表
+
+    签发的 Token 在 gen 声明中带上用户当前代数，吊销时代数加一，gen 小于当前代数的 Token 失效。
+    只有吊销过 Token 的用户才有记录；不设外键，删除用户后记录保留。
+    """
+    __tablename__ = 'token_revocations'
+
+    user_id = db.Column(db.Integer, primary_key=True)
+    generation = db.Column(db.Integer, nullable=False, default=0)
+    revoked_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<TokenRevocation user={self.user_id} gen={self.generation}>'
@@ -15,7 +15,7 @@ class User(db.Model):
     email = db.Column(db.String(120), unique=True, nullable=True)
     role = db.Column(db.String(20), nullable=False, default='user')  # admin, user
     is_active = db.Column(db.Boolean, default=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # 关联
@@ -23,9 +23,9 @@ class User(db.Model):
     services = db.relationship('Service', backref='owner', lazy='dynamic', foreign_keys='Service.owner_id')
     gpus = db.relationship('GPU', backref='assigned_user', lazy='dynamic', foreign_keys='GPU.assigned_to')
 
-    def set_password(self, password):
-        """设置密码哈希"""
-        self.password_hash = generate_password_hash(password)
+    def set_password(self, password, method='scrypt'):
+        """设置密码哈希（method 为 werkzeug 哈希方法，默认与 PASSWORD_HASH_METHOD 相同）"""
+        self.password_hash = generate_password_hash(password, method)
 
     def check_password(self, password):
         """验证密码"""
@@ -1,17 +1,54 @@
 """审计日志路由"""
-from flask import Blueprint, request, send_file
+from flask import Blueprint, request
 from flask_jwt_extended import jwt_required
 from datetime import datetime
-import io
-from app.models import AuditLog
 from app.extensions import db
 from app.utils import (
-    api_response, admin_required, paginate_query
+    api_response, error_response, admin_required, paginate_query, cursor_paginate_query
 )
+from app.utils.audit_partitions import audit_log_entity, find_audit_log
+from app.utils.audit_writer import READ_FLUSH_TIMEOUT, get_audit_writer
+from app.utils.export import ExportSheet, YIELD_PER, export_response, format_datetime, validate_export
 
 audit_logs_bp = Blueprint('audit_logs', __name__)
 
 
+def _parse_datetime(value):
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def _filtered_entity():
+    """
+    按请求参数（user_id, action, resource_type, start_date, end_date）生成查询实体与筛选条件
+
+    实体只覆盖时间范围涉及的分区，见 app.utils.audit_partitions
+    """
+    user_id = request.args.get('user_id', type=int)
+    action = request.args.get('action')
+    resource_type = request.args.get('resource_type')
+    start_dt = _parse_datetime(request.args.get('start_date'))
+    end_dt = _parse_datetime(request.args.get('end_date'))
+
+    entity = audit_log_entity(start_dt, end_dt)
+    conditions = []
+    if user_id:
+        conditions.append(entity.user_id == user_id)
+    if action:
+        conditions.append(entity.action == action)
+    if resource_type:
+        conditions.append(entity.resource_type == resource_type)
+    if start_dt:
+        conditions.append(entity.created_at >= start_dt)
+    if end_dt:
+        conditions.append(entity.created_at <= end_dt)
+    return entity, conditions
+
+
 @audit_logs_bp.route('', methods=['GET'])
 @jwt_required()
 @admin_required
@@ -19,43 +56,31 @@ def list_audit_logs():
     """获取审计日志列表"""
     page = request.args.get('page', 1, type=int)
     page_size = request.args.get('page_size', 20, type=int)
-    user_id = request.args.get('user_id', type=int)
-    action = request.args.get('action')
-    resource_type = request.args.get('resource_type')
-    start_date = request.args.get('start_date')
-    end_date = request.args.get('end_date')
     keyword = request.args.get('keyword', '').strip()
+    cursor = request.args.get('cursor')  # 传入时使用游标分页
+    with_total = request.args.get('with_total', 'false').lower() == 'true'
 
-    query = AuditLog.query
+    # 先写入本进程排队中的日志，使刚发生的操作可见
+    get_audit_writer().flush(timeout=READ_FLUSH_TIMEOUT)
+    entity, conditions = _filtered_entity()
+    query = db.session.query(entity).filter(*conditions)
 
-    if user_id:
-        query = query.filter(AuditLog.user_id == user_id)
-    if action:
-        query = query.filter(AuditLog.action == action)
-    if resource_type:
-        query = query.filter(AuditLog.resource_type == resource_type)
-    if start_date:
-        try:
-            start_dt = datetime.fromisoformat(start_date)
-            query = query.filter(AuditLog.created_at >= start_dt)
-        except ValueError:
-            pass
-    if end_date:
-        try:
-            end_dt = datetime.fromisoformat(end_date)
-            query = query.filter(AuditLog.created_at <= end_dt)
-        except ValueError:
-            pass
     if keyword:
         query = query.filter(
             db.or_(
-                AuditLog.resource_name.ilike(f'%{keyword}%'),
-                AuditLog.username.ilike(f'%{keyword}%'),
+                entity.resource_name.ilike(f'%{keyword}%'),
+                entity.username.ilike(f'%{keyword}%'),
             )
         )
 
-    query = query.order_by(AuditLog.created_at.desc())
-    result = paginate_query(query, page, page_size)
+    if cursor is not None:
+        result = cursor_paginate_query(
+            query, [entity.created_at, entity.id], cursor, page_size,
+            descending=True, with_total=with_total
+        )
+    else:
+        query = query.order_by(entity.created_at.desc())
+        result = paginate_query(query, page, page_size)
 
     return api_response(
         [log.to_dict() for log in result['items']],
@@ -68,7 +93,9 @@ def list_audit_logs():
 @admin_required
 def get_audit_log(id):
     """获取审计日志详情"""
-    log = AuditLog.query.get_or_404(id)
+    log = find_audit_log(id)
+    if log is None:
+        return error_response('审计日志不存在', 404, 404)
     return api_response(log.to_dict(include_details=True))
 
 
@@ -76,94 +103,51 @@ def get_audit_log(id):
 @jwt_required()
 @admin_required
 def export_audit_logs():
-    """导出审计日志"""
-    try:
-        import openpyxl
-        from openpyxl.styles import Font, PatternFill, Alignment
-    except ImportError:
-        return api_response(None, '导出功能需要安装openpyxl', code=500)
+    """导出审计日志（format=xlsx|csv|ndjson，csv/ndjson 为流式响应，不限行数）"""
+    fmt = request.args.get('format', 'xlsx').lower()
 
-    # 获取筛选条件
-    user_id = request.args.get('user_id', type=int)
-    action = request.args.get('action')
-    resource_type = request.args.get('resource_type')
-    start_date = request.args.get('start_date')
-    end_date = request.args.get('end_date')
+    get_audit_writer().flush(timeout=READ_FLUSH_TIMEOUT)
+    entity, conditions = _filtered_entity()
 
-    query = AuditLog.query
+    # 只取导出列（不含快照），按批从游标读取
+    query = db.session.query(
+        entity.created_at, entity.username, entity.ip_address, entity.action,
+        entity.resource_type, entity.resource_name, entity.changes,
+    ).filter(*conditions)
+
+    query = query.order_by(entity.created_at.desc()).yield_per(YIELD_PER)
 
-    if user_id:
-        query = query.filter(AuditLog.user_id == user_id)
-    if action:
-        query = query.filter(AuditLog.action == action)
-    if resource_type:
-        query = query.filter(AuditLog.resource_type == resource_type)
-    if start_date:
-        try:
-            start_dt = datetime.fromisoformat(start_date)
-            query = query.filter(AuditLog.created_at >= start_dt)
-        except ValueError:
-            pass
-    if end_date:
-        try:
-            end_dt = datetime.fromisoformat(end_date)
-            query = query.filter(AuditLog.created_at <= end_dt)
-        except ValueError:
-            pass
-
-    logs = query.order_by(AuditLog.created_at.desc()).limit(10000).all()
-
-    # 创建Excel
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = '审计日志'
-
-    # 表头
-    headers = ['时间', '用户', 'IP地址', '操作类型', '资源类型', '资源名称', '变更内容']
-    header_fill = PatternFill(start_color='4472C4', end_color='4472C4', fill_type='solid')
-    header_font = Font(color='FFFFFF', bold=True)
-
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col, value=header)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = Alignment(horizontal='center')
-
-    # 数据
     action_map = {'create': '创建', 'update': '更新', 'delete': '删除'}
     type_map = {
         'server': '服务器', 'container': '容器', 'service': '服务',
         'gpu': 'GPU', 'datacenter': '机房', 'user': '用户'
     }
 
-    for row, log in enumerate(logs, 2):
-        ws.cell(row=row, column=1, value=log.created_at.strftime('%Y-%m-%d %H:%M:%S') if log.created_at else '')
-        ws.cell(row=row, column=2, value=log.username)
-        ws.cell(row=row, column=3, value=log.ip_address or '')
-        ws.cell(row=row, column=4, value=action_map.get(log.action, log.action))
-        ws.cell(row=row, column=5, value=type_map.get(log.resource_type, log.resource_type))
-        ws.cell(row=row, column=6, value=log.resource_name or '')
-        ws.cell(row=row, column=7, value=str(log.get_changes()) if log.changes else '')
-
-    # 调整列宽
-    ws.column_dimensions['A'].width = 20
-    ws.column_dimensions['B'].width = 15
-    ws.column_dimensions['C'].width = 15
-    ws.column_dimensions['D'].width = 10
-    ws.column_dimensions['E'].width = 12
-    ws.column_dimensions['F'].width = 20
-    ws.column_dimensions['G'].width = 50
-
-    # 保存到内存
-    output = io.BytesIO()
-    wb.save(output)
-    output.seek(0)
-
-    filename = f'audit_logs_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-
-    return send_file(
-        output,
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        as_attachment=True,
-        download_name=filename
-    )
+    def rows():
+        for created_at, username, ip_address, log_action, log_type, resource_name, changes in query:
+            yield (
+                format_datetime(created_at, '%Y-%m-%d %H:%M:%S'),
+                username,
+                ip_address or '',
+                action_map.get(log_action, log_action),
+                type_map.get(log_type, log_type),
+                resource_name or '',
+                changes or '',  # 变更内容按存储的JSON文本输出，无需逐行解析
+            )
+
+    sheet = ExportSheet('审计日志', [
+        ('created_at', '时间'), ('username', '用户'), ('ip_address', 'IP地址'),
+        ('action', '操作类型'), ('resource_type', '资源类型'),
+        ('resource_name', '资源名称'), ('changes', '变更内容'),
+    ], rows, widths=[20, 15, 15, 10, 12, 20, 50])
+
+    message = validate_export(fmt, [sheet])
+    if message:
+        return error_response(message, 400, 400)
+    if fmt == 'xlsx':
+        try:
+            import openpyxl
+        except ImportError:
+            return api_response(None, '导出功能需要安装openpyxl', code=500)
+
+    return export_response([sheet], fmt, 'audit_logs')
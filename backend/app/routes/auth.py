@@ -1,12 +1,11 @@
 """认证路由"""
 from flask import Blueprint, request
-from flask_jwt_extended import (
-    create_access_token, create_refresh_token, jwt_required,
-    get_jwt_identity, get_jwt
-)
+from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.models import User
 from app.extensions import db
 from app.utils import api_response, error_response, get_current_user, validate_or_error
+from app.utils.auth_tokens import issue_tokens, revoke_tokens
+from app.utils.login_guard import LoginBusyError, get_login_guard
 from app.schemas import login_schema
 
 auth_bp = Blueprint('auth', __name__)
@@ -23,21 +22,33 @@ def login():
     username = data['username'].strip()
     password = data['password']
 
+    guard = get_login_guard()
+    ip = request.remote_addr  # 配置 PROXY_FIX_X_FOR 时为代理转发的真实来源IP
+    retry_after = guard.throttle(ip, username)
+    if retry_after:
+        response, status = error_response('登录尝试过于频繁，请稍后再试', 429, 429)
+        response.headers['Retry-After'] = str(retry_after)
+        return response, status
+
     user = User.query.filter_by(username=username).first()
-    if user is None or not user.check_password(password):
+    try:
+        authenticated = user is not None and guard.authenticate(user, password)
+    except LoginBusyError:
+        return error_response('登录请求繁忙，请稍后再试', 503, 503)
+    if not authenticated:
+        guard.failed(ip, username)
         return error_response('用户名或密码错误', 401, 401)
 
     if not user.is_active:
         return error_response('账号已被禁用', 403, 403)
+    guard.succeeded(ip, username)
+    if db.session.is_modified(user):
+        db.session.commit()  # 按新参数重新哈希的密码
 
-    access_token = create_access_token(identity=str(user.id))
-    refresh_token = create_refresh_token(identity=str(user.id))
-
-    return api_response({
-        'access_token': access_token,
-        'refresh_token': refresh_token,
-        'user': user.to_dict(include_email=True)
-    }, '登录成功')
+    return api_response(dict(
+        issue_tokens(user),
+        user=user.to_dict(include_email=True)
+    ), '登录成功')
 
 
 @auth_bp.route('/logout', methods=['POST'])
@@ -61,20 +72,18 @@ def get_me():
 @auth_bp.route('/refresh', methods=['POST'])
 @jwt_required(refresh=True)
 def refresh():
-    """刷新访问Token"""
-    user_id = get_jwt_identity()
-    user = User.query.get(int(user_id))
+    """刷新访问Token（按用户最新状态重新签发声明）"""
+    user = db.session.get(User, int(get_jwt_identity()))
     if not user or not user.is_active:
         return error_response('用户不存在或已被禁用', 401, 401)
 
-    access_token = create_access_token(identity=str(user_id))
-    return api_response({'access_token': access_token}, 'Token刷新成功')
+    return api_response(issue_tokens(user, refresh=False), 'Token刷新成功')
 
 
 @auth_bp.route('/change-password', methods=['POST'])
 @jwt_required()
 def change_password():
-    """修改密码"""
+    """修改密码（此前签发的 Token 全部失效，返回新的 Token）"""
     user = get_current_user()
     data = request.get_json() or {}
     old_password = data.get('old_password', '')
@@ -86,10 +95,14 @@ def change_password():
     if len(new_password) < 6:
         return error_response('新密码长度不能少于6位', 422, 422)
 
-    if not user.check_password(old_password):
-        return error_response('旧密码错误', 400, 400)
-
-    user.set_password(new_password)
+    guard = get_login_guard()
+    try:
+        if not guard.hasher.verify(user.password_hash, old_password):
+            return error_response('旧密码错误', 400, 400)
+        user.password_hash = guard.hasher.hash(new_password)
+    except LoginBusyError:
+        return error_response('请求繁忙，请稍后再试', 503, 503)
+    revoke_tokens(user.id)
     db.session.commit()
 
-    return api_response(None, '密码修改成功')
+    return api_response(issue_tokens(user), '密码修改成功')
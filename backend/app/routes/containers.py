@@ -1,19 +1,68 @@
 """容器路由"""
 from flask import Blueprint, request
 from flask_jwt_extended import jwt_required
-from app.models import Container, PortMapping, AuditLog
+from app.models import Server, Container, PortMapping, AuditLog
 from app.extensions import db
 from app.utils import (
-    api_response, error_response, get_current_user,
-    paginate_query, get_request_json, validate_or_error
+    api_response, error_response, get_current_user, admin_required,
+    paginate_query, cursor_paginate_query, get_request_json, validate_or_error
 )
-from app.schemas import container_create_schema, container_update_schema
+from app.utils.batch_ops import update_sort_orders
+from app.utils.counts import containers_to_dicts
+from app.utils.port_index import (
+    get_port_index, mapping_slots, lock_port_slots, find_conflicts_in_db
+)
+from app.utils.resource_history import resource_history
+from app.utils.table_versions import conditional
+from app.schemas import container_create_schema, port_mappings_schema
 
 containers_bp = Blueprint('containers', __name__)
 
+# 容器列表/详情读取的表（含服务器与用户名称、端口映射、服务）
+CONTAINER_TABLES = ('containers', 'servers', 'users', 'port_mappings', 'services')
+
+
+def check_port_conflicts(server, port_mappings, exclude_container_id=None, locked=False):
+    """
+    检查端口映射冲突
+
+    Args:
+        locked: False 时按进程内端口占用索引提前检查；True 时锁定端口占用并按数据库复核
+            （在插入映射的同一事务中调用，冲突时回滚）
+
+    Returns:
+        冲突时返回错误响应，否则返回 None
+    """
+    slots = []
+    for pm_data in port_mappings:
+        slots += mapping_slots(
+            server.internal_ip if server else None,
+            pm_data.get('internal_ip'), pm_data['internal_port'],
+            pm_data.get('external_ip'), pm_data.get('external_port'),
+            pm_data.get('protocol', 'tcp'),
+        )
+    if not slots:
+        return None
+    if locked:
+        lock_port_slots(db.session.connection())
+        conflicts = find_conflicts_in_db(slots, exclude_container_id)
+    else:
+        conflicts = get_port_index().find_conflicts(slots, exclude_container_id)
+    if not conflicts:
+        return None
+    if locked:
+        db.session.rollback()
+    details = '; '.join(
+        f"{c['ip']}:{c['port']}/{c['protocol']}"
+        + (f" 已被容器 {', '.join(map(str, c['container_ids']))} 占用" if c['container_ids'] else ' 重复')
+        for c in conflicts
+    )
+    return error_response(f'端口冲突: {details}', 409, 409)
+
 
 @containers_bp.route('', methods=['GET'])
 @jwt_required()
+@conditional(CONTAINER_TABLES)
 def list_containers():
     """获取容器列表"""
     page = request.args.get('page', 1, type=int)
@@ -22,6 +71,8 @@ def list_containers():
     owner_id = request.args.get('owner_id', type=int)
     status = request.args.get('status')
     keyword = request.args.get('keyword', '').strip()
+    cursor = request.args.get('cursor')  # 传入时使用游标分页
+    with_total = request.args.get('with_total', 'false').lower() == 'true'
 
     query = Container.query
 
@@ -34,23 +85,41 @@ def list_containers():
     if keyword:
         query = query.filter(Container.name.ilike(f'%{keyword}%'))
 
-    query = query.order_by(Container.created_at.desc())
-    result = paginate_query(query, page, page_size)
+    if cursor is not None:
+        result = cursor_paginate_query(
+            query, [Container.created_at, Container.id], cursor, page_size,
+            descending=True, with_total=with_total
+        )
+    else:
+        query = query.order_by(Container.created_at.desc())
+        result = paginate_query(query, page, page_size)
 
     return api_response(
-        [c.to_dict() for c in result['items']],
+        containers_to_dicts(result['items']),
         pagination=result['pagination']
     )
 
 
 @containers_bp.route('/<int:id>', methods=['GET'])
 @jwt_required()
+@conditional(CONTAINER_TABLES)
 def get_container(id):
     """获取容器详情"""
     container = Container.query.get_or_404(id)
     return api_response(container.to_dict(include_children=True))
 
 
+@containers_bp.route('/<int:id>/history', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_container_history(id):
+    """获取容器变更历史（审计日志，按时间倒序，游标分页）"""
+    result = resource_history(
+        'container', id, request.args.get('cursor'), request.args.get('page_size', 20, type=int)
+    )
+    return api_response(result['items'], pagination=result['pagination'])
+
+
 @containers_bp.route('', methods=['POST'])
 @jwt_required()
 def create_container():
@@ -62,6 +131,12 @@ def create_container():
     if error:
         return error
 
+    port_mappings = data.get('port_mappings', [])
+    server = Server.query.get(data['server_id'])
+    conflict = check_port_conflicts(server, port_mappings)
+    if conflict:
+        return conflict
+
     container = Container(
         name=data['name'],
         server_id=data['server_id'],
@@ -79,21 +154,22 @@ def create_container():
     db.session.add(container)
     db.session.flush()  # 获取container.id
 
-    # 处理端口映射
-    port_mappings = data.get('port_mappings', [])
+    # 处理端口映射（锁定端口占用后按数据库复核）
+    conflict = check_port_conflicts(server, port_mappings, locked=True)
+    if conflict:
+        return conflict
     for pm_data in port_mappings:
-        if pm_data.get('container_port') and pm_data.get('internal_port'):
-            pm = PortMapping(
-                container_id=container.id,
-                container_port=pm_data['container_port'],
-                internal_ip=pm_data.get('internal_ip'),
-                internal_port=pm_data['internal_port'],
-                external_ip=pm_data.get('external_ip'),
-                external_port=pm_data.get('external_port'),
-                protocol=pm_data.get('protocol', 'tcp'),
-                description=pm_data.get('description'),
-            )
-            db.session.add(pm)
+        pm = PortMapping(
+            container_id=container.id,
+            container_port=pm_data['container_port'],
+            internal_ip=pm_data.get('internal_ip'),
+            internal_port=pm_data['internal_port'],
+            external_ip=pm_data.get('external_ip'),
+            external_port=pm_data.get('external_port'),
+            protocol=pm_data.get('protocol', 'tcp'),
+            description=pm_data.get('description'),
+        )
+        db.session.add(pm)
 
     db.session.commit()
 
@@ -102,7 +178,6 @@ def create_container():
         resource_id=container.id, resource_name=container.name,
         ip_address=request.remote_addr
     )
-    db.session.commit()
 
     return api_response(container.to_dict(), '容器创建成功'), 201
 
@@ -119,6 +194,15 @@ def update_container(id):
         return error_response('无权限修改此容器', 403, 403)
 
     data = get_request_json()
+    if 'port_mappings' in data:
+        port_mappings, error = validate_or_error(port_mappings_schema, data['port_mappings'])
+        if error:
+            return error
+        data['port_mappings'] = port_mappings
+        conflict = check_port_conflicts(container.server, port_mappings, container.id)
+        if conflict:
+            return conflict
+
     old_data = container.to_dict()
     changes = {}
 
@@ -138,23 +222,28 @@ def update_container(id):
 
     # 更新端口映射
     if 'port_mappings' in data:
-        # 删除旧的端口映射
-        PortMapping.query.filter_by(container_id=container.id).delete()
+        # 锁定端口占用后按数据库复核
+        conflict = check_port_conflicts(container.server, data['port_mappings'], container.id, locked=True)
+        if conflict:
+            return conflict
+
+        # 删除旧的端口映射（逐个删除，以便端口占用索引同步）
+        for pm in container.port_mappings:
+            db.session.delete(pm)
 
         # 添加新的端口映射
         for pm_data in data['port_mappings']:
-            if pm_data.get('container_port') and pm_data.get('internal_port'):
-                pm = PortMapping(
-                    container_id=container.id,
-                    container_port=pm_data['container_port'],
-                    internal_ip=pm_data.get('internal_ip'),
-                    internal_port=pm_data['internal_port'],
-                    external_ip=pm_data.get('external_ip'),
-                    external_port=pm_data.get('external_port'),
-                    protocol=pm_data.get('protocol', 'tcp'),
-                    description=pm_data.get('description'),
-                )
-                db.session.add(pm)
+            pm = PortMapping(
+                container_id=container.id,
+                container_port=pm_data['container_port'],
+                internal_ip=pm_data.get('internal_ip'),
+                internal_port=pm_data['internal_port'],
+                external_ip=pm_data.get('external_ip'),
+                external_port=pm_data.get('external_port'),
+                protocol=pm_data.get('protocol', 'tcp'),
+                description=pm_data.get('description'),
+            )
+            db.session.add(pm)
 
         changes['port_mappings'] = {'old': 'updated', 'new': 'updated'}
 
@@ -166,7 +255,6 @@ def update_container(id):
             resource_id=container.id, resource_name=container.name,
             changes=changes, ip_address=request.remote_addr
         )
-        db.session.commit()
 
     return api_response(container.to_dict(), '容器更新成功')
 
@@ -187,7 +275,8 @@ def delete_container(id):
     AuditLog.log_action(
         user=user, action='delete', resource_type='container',
         resource_id=container.id, resource_name=container.name,
-        snapshot=snapshot, ip_address=request.remote_addr
+        snapshot=snapshot, ip_address=request.remote_addr,
+        durable=True
     )
 
     db.session.delete(container)
@@ -211,14 +300,9 @@ def update_sort_order():
         return error_response('缺少items参数', 400, 400)
 
     items = data['items']  # [{id: 1, sort_order: 0}, {id: 2, sort_order: 1}, ...]
+    if not isinstance(items, list):
+        return error_response('items必须是数组', 400, 400)
 
-    for item in items:
-        container_id = item.get('id')
-        sort_order = item.get('sort_order')
-        if container_id is not None and sort_order is not None:
-            container = Container.query.get(container_id)
-            if container:
-                container.sort_order = sort_order
-
+    result = update_sort_orders(Container, items, user, request.remote_addr)
     db.session.commit()
-    return api_response(None, '排序更新成功')
+    return api_response(result, '排序更新成功')
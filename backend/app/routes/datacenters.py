@@ -1,19 +1,26 @@
 """机房路由"""
+from collections import defaultdict
 from flask import Blueprint, request
 from flask_jwt_extended import jwt_required
-from app.models import Datacenter, Server, Container, Service, AuditLog
+from app.models import Datacenter, Server, Container, Service, GPU, AuditLog
 from app.extensions import db
 from app.utils import (
     api_response, error_response, get_current_user,
     admin_required, get_request_json, validate_or_error
 )
+from app.utils.resource_history import resource_history
+from app.utils.response_cache import cached_response
+from app.utils.table_versions import conditional
 from app.schemas import datacenter_create_schema, datacenter_update_schema
 
 datacenters_bp = Blueprint('datacenters', __name__)
 
+OVERVIEW_TABLES = ('datacenters', 'servers', 'containers', 'services', 'gpus')
+
 
 @datacenters_bp.route('', methods=['GET'])
 @jwt_required()
+@conditional(['datacenters', 'servers'])
 def list_datacenters():
     """获取机房列表"""
     include_stats = request.args.get('include_stats', 'false').lower() == 'true'
@@ -23,45 +30,53 @@ def list_datacenters():
 
 @datacenters_bp.route('/overview', methods=['GET'])
 @jwt_required()
+@conditional(OVERVIEW_TABLES)
+@cached_response(OVERVIEW_TABLES)
 def get_datacenters_overview():
     """获取机房总览统计"""
     datacenters = Datacenter.query.filter_by(is_active=True).all()
 
+    # 全量按机房分组统计，查询次数与机房数量无关
+    # 服务器按 (机房, 环境, 状态) 分组，服务器数/环境分布/状态分布均由此汇总
+    server_stats = db.session.query(
+        Server.datacenter_id, Server.environment_id, Server.status, db.func.count(Server.id)
+    ).group_by(Server.datacenter_id, Server.environment_id, Server.status).all()
+
+    container_counts = dict(db.session.query(
+        Server.datacenter_id, db.func.count(Container.id)
+    ).join(Container, Container.server_id == Server.id).group_by(Server.datacenter_id).all())
+
+    service_counts = dict(db.session.query(
+        Server.datacenter_id, db.func.count(Service.id)
+    ).join(Container, Container.server_id == Server.id).join(
+        Service, Service.container_id == Container.id
+    ).group_by(Server.datacenter_id).all())
+
+    # GPU服务器数量
+    gpu_server_counts = dict(db.session.query(
+        Server.datacenter_id, db.func.count(db.distinct(Server.id))
+    ).join(GPU, GPU.server_id == Server.id).group_by(Server.datacenter_id).all())
+
+    server_counts = defaultdict(int)
+    env_stats = defaultdict(lambda: defaultdict(int))
+    status_stats = defaultdict(lambda: defaultdict(int))
+    for dc_id, env_id, status, count in server_stats:
+        server_counts[dc_id] += count
+        env_stats[dc_id][str(env_id)] += count
+        status_stats[dc_id][status] += count
+
     overview = []
     for dc in datacenters:
-        servers = Server.query.filter_by(datacenter_id=dc.id).all()
-        server_ids = [s.id for s in servers]
-
-        container_count = Container.query.filter(Container.server_id.in_(server_ids)).count() if server_ids else 0
-        service_count = db.session.query(Service).join(Container).filter(
-            Container.server_id.in_(server_ids)
-        ).count() if server_ids else 0
-
-        # 按环境统计
-        env_stats = db.session.query(
-            Server.environment_id, db.func.count(Server.id)
-        ).filter(Server.datacenter_id == dc.id).group_by(Server.environment_id).all()
-
-        # 按状态统计
-        status_stats = db.session.query(
-            Server.status, db.func.count(Server.id)
-        ).filter(Server.datacenter_id == dc.id).group_by(Server.status).all()
-
-        # GPU服务器数量
-        gpu_server_count = db.session.query(db.func.count(db.distinct(Server.id))).join(
-            GPU, GPU.server_id == Server.id
-        ).filter(Server.datacenter_id == dc.id).scalar() or 0
-
         overview.append({
             'id': dc.id,
             'name': dc.name,
             'location': dc.location,
-            'server_count': len(servers),
-            'container_count': container_count,
-            'service_count': service_count,
-            'gpu_server_count': gpu_server_count,
-            'env_stats': {str(env_id): count for env_id, count in env_stats},
-            'status_stats': {status: count for status, count in status_stats},
+            'server_count': server_counts[dc.id],
+            'container_count': container_counts.get(dc.id, 0),
+            'service_count': service_counts.get(dc.id, 0),
+            'gpu_server_count': gpu_server_counts.get(dc.id, 0),
+            'env_stats': dict(env_stats[dc.id]),
+            'status_stats': dict(status_stats[dc.id]),
         })
 
     return api_response(overview)
@@ -69,12 +84,24 @@ def get_datacenters_overview():
 
 @datacenters_bp.route('/<int:id>', methods=['GET'])
 @jwt_required()
+@conditional(['datacenters', 'servers'])
 def get_datacenter(id):
     """获取机房详情"""
     datacenter = Datacenter.query.get_or_404(id)
     return api_response(datacenter.to_dict(include_stats=True))
 
 
+@datacenters_bp.route('/<int:id>/history', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_datacenter_history(id):
+    """获取机房变更历史（审计日志，按时间倒序，游标分页）"""
+    result = resource_history(
+        'datacenter', id, request.args.get('cursor'), request.args.get('page_size', 20, type=int)
+    )
+    return api_response(result['items'], pagination=result['pagination'])
+
+
 @datacenters_bp.route('', methods=['POST'])
 @jwt_required()
 @admin_required
@@ -104,7 +131,6 @@ def create_datacenter():
         resource_id=datacenter.id, resource_name=datacenter.name,
         ip_address=request.remote_addr
     )
-    db.session.commit()
 
     return api_response(datacenter.to_dict(), '机房创建成功'), 201
 
@@ -141,7 +167,6 @@ def update_datacenter(id):
             resource_id=datacenter.id, resource_name=datacenter.name,
             changes=changes, ip_address=request.remote_addr
         )
-        db.session.commit()
 
     return api_response(datacenter.to_dict(), '机房更新成功')
 
@@ -162,7 +187,8 @@ def delete_datacenter(id):
     AuditLog.log_action(
         user=user, action='delete', resource_type='datacenter',
         resource_id=datacenter.id, resource_name=datacenter.name,
-        snapshot=snapshot, ip_address=request.remote_addr
+        snapshot=snapshot, ip_address=request.remote_addr,
+        durable=True
     )
 
     db.session.delete(datacenter)
@@ -170,6 +196,3 @@ def delete_datacenter(id):
 
     return api_response(None, '机房删除成功')
 
-
-# 需要导入GPU模型
-from app.models import GPU
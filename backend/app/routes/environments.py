@@ -3,12 +3,18 @@ from flask import Blueprint
 from flask_jwt_extended import jwt_required
 from app.models import Environment
 from app.utils import api_response
+from app.utils.response_cache import cached_response
+from app.utils.table_versions import conditional
 
 environments_bp = Blueprint('environments', __name__)
 
+ENVIRONMENT_TABLES = ('environments', 'servers')
+
 
 @environments_bp.route('', methods=['GET'])
 @jwt_required()
+@conditional(ENVIRONMENT_TABLES)
+@cached_response(ENVIRONMENT_TABLES)
 def list_environments():
     """获取环境列表"""
     environments = Environment.query.order_by(Environment.sort_order).all()
@@ -17,6 +23,7 @@ def list_environments():
 
 @environments_bp.route('/<int:id>', methods=['GET'])
 @jwt_required()
+@conditional(ENVIRONMENT_TABLES)
 def get_environment(id):
     """获取环境详情"""
     environment = Environment.query.get_or_404(id)
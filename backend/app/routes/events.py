@@ -0,0 +1,72 @@
+"""变更事件推送路由（Server-Sent Events）"""
+import time
+from flask import Blueprint, current_app, request
+from flask_jwt_extended import get_jwt, get_jwt_identity, get_jwt_request_location, jwt_required
+from app.utils import api_response, error_response
+from app.utils.auth_tokens import CLAIM_SCOPE, SCOPE_EVENTS, issue_scoped_token
+from app.utils.change_journal import current_seq
+from app.utils.event_stream import EVENT_TYPES, format_sse, get_event_broker
+
+events_bp = Blueprint('events', __name__)
+
+
+@events_bp.route('/token', methods=['POST'])
+@jwt_required()
+def stream_token():
+    """签发事件流专用的短期 Token（EventSource 无法设置请求头，用 ?jwt= 传递该 Token）"""
+    seconds = current_app.config.get('EVENTS_TOKEN_SECONDS', 60)
+    return api_response({
+        'token': issue_scoped_token(get_jwt_identity(), get_jwt(), SCOPE_EVENTS, seconds),
+        'expires_in': seconds,
+    })
+
+
+@events_bp.route('', methods=['GET'])
+@jwt_required(locations=['headers', 'query_string'])
+def events():
+    """订阅资源变更事件流（text/event-stream）"""
+    # URL 中只接受事件流 Token：普通访问 Token 有效期长，不应出现在地址与访问日志中
+    if get_jwt_request_location() == 'query_string' and get_jwt().get(CLAIM_SCOPE) != SCOPE_EVENTS:
+        return error_response('URL中只能使用事件流Token（POST /api/events/token）', 401, 401)
+    broker = get_event_broker()
+    if broker is None:
+        return error_response('事件推送未启用', 503, 503)
+
+    types = [t for t in request.args.get('types', '').split(',') if t]
+    unknown = set(types) - set(EVENT_TYPES.values())
+    if unknown:
+        return error_response(f'未知的资源类型: {", ".join(sorted(unknown))}', 400, 400)
+    mine = request.args.get('mine', '').lower() in ('1', 'true')
+
+    subscriber = broker.subscribe(int(get_jwt_identity()), types, mine)
+    if subscriber is None:
+        return error_response('事件推送连接数已达上限', 503, 503)
+    # 先订阅再读取序号：期间提交的变更可能重复下发，不会遗漏
+    seq = current_seq()
+    heartbeat = current_app.config.get('EVENTS_HEARTBEAT_SECONDS', 15)
+    lifetime = current_app.config.get('EVENTS_STREAM_SECONDS', 300)
+
+    def stream():
+        # 不持有请求上下文：视图返回后数据库连接即归还，连接只占用一个线程
+        deadline = time.monotonic() + lifetime
+        try:
+            yield 'retry: 3000\n\n'
+            yield format_sse({'seq': seq}, 'ready')
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                items, resync = subscriber.get(min(heartbeat, remaining))
+                if resync:
+                    yield format_sse({'reason': 'overflow'}, 'resync')
+                elif items:
+                    yield format_sse(items, 'changes')
+                else:
+                    yield ': keepalive\n\n'
+        finally:
+            broker.unsubscribe(subscriber)
+
+    response = current_app.response_class(stream(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # 关闭 nginx 代理缓冲
+    return response
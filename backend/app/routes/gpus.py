@@ -5,15 +5,23 @@ from app.models import GPU, User, AuditLog
 from app.extensions import db
 from app.utils import (
     api_response, error_response, get_current_user,
-    admin_required, paginate_query, get_request_json, validate_or_error
+    admin_required, paginate_query, cursor_paginate_query,
+    get_request_json, validate_or_error
 )
+from app.utils.batch_ops import update_sort_orders
+from app.utils.resource_history import resource_history
+from app.utils.table_versions import conditional
 from app.schemas import gpu_create_schema, gpu_update_schema
 
 gpus_bp = Blueprint('gpus', __name__)
 
+# GPU列表/详情读取的表（含服务器与用户名称）
+GPU_TABLES = ('gpus', 'servers', 'users')
+
 
 @gpus_bp.route('', methods=['GET'])
 @jwt_required()
+@conditional(GPU_TABLES)
 def list_gpus():
     """获取GPU列表"""
     page = request.args.get('page', 1, type=int)
@@ -21,6 +29,8 @@ def list_gpus():
     server_id = request.args.get('server_id', type=int)
     status = request.args.get('status')
     assigned_to = request.args.get('assigned_to', type=int)
+    cursor = request.args.get('cursor')  # 传入时使用游标分页
+    with_total = request.args.get('with_total', 'false').lower() == 'true'
 
     query = GPU.query
 
@@ -31,8 +41,14 @@ def list_gpus():
     if assigned_to:
         query = query.filter(GPU.assigned_to == assigned_to)
 
-    query = query.order_by(GPU.server_id, GPU.index)
-    result = paginate_query(query, page, page_size)
+    if cursor is not None:
+        result = cursor_paginate_query(
+            query, [GPU.server_id, GPU.index, GPU.id], cursor, page_size,
+            with_total=with_total
+        )
+    else:
+        query = query.order_by(GPU.server_id, GPU.index)
+        result = paginate_query(query, page, page_size)
 
     return api_response(
         [g.to_dict() for g in result['items']],
@@ -42,12 +58,24 @@ def list_gpus():
 
 @gpus_bp.route('/<int:id>', methods=['GET'])
 @jwt_required()
+@conditional(GPU_TABLES)
 def get_gpu(id):
     """获取GPU详情"""
     gpu = GPU.query.get_or_404(id)
     return api_response(gpu.to_dict())
 
 
+@gpus_bp.route('/<int:id>/history', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_gpu_history(id):
+    """获取GPU变更历史（审计日志，按时间倒序，游标分页）"""
+    result = resource_history(
+        'gpu', id, request.args.get('cursor'), request.args.get('page_size', 20, type=int)
+    )
+    return api_response(result['items'], pagination=result['pagination'])
+
+
 @gpus_bp.route('', methods=['POST'])
 @jwt_required()
 @admin_required
@@ -77,7 +105,6 @@ def create_gpu():
         resource_id=gpu.id, resource_name=f"{gpu.model} on {gpu.server.name}",
         ip_address=request.remote_addr
     )
-    db.session.commit()
 
     return api_response(gpu.to_dict(), 'GPU创建成功'), 201
 
@@ -113,7 +140,6 @@ def update_gpu(id):
             resource_id=gpu.id, resource_name=f"{gpu.model}",
             changes=changes, ip_address=request.remote_addr
         )
-        db.session.commit()
 
     return api_response(gpu.to_dict(), 'GPU更新成功')
 
@@ -147,7 +173,6 @@ def assign_gpu(id):
         changes={'assigned_to': {'old': old_assigned, 'new': user_id}},
         ip_address=request.remote_addr
     )
-    db.session.commit()
 
     return api_response(gpu.to_dict(), f'GPU已分配给 {target_user.display_name}')
 
@@ -172,7 +197,6 @@ def release_gpu(id):
         changes={'assigned_to': {'old': old_assigned, 'new': None}, 'status': {'old': 'in_use', 'new': 'free'}},
         ip_address=request.remote_addr
     )
-    db.session.commit()
 
     return api_response(gpu.to_dict(), 'GPU已释放')
 
@@ -189,7 +213,8 @@ def delete_gpu(id):
     AuditLog.log_action(
         user=user, action='delete', resource_type='gpu',
         resource_id=gpu.id, resource_name=f"{gpu.model}",
-        snapshot=snapshot, ip_address=request.remote_addr
+        snapshot=snapshot, ip_address=request.remote_addr,
+        durable=True
     )
 
     db.session.delete(gpu)
@@ -208,14 +233,9 @@ def update_gpu_sort_order():
         return error_response('缺少items参数', 400, 400)
 
     items = data['items']  # [{id: 1, sort_order: 0}, {id: 2, sort_order: 1}, ...]
+    if not isinstance(items, list):
+        return error_response('items必须是数组', 400, 400)
 
-    for item in items:
-        gpu_id = item.get('id')
-        sort_order = item.get('sort_order')
-        if gpu_id is not None and sort_order is not None:
-            gpu = GPU.query.get(gpu_id)
-            if gpu:
-                gpu.sort_order = sort_order
-
+    result = update_sort_orders(GPU, items, get_current_user(), request.remote_addr)
     db.session.commit()
-    return api_response(None, '排序更新成功')
+    return api_response(result, '排序更新成功')
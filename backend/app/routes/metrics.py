@@ -0,0 +1,53 @@
+"""运行指标路由"""
+from flask import Blueprint
+from flask_jwt_extended import jwt_required
+from app.utils import api_response, admin_required
+from app.utils.audit_writer import get_audit_writer
+from app.utils.event_stream import get_event_broker
+from app.utils.login_guard import get_login_guard
+from app.utils.pool_metrics import get_pool_monitor
+from app.utils.response_cache import get_response_cache
+
+metrics_bp = Blueprint('metrics', __name__)
+
+
+@metrics_bp.route('/audit', methods=['GET'])
+@jwt_required()
+@admin_required
+def audit_metrics():
+    """本进程的审计日志写入统计：写入、重试、溢出与重新写入的行数"""
+    return api_response(get_audit_writer().stats())
+
+
+@metrics_bp.route('/cache', methods=['GET'])
+@jwt_required()
+@admin_required
+def cache_metrics():
+    """响应缓存命中统计（未启用时为 null）"""
+    cache = get_response_cache()
+    return api_response(cache.stats() if cache else None)
+
+
+@metrics_bp.route('/events', methods=['GET'])
+@jwt_required()
+@admin_required
+def event_metrics():
+    """事件推送统计（未启用时为 null）"""
+    broker = get_event_broker()
+    return api_response(broker.stats() if broker else None)
+
+
+@metrics_bp.route('/login', methods=['GET'])
+@jwt_required()
+@admin_required
+def login_metrics():
+    """登录限流与密码哈希线程池统计"""
+    return api_response(get_login_guard().stats())
+
+
+@metrics_bp.route('/pool', methods=['GET'])
+@jwt_required()
+@admin_required
+def pool_metrics():
+    """本进程的数据库连接池统计：取连接耗时、等待与超时、溢出、连接存活时间"""
+    return api_response(get_pool_monitor().stats())
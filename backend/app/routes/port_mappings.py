@@ -0,0 +1,50 @@
+"""端口映射路由"""
+from flask import Blueprint, request
+from flask_jwt_extended import jwt_required
+from app.utils import api_response, error_response
+from app.utils.port_index import get_port_index, MIN_PORT, MAX_PORT
+
+port_mappings_bp = Blueprint('port_mappings', __name__)
+
+
+@port_mappings_bp.route('/free', methods=['GET'])
+@jwt_required()
+def get_free_ports():
+    """分配指定IP上的空闲端口"""
+    ip = request.args.get('ip', '').strip()
+    count = request.args.get('count', 1, type=int)
+    protocol = request.args.get('protocol', 'tcp').lower()
+    start = request.args.get('start', MIN_PORT, type=int)
+    end = request.args.get('end', MAX_PORT, type=int)
+    contiguous = request.args.get('contiguous', 'false').lower() == 'true'
+
+    if not ip:
+        return error_response('缺少ip参数', 400, 400)
+    if count < 1 or not MIN_PORT <= start <= end <= MAX_PORT:
+        return error_response('端口范围参数错误', 400, 400)
+
+    ranges = get_port_index().free_ranges(ip, count, protocol, start, end, contiguous)
+    if not ranges:
+        return error_response('指定范围内空闲端口不足', 409, 409)
+
+    return api_response({
+        'ip': ip,
+        'protocol': protocol,
+        'count': count,
+        'ranges': ranges,
+    })
+
+
+@port_mappings_bp.route('/conflicts', methods=['GET'])
+@jwt_required()
+def get_port_conflicts():
+    """全量端口冲突报告（refresh=true 时先从数据库重建占用索引）"""
+    index = get_port_index()
+    if request.args.get('refresh', 'false').lower() == 'true':
+        conflicts = index.build()
+    else:
+        conflicts = index.conflicts()
+    return api_response({
+        'conflicts': conflicts,
+        'total': len(conflicts),
+    })
@@ -1,20 +1,17 @@
 """智能搜索路由"""
-import re
 from flask import Blueprint, request
 from flask_jwt_extended import jwt_required
-from app.models import Server, Container, Service, PortMapping
+from app.models import Server, Service, PortMapping
 from app.extensions import db
-from app.utils import api_response
+from app.utils import api_response, admin_required
+from app.utils.autocomplete import get_autocomplete_index
+from app.utils.counts import servers_to_dicts, containers_to_dicts
+from app.utils.ip_index import parse_ip_query, server_ip_condition, port_mapping_ip_condition
+from app.utils.search_index import search_resources
 
 search_bp = Blueprint('search', __name__)
 
 
-def is_ip_pattern(keyword):
-    """判断是否为IP地址模式"""
-    ip_pattern = r'^(\d{1,3}\.){0,3}\d{0,3}$'
-    return bool(re.match(ip_pattern, keyword))
-
-
 def is_port_pattern(keyword):
     """判断是否为端口号模式"""
     try:
@@ -42,25 +39,20 @@ def smart_search():
         'search_type': 'keyword'  # 搜索类型：keyword, ip, port
     }
 
-    # 判断搜索类型
-    if is_ip_pattern(keyword):
+    # 判断搜索类型（IP: 完整地址、前缀、CIDR、区间）
+    ip_ranges = parse_ip_query(keyword)
+    if ip_ranges is not None:
         results['search_type'] = 'ip'
-        # 搜索服务器IP
+        # 搜索服务器IP（排序键索引范围扫描）
         servers = Server.query.filter(
-            db.or_(
-                Server.internal_ip.ilike(f'%{keyword}%'),
-                Server.external_ip.ilike(f'%{keyword}%'),
-            )
-        ).limit(limit).all()
-        results['servers'] = [s.to_dict() for s in servers]
+            server_ip_condition(ip_ranges)
+        ).order_by(Server.internal_ip_key).limit(limit).all()
+        results['servers'] = servers_to_dicts(servers)
 
         # 搜索端口映射中的IP
         port_mappings = PortMapping.query.filter(
-            db.or_(
-                PortMapping.internal_ip.ilike(f'%{keyword}%'),
-                PortMapping.external_ip.ilike(f'%{keyword}%'),
-            )
-        ).limit(limit).all()
+            port_mapping_ip_condition(ip_ranges)
+        ).order_by(PortMapping.internal_ip_key, PortMapping.internal_port).limit(limit).all()
         results['port_mappings'] = [pm.to_dict() for pm in port_mappings]
 
     elif is_port_pattern(keyword):
@@ -82,40 +74,14 @@ def smart_search():
 
         # 搜索SSH端口
         servers = Server.query.filter(Server.ssh_port == port).limit(limit).all()
-        results['servers'] = [s.to_dict() for s in servers]
+        results['servers'] = servers_to_dicts(servers)
 
     else:
         results['search_type'] = 'keyword'
-        # 关键词搜索
-        # 搜索服务器
-        servers = Server.query.filter(
-            db.or_(
-                Server.name.ilike(f'%{keyword}%'),
-                Server.responsible_person.ilike(f'%{keyword}%'),
-                Server.description.ilike(f'%{keyword}%'),
-            )
-        ).limit(limit).all()
-        results['servers'] = [s.to_dict() for s in servers]
-
-        # 搜索容器
-        containers = Container.query.filter(
-            db.or_(
-                Container.name.ilike(f'%{keyword}%'),
-                Container.image.ilike(f'%{keyword}%'),
-                Container.description.ilike(f'%{keyword}%'),
-            )
-        ).limit(limit).all()
-        results['containers'] = [c.to_dict() for c in containers]
-
-        # 搜索服务
-        services = Service.query.filter(
-            db.or_(
-                Service.name.ilike(f'%{keyword}%'),
-                Service.service_type.ilike(f'%{keyword}%'),
-                Service.description.ilike(f'%{keyword}%'),
-            )
-        ).limit(limit).all()
-        results['services'] = [s.to_dict() for s in services]
+        # 关键词搜索（走全文索引，按相关度排序）
+        results['servers'] = servers_to_dicts(search_resources(keyword, 'server', limit))
+        results['containers'] = containers_to_dicts(search_resources(keyword, 'container', limit))
+        results['services'] = [s.to_dict() for s in search_resources(keyword, 'service', limit)]
 
     # 统计结果数量
     results['total'] = (
@@ -138,10 +104,16 @@ def quick_search():
     if not keyword or len(keyword) < 2:
         return api_response([])
 
+    # 优先使用进程内索引，不访问数据库
+    suggestions = get_autocomplete_index().suggest(keyword, limit)
+    if suggestions is not None:
+        return api_response(suggestions)
+
+    # 索引超出容量被停用时回退到全文索引检索
     suggestions = []
 
     # 搜索服务器名称
-    servers = Server.query.filter(Server.name.ilike(f'%{keyword}%')).limit(limit).all()
+    servers = search_resources(keyword, 'server', limit, title_only=True)
     for s in servers:
         suggestions.append({
             'type': 'server',
@@ -151,7 +123,7 @@ def quick_search():
         })
 
     # 搜索容器名称
-    containers = Container.query.filter(Container.name.ilike(f'%{keyword}%')).limit(limit).all()
+    containers = search_resources(keyword, 'container', limit, title_only=True)
     for c in containers:
         suggestions.append({
             'type': 'container',
@@ -161,3 +133,11 @@ def quick_search():
         })
 
     return api_response(suggestions[:limit])
+
+
+@search_bp.route('/quick/stats', methods=['GET'])
+@jwt_required()
+@admin_required
+def quick_search_stats():
+    """自动补全索引统计"""
+    return api_response(get_autocomplete_index().stats())
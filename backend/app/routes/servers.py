@@ -5,15 +5,27 @@ from app.models import Server, AuditLog
 from app.extensions import db
 from app.utils import (
     api_response, error_response, get_current_user,
-    admin_required, paginate_query, get_request_json, validate_or_error
+    admin_required, paginate_query, cursor_paginate_query,
+    get_request_json, validate_or_error
 )
+from app.utils.batch_ops import update_servers, delete_servers
+from app.utils.counts import servers_to_dicts
+from app.utils.ip_index import parse_ip_query, server_ip_condition
+from app.utils.server_tree import build_server_tree, TREE_TABLES
+from app.utils.response_cache import cached_response
+from app.utils.table_versions import conditional
+from app.utils.resource_history import resource_history, parse_as_of, state_as_of
 from app.schemas import server_create_schema, server_update_schema
 
 servers_bp = Blueprint('servers', __name__)
 
+# 列表读取的表（含机房/环境名称与子资源数量）
+SERVER_LIST_TABLES = ('servers', 'datacenters', 'environments', 'containers', 'gpus')
+
 
 @servers_bp.route('', methods=['GET'])
 @jwt_required()
+@conditional(SERVER_LIST_TABLES)
 def list_servers():
     """获取服务器列表"""
     page = request.args.get('page', 1, type=int)
@@ -22,6 +34,8 @@ def list_servers():
     environment_id = request.args.get('environment_id', type=int)
     status = request.args.get('status')
     keyword = request.args.get('keyword', '').strip()
+    cursor = request.args.get('cursor')  # 传入时使用游标分页
+    with_total = request.args.get('with_total', 'false').lower() == 'true'
 
     query = Server.query
 
@@ -31,7 +45,11 @@ def list_servers():
         query = query.filter(Server.environment_id == environment_id)
     if status:
         query = query.filter(Server.status == status)
-    if keyword:
+    ip_ranges = parse_ip_query(keyword) if keyword else None
+    if ip_ranges is not None:
+        # IP前缀/CIDR/区间走排序键索引
+        query = query.filter(server_ip_condition(ip_ranges))
+    elif keyword:
         query = query.filter(
             db.or_(
                 Server.name.ilike(f'%{keyword}%'),
@@ -41,17 +59,25 @@ def list_servers():
             )
         )
 
-    query = query.order_by(Server.created_at.desc())
-    result = paginate_query(query, page, page_size)
+    if cursor is not None:
+        result = cursor_paginate_query(
+            query, [Server.created_at, Server.id], cursor, page_size,
+            descending=True, with_total=with_total
+        )
+    else:
+        query = query.order_by(Server.created_at.desc())
+        result = paginate_query(query, page, page_size)
 
     return api_response(
-        [s.to_dict() for s in result['items']],
+        servers_to_dicts(result['items']),
         pagination=result['pagination']
     )
 
 
 @servers_bp.route('/tree', methods=['GET'])
 @jwt_required()
+@conditional(TREE_TABLES)
+@cached_response(TREE_TABLES)
 def get_servers_tree():
     """获取服务器树形结构（含容器和GPU）"""
     datacenter_id = request.args.get('datacenter_id', type=int)
@@ -65,62 +91,7 @@ def get_servers_tree():
     if environment_id:
         query = query.filter(Server.environment_id == environment_id)
 
-    servers = query.order_by(Server.name).all()
-
-    tree_data = []
-    for server in servers:
-        server_data = server.to_dict()
-
-        if expand_level >= 2:
-            # 为树形展示准备 children 数组
-            children = []
-
-            # 第一个子节点：资源卡片（特殊类型）
-            children.append({
-                '_type': '_resource_card',
-                'id': f'card_{server.id}',
-                'cpu_usage': server_data.get('cpu_usage'),
-                'memory_usage': server_data.get('memory_usage'),
-                'disk_usage': server_data.get('disk_usage'),
-                'cpu_cores': server_data.get('cpu_cores'),
-                'memory_gb': server_data.get('memory_gb'),
-                'disk_gb': server_data.get('disk_gb'),
-                'gpu_count': server_data.get('gpu_count', 0),
-                'updated_at': server_data.get('updated_at'),
-                'ssh_command': server_data.get('ssh_command'),
-                'internal_ip': server_data.get('internal_ip')
-            })
-
-            # 添加容器到 children
-            for container in server.containers:
-                container_data = container.to_dict()
-                container_data['_type'] = 'container'  # 标记类型
-
-                # 添加端口映射数据
-                container_data['port_mappings'] = [
-                    pm.to_dict() for pm in sorted(container.port_mappings, key=lambda x: x.container_port)
-                ]
-
-                if expand_level >= 3:
-                    # 将服务作为容器的子节点
-                    container_data['children'] = []
-                    for service in container.services:
-                        service_data = service.to_dict()
-                        service_data['_type'] = 'service'  # 标记类型
-                        container_data['children'].append(service_data)
-
-                children.append(container_data)
-
-            # 添加 GPU 到 children（与容器平级）
-            for gpu in server.gpus:
-                gpu_data = gpu.to_dict()
-                gpu_data['_type'] = 'gpu'  # 标记类型
-                children.append(gpu_data)
-
-            server_data['children'] = children
-            server_data['hasChildren'] = len(children) > 0
-
-        tree_data.append(server_data)
+    tree_data = build_server_tree(query, expand_level)
 
     return api_response(tree_data)
 
@@ -128,11 +99,47 @@ def get_servers_tree():
 @servers_bp.route('/<int:id>', methods=['GET'])
 @jwt_required()
 def get_server(id):
-    """获取服务器详情"""
+    """获取服务器详情（传入 as_of 时返回该时间点的服务器字段，不含子资源）"""
+    as_of = request.args.get('as_of')
+    if as_of:
+        # 审计日志异步写入，不在表版本号内，as_of 响应不带 ETag
+        return _get_server_as_of(id, as_of)
+    return _get_server_current(id)
+
+
+@conditional(TREE_TABLES)
+def _get_server_current(id):
     server = Server.query.get_or_404(id)
     return api_response(server.to_dict(include_children=True))
 
 
+def _get_server_as_of(id, value):
+    """从当前状态（或检查点）倒序回放审计日志还原服务器，已删除的服务器从删除快照还原"""
+    try:
+        as_of = parse_as_of(value)
+    except ValueError as e:
+        return error_response(str(e), 400, 400)
+
+    server = db.session.get(Server, id)
+    current = server.to_dict(counts={}) if server else None
+    state, replayed = state_as_of('server', id, as_of, current)
+    if state is None:
+        return error_response('该时间点服务器不存在', 404, 404)
+    state.update(as_of=as_of.isoformat(), replayed=replayed)
+    return api_response(state)
+
+
+@servers_bp.route('/<int:id>/history', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_server_history(id):
+    """获取服务器变更历史（审计日志，按时间倒序，游标分页）"""
+    result = resource_history(
+        'server', id, request.args.get('cursor'), request.args.get('page_size', 20, type=int)
+    )
+    return api_response(result['items'], pagination=result['pagination'])
+
+
 @servers_bp.route('', methods=['POST'])
 @jwt_required()
 @admin_required
@@ -170,7 +177,6 @@ def create_server():
         resource_id=server.id, resource_name=server.name,
         ip_address=request.remote_addr
     )
-    db.session.commit()
 
     return api_response(server.to_dict(), '服务器创建成功'), 201
 
@@ -213,7 +219,6 @@ def update_server(id):
             resource_id=server.id, resource_name=server.name,
             changes=changes, ip_address=request.remote_addr
         )
-        db.session.commit()
 
     return api_response(server.to_dict(), '服务器更新成功')
 
@@ -230,7 +235,8 @@ def delete_server(id):
     AuditLog.log_action(
         user=user, action='delete', resource_type='server',
         resource_id=server.id, resource_name=server.name,
-        snapshot=snapshot, ip_address=request.remote_addr
+        snapshot=snapshot, ip_address=request.remote_addr,
+        durable=True
     )
 
     db.session.delete(server)
@@ -260,9 +266,6 @@ def batch_update_servers():
     if not isinstance(updates, dict) or not updates:
         return error_response('updates必须是非空对象', 400)
 
-    success = []
-    failed = []
-
     # 可更新的字段列表
     updatable_fields = [
         'datacenter_id', 'environment_id', 'status',
@@ -276,36 +279,7 @@ def batch_update_servers():
         return error_response(f'不允许更新的字段: {", ".join(invalid_fields)}', 400)
 
     try:
-        # 使用事务
-        for server_id in ids:
-            try:
-                server = Server.query.get(server_id)
-                if not server:
-                    failed.append({'id': server_id, 'reason': '服务器不存在'})
-                    continue
-
-                old_data = server.to_dict()
-                changes = {}
-
-                # 应用更新
-                for field, value in updates.items():
-                    old_val = getattr(server, field)
-                    if old_val != value:
-                        changes[field] = {'old': old_val, 'new': value}
-                        setattr(server, field, value)
-
-                # 记录审计日志
-                if changes:
-                    AuditLog.log_action(
-                        user=user, action='batch_update', resource_type='server',
-                        resource_id=server.id, resource_name=server.name,
-                        changes=changes, ip_address=request.remote_addr
-                    )
-
-                success.append(server_id)
-
-            except Exception as e:
-                failed.append({'id': server_id, 'reason': str(e)})
+        success, failed = update_servers(ids, updates, user, ip_address=request.remote_addr)
 
         # 提交事务
         db.session.commit()
@@ -340,50 +314,8 @@ def batch_delete_servers():
     if not isinstance(ids, list) or not ids:
         return error_response('ids必须是非空数组', 400)
 
-    success = []
-    failed = []
-
     try:
-        # 使用事务
-        for server_id in ids:
-            try:
-                server = Server.query.get(server_id)
-                if not server:
-                    failed.append({'id': server_id, 'reason': '服务器不存在'})
-                    continue
-
-                # 检查是否有关联的容器或GPU (使用count()避免加载所有数据)
-                from app.models import Container, GPU
-                container_count = Container.query.filter_by(server_id=server.id).count()
-                gpu_count = GPU.query.filter_by(server_id=server.id).count()
-
-                if container_count > 0:
-                    failed.append({
-                        'id': server_id,
-                        'reason': f'服务器有 {container_count} 个容器,请先删除容器'
-                    })
-                    continue
-
-                if gpu_count > 0:
-                    failed.append({
-                        'id': server_id,
-                        'reason': f'服务器有 {gpu_count} 个GPU,请先删除GPU'
-                    })
-                    continue
-
-                # 记录审计日志
-                snapshot = server.to_dict(include_children=True)
-                AuditLog.log_action(
-                    user=user, action='batch_delete', resource_type='server',
-                    resource_id=server.id, resource_name=server.name,
-                    snapshot=snapshot, ip_address=request.remote_addr
-                )
-
-                db.session.delete(server)
-                success.append(server_id)
-
-            except Exception as e:
-                failed.append({'id': server_id, 'reason': str(e)})
+        success, failed = delete_servers(ids, user, ip_address=request.remote_addr)
 
         # 提交事务
         db.session.commit()
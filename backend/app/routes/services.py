@@ -4,16 +4,23 @@ from flask_jwt_extended import jwt_required
 from app.models import Service, AuditLog
 from app.extensions import db
 from app.utils import (
-    api_response, error_response, get_current_user,
+    api_response, error_response, get_current_user, admin_required,
     paginate_query, get_request_json, validate_or_error
 )
+from app.utils.batch_ops import update_sort_orders
+from app.utils.resource_history import resource_history
+from app.utils.table_versions import conditional
 from app.schemas import service_create_schema, service_update_schema
 
 services_bp = Blueprint('services', __name__)
 
+# 服务列表/详情读取的表（含容器与用户名称）
+SERVICE_TABLES = ('services', 'containers', 'users')
+
 
 @services_bp.route('', methods=['GET'])
 @jwt_required()
+@conditional(SERVICE_TABLES)
 def list_services():
     """获取服务列表"""
     page = request.args.get('page', 1, type=int)
@@ -42,12 +49,24 @@ def list_services():
 
 @services_bp.route('/<int:id>', methods=['GET'])
 @jwt_required()
+@conditional(SERVICE_TABLES)
 def get_service(id):
     """获取服务详情"""
     service = Service.query.get_or_404(id)
     return api_response(service.to_dict())
 
 
+@services_bp.route('/<int:id>/history', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_service_history(id):
+    """获取服务变更历史（审计日志，按时间倒序，游标分页）"""
+    result = resource_history(
+        'service', id, request.args.get('cursor'), request.args.get('page_size', 20, type=int)
+    )
+    return api_response(result['items'], pagination=result['pagination'])
+
+
 @services_bp.route('', methods=['POST'])
 @jwt_required()
 def create_service():
@@ -79,7 +98,6 @@ def create_service():
         resource_id=service.id, resource_name=service.name,
         ip_address=request.remote_addr
     )
-    db.session.commit()
 
     return api_response(service.to_dict(), '服务创建成功'), 201
 
@@ -118,7 +136,6 @@ def update_service(id):
             resource_id=service.id, resource_name=service.name,
             changes=changes, ip_address=request.remote_addr
         )
-        db.session.commit()
 
     return api_response(service.to_dict(), '服务更新成功')
 
@@ -138,7 +155,8 @@ def delete_service(id):
     AuditLog.log_action(
         user=user, action='delete', resource_type='service',
         resource_id=service.id, resource_name=service.name,
-        snapshot=snapshot, ip_address=request.remote_addr
+        snapshot=snapshot, ip_address=request.remote_addr,
+        durable=True
     )
 
     db.session.delete(service)
@@ -162,14 +180,9 @@ def update_service_sort_order():
         return error_response('缺少items参数', 400, 400)
 
     items = data['items']  # [{id: 1, sort_order: 0}, {id: 2, sort_order: 1}, ...]
+    if not isinstance(items, list):
+        return error_response('items必须是数组', 400, 400)
 
-    for item in items:
-        service_id = item.get('id')
-        sort_order = item.get('sort_order')
-        if service_id is not None and sort_order is not None:
-            service = Service.query.get(service_id)
-            if service:
-                service.sort_order = sort_order
-
+    result = update_sort_orders(Service, items, user, request.remote_addr)
     db.session.commit()
-    return api_response(None, '排序更新成功')
+    return api_response(result, '排序更新成功')
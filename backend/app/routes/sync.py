@@ -0,0 +1,27 @@
+"""增量同步路由"""
+from flask import Blueprint, current_app, request
+from flask_jwt_extended import jwt_required
+from app.utils import api_response, error_response
+from app.utils.change_journal import sync_changes
+
+sync_bp = Blueprint('sync', __name__)
+
+
+@sync_bp.route('', methods=['GET'])
+@jwt_required()
+def sync():
+    """获取指定变更序号之后的资源变更（不传 since 时返回全量）"""
+    since = request.args.get('since')
+    if since in (None, ''):
+        since = None
+    else:
+        try:
+            since = int(since)
+        except ValueError:
+            return error_response('since 必须是整数', 400, 400)
+        if since < 0:
+            return error_response('since 必须是整数', 400, 400)
+
+    max_limit = current_app.config.get('SYNC_PAGE_SIZE', 1000)
+    limit = min(max(request.args.get('limit', max_limit, type=int), 1), max_limit)
+    return api_response(sync_changes(since, limit))
@@ -1,12 +1,18 @@
 """用户管理路由"""
-from flask import Blueprint, request
+from flask import Blueprint, current_app, request
 from flask_jwt_extended import jwt_required
 from app.models import User, AuditLog
 from app.extensions import db
 from app.utils import (
     api_response, error_response, get_current_user,
-    admin_required, paginate_query, get_request_json, validate_or_error
+    admin_required, paginate_query, cursor_paginate_query,
+    get_request_json, validate_or_error
 )
+from app.utils.auth_tokens import revoke_tokens
+from app.utils.identity import invalidate_identity
+from app.utils.resource_history import resource_history
+from app.utils.response_cache import cached_response
+from app.utils.table_versions import conditional
 from app.schemas import user_create_schema, user_update_schema
 
 users_bp = Blueprint('users', __name__)
@@ -15,6 +21,7 @@ users_bp = Blueprint('users', __name__)
 @users_bp.route('', methods=['GET'])
 @jwt_required()
 @admin_required
+@conditional(['users'])
 def list_users():
     """获取用户列表"""
     page = request.args.get('page', 1, type=int)
@@ -22,6 +29,8 @@ def list_users():
     role = request.args.get('role')
     is_active = request.args.get('is_active')
     keyword = request.args.get('keyword', '').strip()
+    cursor = request.args.get('cursor')  # 传入时使用游标分页
+    with_total = request.args.get('with_total', 'false').lower() == 'true'
 
     query = User.query
 
@@ -38,8 +47,14 @@ def list_users():
             )
         )
 
-    query = query.order_by(User.created_at.desc())
-    result = paginate_query(query, page, page_size)
+    if cursor is not None:
+        result = cursor_paginate_query(
+            query, [User.created_at, User.id], cursor, page_size,
+            descending=True, with_total=with_total
+        )
+    else:
+        query = query.order_by(User.created_at.desc())
+        result = paginate_query(query, page, page_size)
 
     return api_response(
         [u.to_dict(include_email=True) for u in result['items']],
@@ -50,12 +65,24 @@ def list_users():
 @users_bp.route('/<int:id>', methods=['GET'])
 @jwt_required()
 @admin_required
+@conditional(['users'])
 def get_user(id):
     """获取用户详情"""
     user = User.query.get_or_404(id)
     return api_response(user.to_dict(include_email=True))
 
 
+@users_bp.route('/<int:id>/history', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_user_history(id):
+    """获取用户变更历史（审计日志，按时间倒序，游标分页）"""
+    result = resource_history(
+        'user', id, request.args.get('cursor'), request.args.get('page_size', 20, type=int)
+    )
+    return api_response(result['items'], pagination=result['pagination'])
+
+
 @users_bp.route('', methods=['POST'])
 @jwt_required()
 @admin_required
@@ -81,7 +108,7 @@ def create_user():
         role=data.get('role', 'user'),
         is_active=data.get('is_active', True),
     )
-    user.set_password(data['password'])
+    user.set_password(data['password'], current_app.config['PASSWORD_HASH_METHOD'])
 
     db.session.add(user)
     db.session.commit()
@@ -91,7 +118,6 @@ def create_user():
         resource_id=user.id, resource_name=user.username,
         ip_address=request.remote_addr
     )
-    db.session.commit()
 
     return api_response(user.to_dict(include_email=True), '用户创建成功'), 201
 
@@ -126,10 +152,14 @@ def update_user(id):
         user.is_active = data['is_active']
 
     if 'password' in data and data['password']:
-        user.set_password(data['password'])
+        user.set_password(data['password'], current_app.config['PASSWORD_HASH_METHOD'])
         changes['password'] = {'old': '***', 'new': '***'}
 
+    # 角色、启用状态、密码变化时已签发 Token 中的声明过期
+    if changes.keys() & {'role', 'is_active', 'password'}:
+        revoke_tokens(user.id)
     db.session.commit()
+    invalidate_identity(user.id)
 
     if changes:
         AuditLog.log_action(
@@ -137,7 +167,6 @@ def update_user(id):
             resource_id=user.id, resource_name=user.username,
             changes=changes, ip_address=request.remote_addr
         )
-        db.session.commit()
 
     return api_response(user.to_dict(include_email=True), '用户更新成功')
 
@@ -158,17 +187,22 @@ def delete_user(id):
     AuditLog.log_action(
         user=current_user, action='delete', resource_type='user',
         resource_id=user.id, resource_name=user.username,
-        snapshot=snapshot, ip_address=request.remote_addr
+        snapshot=snapshot, ip_address=request.remote_addr,
+        durable=True
     )
 
+    revoke_tokens(id)
     db.session.delete(user)
     db.session.commit()
+    invalidate_identity(id)
 
     return api_response(None, '用户删除成功')
 
 
 @users_bp.route('/options', methods=['GET'])
 @jwt_required()
+@conditional(['users'])
+@cached_response(['users'])
 def get_user_options():
     """获取用户选项（用于下拉选择）"""
     users = User.query.filter_by(is_active=True).order_by(User.display_name).all()
@@ -1,6 +1,6 @@
 """Marshmallow Schemas for Input Validation"""
 from flask_marshmallow import Marshmallow
-from marshmallow import fields, validate, validates, ValidationError, post_load, EXCLUDE
+from marshmallow import fields, validate, validates, ValidationError, pre_load, post_load, EXCLUDE
 import re
 
 ma = Marshmallow()
@@ -89,6 +89,32 @@ class ServerUpdateSchema(ma.Schema):
 
 # ============== Container Schemas ==============
 
+class PortMappingSchema(ma.Schema):
+    """Schema for a container port mapping"""
+    class Meta:
+        unknown = EXCLUDE
+
+    container_port = fields.Integer(required=True, validate=validate.Range(min=1, max=65535))
+    internal_ip = fields.String(allow_none=True, validate=validate_ip_address)
+    internal_port = fields.Integer(required=True, validate=validate.Range(min=1, max=65535))
+    external_ip = fields.String(allow_none=True, validate=validate_ip_address)
+    external_port = fields.Integer(allow_none=True, validate=validate.Range(min=1, max=65535))
+    protocol = fields.String(load_default='tcp', validate=validate.OneOf(['tcp', 'udp']))
+    description = fields.String(allow_none=True, validate=validate.Length(max=128))
+
+    @pre_load
+    def blank_to_none(self, data, **kwargs):
+        """Treat empty optional inputs from forms as missing values"""
+        if isinstance(data, dict):
+            data = {
+                key: None if value == '' and key in ('internal_ip', 'external_ip', 'external_port') else value
+                for key, value in data.items()
+            }
+            if isinstance(data.get('protocol'), str):
+                data['protocol'] = data['protocol'].lower()
+        return data
+
+
 class ContainerCreateSchema(ma.Schema):
     """Schema for creating a container"""
     class Meta:
@@ -111,6 +137,7 @@ class ContainerCreateSchema(ma.Schema):
         validate=validate.OneOf(['running', 'stopped', 'error'])
     )
     description = fields.String(allow_none=True)
+    port_mappings = fields.List(fields.Nested(PortMappingSchema), load_default=list)
 
 
 class ContainerUpdateSchema(ma.Schema):
@@ -133,6 +160,7 @@ class ContainerUpdateSchema(ma.Schema):
     memory_usage = fields.Float(validate=validate.Range(min=0, max=100))
     status = fields.String(validate=validate.OneOf(['running', 'stopped', 'error']))
     description = fields.String(allow_none=True)
+    port_mappings = fields.List(fields.Nested(PortMappingSchema))
 
 
 # ============== Service Schemas ==============
@@ -322,6 +350,7 @@ server_update_schema = ServerUpdateSchema()
 # Container schemas
 container_create_schema = ContainerCreateSchema()
 container_update_schema = ContainerUpdateSchema()
+port_mappings_schema = PortMappingSchema(many=True)
 
 # Service schemas
 service_create_schema = ServiceCreateSchema()
@@ -1,9 +1,16 @@
 """通用工具函数"""
+import base64
+import json
+from datetime import datetime
 from functools import wraps
-from flask import jsonify, request
-from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from flask import has_request_context, jsonify, request
+from flask_jwt_extended import get_jwt, get_jwt_identity, verify_jwt_in_request
 from app.models import User, AuditLog
 from app.extensions import db
+from app.utils.auth_tokens import CLAIM_ROLE
+from app.utils.identity import get_identity, remember_user
+
+_CURRENT_USER_KEY = '_current_user'
 
 
 def api_response(data=None, message='success', code=0, pagination=None):
@@ -15,7 +22,9 @@ def api_response(data=None, message='success', code=0, pagination=None):
     }
     if pagination:
         response['pagination'] = pagination
-    return jsonify(response)
+    result = jsonify(response)
+    result.api_data = data  # 供审计装饰器读取，避免重新解析响应JSON
+    return result
 
 
 def error_response(message, code=400, http_code=None):
@@ -25,22 +34,41 @@ def error_response(message, code=400, http_code=None):
     return jsonify({'code': code, 'message': message, 'data': None}), http_code
 
 
-def get_current_user():
-    """获取当前登录用户"""
+def current_user_id():
+    """当前登录用户ID（未登录或Token无效时返回 None）"""
     try:
         verify_jwt_in_request()
-        user_id = get_jwt_identity()
-        return User.query.get(int(user_id))
+        return int(get_jwt_identity())
     except Exception:
         return None
 
 
+def get_current_user():
+    """获取当前登录用户（同一请求内只查询一次）"""
+    if has_request_context() and _CURRENT_USER_KEY in request.__dict__:
+        return request.__dict__[_CURRENT_USER_KEY]
+    user_id = current_user_id()
+    try:
+        user = db.session.get(User, user_id) if user_id is not None else None
+    except Exception:
+        user = None
+    if user is not None:
+        remember_user(user)
+    if has_request_context():
+        request.__dict__[_CURRENT_USER_KEY] = user
+    return user
+
+
 def admin_required(fn):
-    """管理员权限装饰器"""
+    """管理员权限装饰器（按 Token 中的角色声明判断；不含声明的旧 Token 按缓存的用户身份判断）"""
     @wraps(fn)
     def wrapper(*args, **kwargs):
-        user = get_current_user()
-        if not user or not user.is_admin:
+        user_id = current_user_id()
+        role = get_jwt().get(CLAIM_ROLE) if user_id is not None else None
+        if user_id is not None and role is None:
+            identity = get_identity(user_id)
+            role = identity.role if identity else None
+        if role != 'admin':
             return error_response('需要管理员权限', 403, 403)
         return fn(*args, **kwargs)
     return wrapper
@@ -68,7 +96,7 @@ def owner_or_admin_required(resource_getter):
 
 
 def log_action(action, resource_type):
-    """审计日志装饰器"""
+    """审计日志装饰器（成功响应后交给审计写入器异步写入）"""
     def decorator(fn):
         @wraps(fn)
         def wrapper(*args, **kwargs):
@@ -84,8 +112,7 @@ def log_action(action, resource_type):
 
             if status_code in [200, 201]:
                 try:
-                    data = response.get_json() if hasattr(response, 'get_json') else {}
-                    resource_data = data.get('data', {})
+                    resource_data = getattr(response, 'api_data', None)
                     resource_id = resource_data.get('id') if isinstance(resource_data, dict) else kwargs.get('id', 0)
                     resource_name = resource_data.get('name') if isinstance(resource_data, dict) else None
 
@@ -98,7 +125,6 @@ def log_action(action, resource_type):
                         ip_address=request.remote_addr,
                         user_agent=request.user_agent.string[:256] if request.user_agent else None,
                     )
-                    db.session.commit()
                 except Exception as e:
                     print(f"Audit log error: {e}")
 
@@ -125,6 +151,107 @@ def paginate_query(query, page=1, page_size=20, max_page_size=100):
     }
 
 
+class InvalidCursorError(ValueError):
+    """分页游标无法解析"""
+
+
+def encode_cursor(values):
+    """将排序键值编码为不透明游标"""
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def _cursor_value(column, value):
+    """按列的 Python 类型校验并还原单个游标值，类型不符时抛出 TypeError
+
+    只接受字符串和数字：seek 条件无法与 NULL 比较大小，None 同样拒绝。
+    """
+    if not isinstance(value, (str, int, float)) or isinstance(value, bool):
+        raise TypeError(value)
+    python_type = column.type.python_type
+    if python_type is datetime:
+        if not isinstance(value, str):
+            raise TypeError(value)
+        return datetime.fromisoformat(value)
+    if python_type is float and isinstance(value, int):
+        return float(value)
+    if not isinstance(value, python_type):
+        raise TypeError(value)
+    return value
+
+
+def decode_cursor(cursor, columns):
+    """解析游标，按列类型校验并还原排序键值"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        if not isinstance(payload, list) or len(payload) != len(columns):
+            raise InvalidCursorError(cursor)
+        return [_cursor_value(column, value) for column, value in zip(columns, payload)]
+    except (ValueError, TypeError, NotImplementedError) as e:
+        raise InvalidCursorError(cursor) from e
+
+
+def _seek_condition(columns, values, descending):
+    """构造 (a, b, c) 越过游标位置的条件：a<va OR (a=va AND b<vb) OR ..."""
+    conditions = []
+    for i, (column, value) in enumerate(zip(columns, values)):
+        step = column < value if descending else column > value
+        prefix = [c == v for c, v in zip(columns[:i], values[:i])]
+        conditions.append(db.and_(*prefix, step))
+    return db.or_(*conditions)
+
+
+def cursor_paginate_query(query, columns, cursor=None, page_size=20, max_page_size=100,
+                          descending=False, with_total=False):
+    """
+    游标(keyset)分页查询
+
+    按 columns 排序并从游标位置向后seek，不使用OFFSET；
+    默认不执行 COUNT(*)，需要总数时传 with_total=True。
+
+    Args:
+        query: 未排序的查询
+        columns: 排序键列，最后一列须唯一（通常为主键），如 [Server.created_at, Server.id]
+        cursor: 上一页返回的 next_cursor，为空表示第一页
+        descending: 是否倒序
+        with_total: 是否统计总数
+
+    Returns:
+        dict: {'items': [...], 'pagination': {...}}
+
+    Raises:
+        InvalidCursorError: 游标无法解析
+    """
+    page_size = min(max(1, page_size), max_page_size)
+
+    total = query.order_by(None).count() if with_total else None
+
+    if cursor:
+        values = decode_cursor(cursor, columns)
+        query = query.filter(_seek_condition(columns, values, descending))
+
+    order = [c.desc() if descending else c.asc() for c in columns]
+    rows = query.order_by(*order).limit(page_size + 1).all()
+
+    has_more = len(rows) > page_size
+    items = rows[:page_size]
+    next_cursor = None
+    if has_more:
+        last = items[-1]
+        next_cursor = encode_cursor([getattr(last, c.key) for c in columns])
+
+    pagination = {
+        'page_size': page_size,
+        'next_cursor': next_cursor,
+        'has_more': has_more,
+    }
+    if with_total:
+        pagination['total'] = total
+    return {'items': items, 'pagination': pagination}
+
+
 def get_request_json():
     """获取请求JSON数据"""
     return request.get_json() or {}
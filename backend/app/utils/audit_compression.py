@@ -0,0 +1,70 @@
+"""审计日志压缩迁移与存储统计
+
+按ID分批读取 changes / snapshot 的存储值（不经过列类型解压），把未压缩的旧数据改写为压缩格式，
+同时统计每列的存储字节数与原文字节数。覆盖活动表与模拟分区表。
+"""
+from app.extensions import db
+from app.models import AuditLog
+from app.models.compressed_text import compress_text, decompress_text, is_compressed
+from app.utils.audit_partitions import partition_tables
+
+BATCH_SIZE = 1000
+COLUMNS = ('changes', 'snapshot')
+
+
+def _new_stats():
+    return {column: {'rows': 0, 'compressed': 0, 'stored_bytes': 0, 'compressed_bytes': 0,
+                     'original_bytes': 0} for column in COLUMNS}
+
+
+def compress_audit_logs(batch_size=BATCH_SIZE, dry_run=False):
+    """
+    压缩已有审计日志的 changes / snapshot，并返回存储统计
+
+    Args:
+        batch_size: 每批处理的行数（每批一个事务）
+        dry_run: 只统计不写入
+
+    Returns:
+        dict: {列名: {rows: 非空行数, compressed: 已压缩行数, stored_bytes: 当前存储字节,
+                     compressed_bytes: 压缩后存储字节, original_bytes: 原文字节}}
+    """
+    stats = _new_stats()
+    for table in [AuditLog.__table__, *partition_tables()]:
+        # type_coerce 为 Text：读取存储值本身，不触发解压
+        raw_columns = [db.type_coerce(table.c[column], db.Text).label(column) for column in COLUMNS]
+        update = table.update().where(table.c.id == db.bindparam('_id')).values(
+            {column: db.bindparam(f'new_{column}', type_=db.Text) for column in COLUMNS}
+        )
+        last_id = 0
+        while True:
+            rows = db.session.execute(
+                db.select(table.c.id, *raw_columns)
+                .where(table.c.id > last_id).order_by(table.c.id).limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            params = []
+            for row in rows:
+                values = {'_id': row.id}
+                for column in COLUMNS:
+                    stored = getattr(row, column)
+                    compressed = compress_text(stored)
+                    values[f'new_{column}'] = compressed
+                    if stored is None:
+                        continue
+                    column_stats = stats[column]
+                    column_stats['rows'] += 1
+                    column_stats['compressed'] += is_compressed(compressed)
+                    column_stats['stored_bytes'] += len(stored.encode('utf-8'))
+                    column_stats['compressed_bytes'] += len(compressed.encode('utf-8'))
+                    column_stats['original_bytes'] += len(decompress_text(stored).encode('utf-8'))
+                if any(values[f'new_{column}'] != getattr(row, column) for column in COLUMNS):
+                    params.append(values)
+
+            if params and not dry_run:
+                db.session.execute(update, params)
+                db.session.commit()
+    return stats
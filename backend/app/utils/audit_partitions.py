@@ -0,0 +1,363 @@
+"""审计日志按月分区与归档
+
+- MySQL: 原生 RANGE 分区（TO_DAYS(created_at)，每月一个分区 pYYYYMM，另有 pmax 兜底），
+  查询带时间条件时由 MySQL 自动裁剪分区。已有表通过
+  `flask maintain-audit-logs --enable-partitioning` 转换：分区表不支持外键，
+  user_id 外键约束被移除，主键改为 (id, created_at)
+- 其他数据库（SQLite）: 模拟分区。audit_logs 作为活动表接收写入，维护任务把已结束月份的行
+  移入 audit_logs_pYYYYMM 表；查询只联合（UNION ALL）与时间范围相交的分区表，
+  筛选条件下推到各分区表，按各自索引有序合并
+- 保留期（AUDIT_RETENTION_MONTHS）之前的分区导出为 gzip 压缩的 NDJSON 文件后删除
+"""
+import gzip
+import json
+import os
+from datetime import datetime
+from functools import lru_cache
+from sqlalchemy import inspect, text
+from sqlalchemy.orm import aliased, undefer_group
+from app.extensions import db
+from app.models import AuditLog
+
+YIELD_PER = 1000
+
+_TABLE = AuditLog.__table__
+_COLUMNS = [column.name for column in _TABLE.columns]
+_PREFIX = f'{_TABLE.name}_p'
+_metadata = db.MetaData()
+
+
+def _month_start(value):
+    return datetime(value.year, value.month, 1)
+
+
+def _add_months(month, count):
+    year, index = divmod(month.year * 12 + month.month - 1 + count, 12)
+    return datetime(year, index + 1, 1)
+
+
+def retention_cutoff(retention_months, now=None):
+    """保留期起点（当前月之前 retention_months 个整月），早于该时间的审计日志会被归档"""
+    return _add_months(_month_start(now or datetime.utcnow()), -retention_months)
+
+
+def partition_name(month):
+    return f'p{month:%Y%m}'
+
+
+def _parse_month(name):
+    try:
+        return datetime.strptime(name[-6:], '%Y%m')
+    except ValueError:
+        return None
+
+
+def _is_mysql():
+    return db.engine.dialect.name == 'mysql'
+
+
+def partition_mode():
+    """native: MySQL 原生分区；none: MySQL 未分区；emulated: 其他数据库的模拟分区"""
+    if not _is_mysql():
+        return 'emulated'
+    return 'native' if _mysql_partitions() else 'none'
+
+
+def list_partitions():
+    """已有分区 [(月份, 分区名)]，按月份升序（不含 MySQL 的 pmax）"""
+    if _is_mysql():
+        return _mysql_partitions()
+    partitions = []
+    for table_name in inspect(db.engine).get_table_names():
+        if table_name.startswith(_PREFIX):
+            month = _parse_month(table_name)
+            if month:
+                partitions.append((month, table_name[len(_TABLE.name) + 1:]))
+    return sorted(partitions)
+
+
+# ---------- 查询 ----------
+
+def _partition_table(name, create=False):
+    """模拟分区表（列与索引同 audit_logs，不含外键）"""
+    table_name = f'{_TABLE.name}_{name}'
+    table = _metadata.tables.get(table_name)
+    if table is None:
+        table = db.Table(table_name, _metadata, *[
+            db.Column(column.name, column.type, primary_key=column.primary_key,
+                      nullable=column.nullable, autoincrement=False)
+            for column in _TABLE.columns
+        ])
+        for index in _TABLE.indexes:
+            db.Index(index.name.replace(_TABLE.name, table_name, 1),
+                     *[table.c[column.name] for column in index.columns])
+    if create:
+        table.create(db.session.connection(), checkfirst=True)
+    return table
+
+
+def _select_all(table):
+    return db.select(*[table.c[name] for name in _COLUMNS])
+
+
+def audit_log_entity(start=None, end=None):
+    """
+    返回用于查询审计日志的实体
+
+    模拟分区下为活动表与时间范围内分区表的 UNION ALL 别名（查询结果仍是 AuditLog 对象，
+    可照常筛选、排序与游标分页）；MySQL 或无相交分区时直接返回 AuditLog。
+    """
+    if _is_mysql():
+        return AuditLog
+    names = tuple(
+        name for month, name in list_partitions()
+        if (end is None or month <= end) and (start is None or _add_months(month, 1) > start)
+    )
+    return _union_entity(names) if names else AuditLog
+
+
+@lru_cache(maxsize=64)
+def _union_entity(names):
+    # 复用同一组分区的别名实体：列适配结果缓存在实体上，避免每次请求重新遍历联合查询
+    tables = [_TABLE, *[_partition_table(name) for name in names]]
+    union = db.union_all(*[_select_all(table) for table in tables])
+    return aliased(AuditLog, union.subquery(_TABLE.name))
+
+
+def partition_tables():
+    """模拟分区表列表（MySQL 返回空列表）"""
+    if _is_mysql():
+        return []
+    return [_partition_table(name) for _, name in list_partitions()]
+
+
+def find_audit_log(log_id):
+    """
+    按ID查找审计日志（同时加载 changes / snapshot），
+    活动表中不存在时依次查找模拟分区表（由新到旧）
+    """
+    log = db.session.get(AuditLog, log_id, options=[undefer_group('details')])
+    if log is not None or _is_mysql():
+        return log
+    for _, name in reversed(list_partitions()):
+        entity = aliased(AuditLog, _partition_table(name), adapt_on_names=True)
+        log = db.session.query(entity).options(undefer_group('details')).filter(
+            entity.id == log_id
+        ).first()
+        if log is not None:
+            return log
+    return None
+
+
+# ---------- 维护 ----------
+
+def ensure_indexes():
+    """为已有的 audit_logs 表补建模型中声明的索引（create_all 不会修改已存在的表）"""
+    existing = {index['name'] for index in inspect(db.engine).get_indexes(_TABLE.name)}
+    created = []
+    for index in _TABLE.indexes:
+        if index.name not in existing:
+            index.create(db.engine)
+            created.append(index.name)
+    return created
+
+
+def _mysql_partitions():
+    rows = db.session.execute(text(
+        'SELECT PARTITION_NAME FROM information_schema.PARTITIONS '
+        'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND PARTITION_NAME IS NOT NULL'
+    ), {'table': _TABLE.name}).scalars()
+    partitions = [(_parse_month(name), name) for name in rows if name != 'pmax']
+    return sorted((month, name) for month, name in partitions if month)
+
+
+def _mysql_partition_clause(months):
+    return ', '.join(
+        f"PARTITION {partition_name(month)} VALUES LESS THAN "
+        f"(TO_DAYS('{_add_months(month, 1):%Y-%m-%d}'))"
+        for month in months
+    )
+
+
+def enable_partitioning(ahead=3, now=None):
+    """把 MySQL 上的 audit_logs 转换为按月分区表（会重建整张表，应在维护窗口执行）"""
+    if not _is_mysql():
+        raise RuntimeError('原生分区仅支持MySQL')
+    if _mysql_partitions():
+        return []
+    current = _month_start(now or datetime.utcnow())
+    oldest = db.session.query(db.func.min(AuditLog.created_at)).scalar()
+    month = _month_start(oldest) if oldest and oldest < current else current
+    months = []
+    while month <= _add_months(current, ahead):
+        months.append(month)
+        month = _add_months(month, 1)
+
+    foreign_keys = db.session.execute(text(
+        'SELECT CONSTRAINT_NAME FROM information_schema.REFERENTIAL_CONSTRAINTS '
+        'WHERE CONSTRAINT_SCHEMA = DATABASE() AND TABLE_NAME = :table'
+    ), {'table': _TABLE.name}).scalars().all()
+    for name in foreign_keys:
+        db.session.execute(text(f'ALTER TABLE {_TABLE.name} DROP FOREIGN KEY `{name}`'))
+    # 分区键必须包含在主键中，且不能为空
+    db.session.execute(text(
+        f'UPDATE {_TABLE.name} SET created_at = UTC_TIMESTAMP() WHERE created_at IS NULL'
+    ))
+    db.session.execute(text(
+        f'ALTER TABLE {_TABLE.name} MODIFY created_at DATETIME NOT NULL, '
+        f'DROP PRIMARY KEY, ADD PRIMARY KEY (id, created_at)'
+    ))
+    db.session.execute(text(
+        f'ALTER TABLE {_TABLE.name} PARTITION BY RANGE (TO_DAYS(created_at)) '
+        f'({_mysql_partition_clause(months)}, PARTITION pmax VALUES LESS THAN MAXVALUE)'
+    ))
+    db.session.commit()
+    return [partition_name(month) for month in months]
+
+
+def add_future_partitions(ahead=3, now=None):
+    """从 pmax 中拆分出未来 ahead 个月的分区（MySQL 原生分区）"""
+    partitions = _mysql_partitions()
+    current = _month_start(now or datetime.utcnow())
+    month = _add_months(partitions[-1][0], 1) if partitions else current
+    months = []
+    while month <= _add_months(current, ahead):
+        months.append(month)
+        month = _add_months(month, 1)
+    if months:
+        db.session.execute(text(
+            f'ALTER TABLE {_TABLE.name} REORGANIZE PARTITION pmax INTO '
+            f'({_mysql_partition_clause(months)}, PARTITION pmax VALUES LESS THAN MAXVALUE)'
+        ))
+        db.session.commit()
+    return [partition_name(month) for month in months]
+
+
+def rotate_partitions(now=None):
+    """
+    把活动表中已结束月份的行移入对应的模拟分区表（每月一个事务）
+
+    Returns:
+        dict: {分区名: 移动行数}
+    """
+    current = _month_start(now or datetime.utcnow())
+    oldest = db.session.query(db.func.min(AuditLog.created_at)).filter(
+        AuditLog.created_at < current
+    ).scalar()
+    if oldest is None:
+        return {}
+    # 保留ID最大的一行：SQLite 的 ROWID 按现存最大值递增，清空后会重新从小值分配
+    keep_id = db.session.query(db.func.max(AuditLog.id)).scalar()
+
+    moved = {}
+    month = _month_start(oldest)
+    while month < current:
+        next_month = _add_months(month, 1)
+        condition = db.and_(_TABLE.c.created_at >= month, _TABLE.c.created_at < next_month,
+                            _TABLE.c.id != keep_id)
+        count = db.session.execute(
+            db.select(db.func.count()).select_from(_TABLE).where(condition)
+        ).scalar()
+        if count:
+            name = partition_name(month)
+            table = _partition_table(name, create=True)
+            db.session.execute(table.insert().from_select(_COLUMNS, _select_all(_TABLE).where(condition)))
+            db.session.execute(_TABLE.delete().where(condition))
+            db.session.commit()
+            moved[name] = count
+        month = next_month
+    return moved
+
+
+def _json_default(value):
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+
+def _write_archive(path, rows):
+    """逐行写入 gzip NDJSON（先写临时文件，完成后再改名），返回行数"""
+    count = 0
+    temp_path = f'{path}.tmp'
+    with gzip.open(temp_path, 'wt', encoding='utf-8') as output:
+        for row in rows:
+            output.write(json.dumps(dict(row._mapping), ensure_ascii=False, default=_json_default) + '\n')
+            count += 1
+    os.replace(temp_path, path)
+    return count
+
+
+def archive_expired(retention_months, archive_dir, now=None):
+    """
+    归档并删除保留期之前的分区（保留当前月及之前 retention_months 个整月）
+
+    MySQL 未分区时按月导出并删除过期行。
+
+    Returns:
+        dict: {分区名: {'rows': 行数, 'file': 归档文件}}
+    """
+    cutoff = retention_cutoff(retention_months, now)
+    mode = partition_mode()
+    stamp = datetime.utcnow().strftime('%Y%m%d%H%M%S')
+    os.makedirs(archive_dir, exist_ok=True)
+
+    if mode == 'none':
+        oldest = db.session.query(db.func.min(AuditLog.created_at)).scalar()
+        months = []
+        month = _month_start(oldest) if oldest else cutoff
+        while month < cutoff:
+            months.append((month, partition_name(month)))
+            month = _add_months(month, 1)
+    else:
+        months = [(month, name) for month, name in list_partitions() if month < cutoff]
+
+    archived = {}
+    for month, name in months:
+        if mode == 'native':
+            statement = text(
+                f'SELECT * FROM {_TABLE.name} PARTITION ({name})'
+            ).columns(*_TABLE.columns)  # 按列类型解压 changes / snapshot
+        elif mode == 'none':
+            condition = db.and_(_TABLE.c.created_at >= month,
+                                _TABLE.c.created_at < _add_months(month, 1))
+            statement = _select_all(_TABLE).where(condition)
+        else:
+            statement = _select_all(_partition_table(name))
+
+        path = os.path.join(archive_dir, f'{_TABLE.name}_{name}_{stamp}.ndjson.gz')
+        rows = db.session.execute(statement.execution_options(yield_per=YIELD_PER))
+        count = _write_archive(path, rows)
+        rows.close()
+
+        # 归档文件落盘后再删除数据
+        if mode == 'native':
+            db.session.execute(text(f'ALTER TABLE {_TABLE.name} DROP PARTITION {name}'))
+        elif mode == 'none':
+            db.session.execute(_TABLE.delete().where(condition))
+        else:
+            _partition_table(name).drop(db.session.connection())
+        db.session.commit()
+        if count or mode != 'none':
+            archived[name] = {'rows': count, 'file': path}
+        else:
+            os.remove(path)
+    return archived
+
+
+def maintain(retention_months=12, archive_dir='audit_archive', ahead=3,
+             enable=False, now=None):
+    """
+    审计日志维护任务：补建索引、创建/轮转分区、归档过期分区
+
+    Returns:
+        dict: {'mode', 'indexes', 'partitions', 'rotated', 'archived'}
+    """
+    stats = {'indexes': ensure_indexes(), 'partitions': [], 'rotated': {}}
+    if _is_mysql():
+        if enable and partition_mode() == 'none':
+            stats['partitions'] = enable_partitioning(ahead, now)
+        elif partition_mode() == 'native':
+            stats['partitions'] = add_future_partitions(ahead, now)
+    else:
+        stats['rotated'] = rotate_partitions(now)
+    stats['mode'] = partition_mode()
+    stats['archived'] = archive_expired(retention_months, archive_dir, now)
+    return stats
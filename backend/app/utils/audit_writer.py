@@ -0,0 +1,327 @@
+"""异步审计日志写入器
+
+请求线程只把审计日志行放入有界队列，由后台线程批量 INSERT 并提交，
+请求延迟中不再包含额外的审计提交：
+- 后台线程在首次提交时启动（按进程启动，兼容预加载后 fork 的工作进程）
+- 每批最多 AUDIT_BATCH_SIZE 条，首条入队后最多等待 AUDIT_FLUSH_INTERVAL 秒凑批
+- 队列满（AUDIT_QUEUE_SIZE）且等待超时时退化为同步写入，不丢弃日志
+- 写入失败时按 AUDIT_WRITE_RETRIES 次指数退避重试；仍失败时逐条写入（跳过个别无法写入的行），
+  数据库不可用或个别行写不进时追加到 AUDIT_SPILL_DIR 下本进程的溢出文件（NDJSON）。
+  之后写入成功时重新写入溢出文件（本进程的及已退出进程遗留的），写不进的行保留在文件中
+- 进程退出时（atexit）写完队列中剩余的日志
+- AUDIT_ASYNC=False 时在当前会话中同步写入并提交（测试环境）
+
+需要与业务变更同事务落库的日志（删除操作）使用 AuditLog.log_action(..., durable=True)，
+不经过本写入器。
+"""
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from flask import current_app, has_app_context
+from sqlalchemy import exc
+from app.extensions import db
+from app.models import AuditLog
+
+READ_FLUSH_TIMEOUT = 2.0  # 读取审计日志前等待本进程排队日志写入的最长时间（秒）
+SPILL_REPLAY_INTERVAL = 30.0  # 两次重写溢出文件的最短间隔（秒）
+SPILL_PREFIX = 'audit_spill_'
+
+_STOP = object()
+
+
+class _FlushMarker:
+    """flush() 放入队列的标记，写入器处理到该标记时通知等待方"""
+
+    def __init__(self):
+        self.done = threading.Event()
+
+
+class AuditWriter:
+    """审计日志批量写入器"""
+
+    def __init__(self, app, enabled=True, batch_size=200, flush_interval=0.5,
+                 queue_size=10000, enqueue_timeout=0.5, shutdown_timeout=5.0,
+                 retries=3, retry_backoff=0.5, spill_dir=None):
+        self.app = app
+        self.enabled = enabled
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue_size = queue_size
+        self.enqueue_timeout = enqueue_timeout
+        self.shutdown_timeout = shutdown_timeout
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.spill_dir = spill_dir
+        self._lock = threading.Lock()
+        self._spill_lock = threading.Lock()
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._replayed_at = None
+        self.written = 0
+        self.retried = 0
+        self.spilled = 0
+        self.replayed = 0
+        self.failed = 0  # 既未写入数据库也未能写入溢出文件的行
+
+    # ---------- 请求线程 ----------
+
+    def submit(self, row):
+        """提交一条审计日志行（AuditLog 表字段字典）"""
+        if not self.enabled:
+            db.session.execute(AuditLog.__table__.insert(), [row])
+            db.session.commit()
+            self.written += 1
+            return
+        self._ensure_started()
+        try:
+            self._queue.put(row, timeout=self.enqueue_timeout)
+        except queue.Full:
+            # 缓冲区已满：在独立上下文中同步写入，不影响调用方会话
+            self._write([row])
+
+    def flush(self, timeout=None):
+        """等待此前提交的日志全部写入，返回是否在超时前完成"""
+        if not self.enabled or self._thread is None or not self._thread.is_alive():
+            return True
+        marker = _FlushMarker()
+        try:
+            self._queue.put(marker, timeout=timeout)
+        except queue.Full:
+            return False
+        return marker.done.wait(timeout)
+
+    def close(self):
+        """停止后台线程，写完队列中剩余的日志"""
+        thread = self._thread
+        if thread is None or not thread.is_alive() or self._pid != os.getpid():
+            return
+        self._queue.put(_STOP)
+        thread.join(self.shutdown_timeout)
+
+    def _ensure_started(self):
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            # fork 后父进程的线程不会被继承，重建队列与线程
+            self._queue = queue.Queue(maxsize=self.queue_size)
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+            self._thread.start()
+
+    # ---------- 后台线程 ----------
+
+    def _run(self):
+        self._replay_spill()  # 上次运行遗留的溢出文件
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            batch, markers = [], []
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is _STOP:
+                    stopping = True
+                elif isinstance(item, _FlushMarker):
+                    markers.append(item)
+                else:
+                    batch.append(item)
+                if stopping or markers or len(batch) >= self.batch_size:
+                    break
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if stopping:
+                # 退出前取完队列中剩余的日志
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if isinstance(item, _FlushMarker):
+                        markers.append(item)
+                    elif item is not _STOP:
+                        batch.append(item)
+            for start in range(0, len(batch), self.batch_size):
+                self._write(batch[start:start + self.batch_size])
+            for marker in markers:
+                marker.done.set()
+            if batch and (self._replayed_at is None
+                          or time.monotonic() - self._replayed_at > SPILL_REPLAY_INTERVAL):
+                self._replay_spill()
+
+    def _write(self, rows):
+        """写入一批日志：数据库不可用时退避重试，再逐条写入，写不进的行落盘"""
+        delay = self.retry_backoff
+        for attempt in range(self.retries + 1):
+            error = self._insert(rows)
+            if error is None:
+                self.written += len(rows)
+                return
+            if _row_error(error) or attempt == self.retries:
+                break
+            self.retried += 1
+            time.sleep(delay)
+            delay *= 2
+        self.app.logger.warning('审计日志批量写入失败（%d 条）: %s', len(rows), error)
+        left = self._insert_each(rows) if _row_error(error) else rows
+        if left:
+            self._spill(left)
+
+    def _insert(self, rows):
+        """在独立上下文中用一个事务写入 rows，返回异常（成功时为 None）"""
+        with self.app.app_context():
+            try:
+                db.session.execute(AuditLog.__table__.insert(), rows)
+                db.session.commit()
+                return None
+            except Exception as e:
+                db.session.rollback()
+                return e
+
+    def _insert_each(self, rows):
+        """逐条写入，返回未写入的行（数据库不可用时其余行不再尝试）"""
+        left = []
+        for index, row in enumerate(rows):
+            error = self._insert([row])
+            if error is None:
+                self.written += 1
+            elif _row_error(error):
+                self.app.logger.warning('审计日志行写入失败: %s', error)
+                left.append(row)
+            else:
+                return left + rows[index:]
+        return left
+
+    # ---------- 溢出文件 ----------
+
+    def _spill_path(self, suffix='ndjson'):
+        return os.path.join(self.spill_dir, f'{SPILL_PREFIX}{os.getpid()}.{suffix}')
+
+    def _spill(self, rows):
+        """追加到本进程的溢出文件（无法写入文件时才丢弃并记录）"""
+        if not self.spill_dir:
+            self.failed += len(rows)
+            self.app.logger.error('审计日志写入失败且未配置溢出目录，丢弃 %d 条', len(rows))
+            return
+        try:
+            with self._spill_lock:
+                os.makedirs(self.spill_dir, exist_ok=True)
+                with open(self._spill_path(), 'a', encoding='utf-8') as f:
+                    f.writelines(
+                        json.dumps(dict(row, created_at=row['created_at'].isoformat()),
+                                   ensure_ascii=False) + '\n'
+                        for row in rows
+                    )
+                    f.flush()
+                    os.fsync(f.fileno())
+            self.spilled += len(rows)
+            self.app.logger.warning('审计日志已写入溢出文件 %s（%d 条）', self._spill_path(), len(rows))
+        except (OSError, TypeError):
+            self.failed += len(rows)
+            self.app.logger.exception('审计日志写入溢出文件失败，丢弃 %d 条', len(rows))
+
+    def _claim_spill_files(self):
+        """认领本进程及已退出进程的溢出文件（重命名后由本进程独占）"""
+        try:
+            names = sorted(os.listdir(self.spill_dir))
+        except FileNotFoundError:
+            return []
+        claimed = []
+        for name in names:
+            if not name.startswith(SPILL_PREFIX):
+                continue
+            try:
+                owner = int(name[len(SPILL_PREFIX):].split('.', 1)[0])
+            except ValueError:
+                continue
+            if owner != os.getpid() and _process_alive(owner):
+                continue
+            target = self._spill_path(f'{time.time_ns()}.replaying')
+            try:
+                os.rename(os.path.join(self.spill_dir, name), target)
+            except FileNotFoundError:  # 已被其他进程认领
+                continue
+            claimed.append(target)
+        return claimed
+
+    def _replay_spill(self):
+        """重新写入溢出文件中的日志，写不进的行重新落盘"""
+        self._replayed_at = time.monotonic()
+        if not self.spill_dir:
+            return
+        with self._spill_lock:
+            paths = self._claim_spill_files()
+        for path in paths:
+            with open(path, encoding='utf-8') as f:
+                rows = [json.loads(line) for line in f if line.strip()]
+            for row in rows:
+                row['created_at'] = datetime.fromisoformat(row['created_at'])
+            left = []
+            for start in range(0, len(rows), self.batch_size):
+                chunk = rows[start:start + self.batch_size]
+                error = self._insert(chunk)
+                if error is None:
+                    self.written += len(chunk)
+                else:
+                    left += self._insert_each(chunk) if _row_error(error) else chunk
+            self.replayed += len(rows) - len(left)
+            if left:
+                self.spilled -= len(left)  # 重新落盘时再次计入
+                self._spill(left)
+            os.remove(path)
+            self.app.logger.info('已重新写入溢出的审计日志 %d 条，剩余 %d 条',
+                                 len(rows) - len(left), len(left))
+
+    def stats(self):
+        """写入统计：spilled 为累计写入溢出文件的行数，replayed 为其中已重新写入数据库的行数"""
+        return {
+            'written': self.written, 'retried': self.retried, 'spilled': self.spilled,
+            'replayed': self.replayed, 'failed': self.failed,
+            'queued': self._queue.qsize() if self._queue is not None else 0,
+        }
+
+
+def _row_error(error):
+    """是否为个别行的数据错误（其余行可以写入），否则视为数据库暂不可用"""
+    return isinstance(error, (exc.IntegrityError, exc.DataError))
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def init_audit_writer(app):
+    """为应用创建审计日志写入器，进程退出时写完剩余日志"""
+    writer = AuditWriter(
+        app,
+        enabled=app.config.get('AUDIT_ASYNC', True),
+        batch_size=app.config.get('AUDIT_BATCH_SIZE', 200),
+        flush_interval=app.config.get('AUDIT_FLUSH_INTERVAL', 0.5),
+        queue_size=app.config.get('AUDIT_QUEUE_SIZE', 10000),
+        retries=app.config.get('AUDIT_WRITE_RETRIES', 3),
+        retry_backoff=app.config.get('AUDIT_RETRY_BACKOFF', 0.5),
+        spill_dir=os.path.join(app.instance_path, app.config.get('AUDIT_SPILL_DIR', 'audit_spill')),
+    )
+    app.extensions['audit_writer'] = writer
+    atexit.register(writer.close)
+
+
+def get_audit_writer():
+    """当前应用的审计日志写入器（无应用上下文时返回 None）"""
+    if not has_app_context():
+        return None
+    return current_app.extensions.get('audit_writer')
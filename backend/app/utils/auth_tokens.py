@@ -0,0 +1,179 @@
+"""JWT 声明与吊销
+
+- 签发 Token 时写入 role / active / gen 声明：admin_required 直接按 role 判断，不查询用户；
+  gen 为用户当前的 Token 代数（token_revocations，未吊销过为 0）
+- 修改角色、禁用、修改密码、删除用户时 revoke_tokens 在同一事务中把代数加一，
+  此前签发的 Token（含刷新 Token）全部失效，声明因此不会比数据库中的状态更旧
+- 校验 Token 时查进程内的代数表（只含吊销过的用户）：每 JWT_DENYLIST_REFRESH_SECONDS 秒按
+  table_versions 中 token_revocations 的版本号确认一次，版本变化时重新加载；
+  本进程的吊销提交后立即生效，其他工作进程最多延迟该时长
+- 签发时的代数从数据库读取，不受本进程代数表刷新延迟影响
+- 带 scope 声明的短期 Token（如事件流 Token）只能用于对应的接口，不能当作普通访问 Token
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app, has_app_context, has_request_context, request
+from flask_jwt_extended import create_access_token, create_refresh_token
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.extensions import db
+from app.models import TokenRevocation
+from app.utils.table_versions import get_versions, table_ready
+
+CLAIM_ROLE = 'role'
+CLAIM_ACTIVE = 'active'
+CLAIM_GENERATION = 'gen'
+CLAIM_SCOPE = 'scope'
+SCOPE_EVENTS = 'events'
+# scope -> 可使用该 Token 的接口（endpoint）
+SCOPE_ENDPOINTS = {SCOPE_EVENTS: 'events.events'}
+_PENDING_KEY = 'pending_revocations'
+
+
+class TokenDenylist:
+    """进程内的用户 Token 代数表"""
+
+    def __init__(self, refresh_seconds=5):
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._generations = {}  # user_id -> generation
+        self._version = None
+        self._checked_at = None
+
+    def generation(self, user_id):
+        """用户当前的 Token 代数"""
+        self.ensure_fresh()
+        return self._generations.get(user_id, 0)
+
+    def ensure_fresh(self):
+        """距上次确认超过刷新间隔时按版本号确认，变化时重新加载"""
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.refresh_seconds:
+            return
+        with self._lock:
+            if self._checked_at is not None and now - self._checked_at < self.refresh_seconds:
+                return
+            if table_ready(db.session.connection(), TokenRevocation.__tablename__):
+                versions = get_versions([TokenRevocation.__tablename__])
+                version = versions[TokenRevocation.__tablename__][0] if versions else None
+                # table_versions 表不存在时每次都重新加载
+                if version is None or version != self._version or self._checked_at is None:
+                    rows = db.session.execute(
+                        db.select(TokenRevocation.user_id, TokenRevocation.generation)
+                    )
+                    self._generations = {user_id: generation for user_id, generation in rows}
+                    self._version = version
+            self._checked_at = now
+
+    def apply(self, revoked):
+        """本进程提交的吊销立即生效 {user_id: generation}"""
+        with self._lock:
+            for user_id, generation in revoked.items():
+                self._generations[user_id] = max(self._generations.get(user_id, 0), generation)
+
+
+def _current_generation(user_id):
+    if not table_ready(db.session.connection(), TokenRevocation.__tablename__):
+        return 0
+    record = db.session.get(TokenRevocation, user_id)
+    return record.generation if record else 0
+
+
+def issue_tokens(user, refresh=True):
+    """
+    按用户当前状态签发 Token
+
+    Returns:
+        dict: {'access_token', 'refresh_token'}（refresh=False 时只有 access_token）
+    """
+    claims = {
+        CLAIM_ROLE: user.role,
+        CLAIM_ACTIVE: bool(user.is_active),
+        CLAIM_GENERATION: _current_generation(user.id),
+    }
+    tokens = {'access_token': create_access_token(identity=str(user.id), additional_claims=claims)}
+    if refresh:
+        tokens['refresh_token'] = create_refresh_token(identity=str(user.id), additional_claims=claims)
+    return tokens
+
+
+def issue_scoped_token(identity, claims, scope, seconds):
+    """
+    按当前 Token 的声明签发只能用于 scope 对应接口的短期 Token
+
+    Args:
+        claims: 当前 Token 的声明（沿用 role / active / gen，吊销时一并失效）
+        seconds: 有效期（秒）
+    """
+    return create_access_token(
+        identity=identity,
+        additional_claims={
+            CLAIM_ROLE: claims.get(CLAIM_ROLE),
+            CLAIM_ACTIVE: claims.get(CLAIM_ACTIVE),
+            CLAIM_GENERATION: claims.get(CLAIM_GENERATION, 0),
+            CLAIM_SCOPE: scope,
+        },
+        expires_delta=timedelta(seconds=seconds),
+    )
+
+
+def revoke_tokens(user_id):
+    """吊销用户此前签发的全部 Token（写入当前事务，提交后生效），返回新的代数"""
+    if not table_ready(db.session.connection(), TokenRevocation.__tablename__):
+        current_app.logger.warning('token_revocations 表不存在，无法吊销 Token，请执行 flask init-db')
+        return 0
+    record = db.session.get(TokenRevocation, user_id)
+    if record is None:
+        record = TokenRevocation(user_id=user_id, generation=1)
+        db.session.add(record)
+    else:
+        record.generation += 1
+        record.revoked_at = datetime.utcnow()
+    generation = record.generation
+    db.session.info.setdefault(_PENDING_KEY, {})[user_id] = generation
+    return generation
+
+
+def is_token_revoked(jwt_header, jwt_payload):
+    """token_in_blocklist_loader: 代数小于用户当前代数的 Token 已吊销"""
+    denylist = current_app.extensions.get('token_denylist')
+    if denylist is None:
+        return False
+    user_id = int(jwt_payload[current_app.config['JWT_IDENTITY_CLAIM']])
+    return jwt_payload.get(CLAIM_GENERATION, 0) < denylist.generation(user_id)
+
+
+def verify_token_scope(jwt_header, jwt_payload):
+    """token_verification_loader: 带 scope 的 Token 只能用于对应的接口"""
+    scope = jwt_payload.get(CLAIM_SCOPE)
+    if scope is None:
+        return True
+    return has_request_context() and request.endpoint == SCOPE_ENDPOINTS.get(scope)
+
+
+# ---------- 会话事件 ----------
+
+def _apply_revocations(session):
+    """after_commit: 吊销在本进程立即生效"""
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending and has_app_context():
+        denylist = current_app.extensions.get('token_denylist')
+        if denylist is not None:
+            denylist.apply(pending)
+
+
+def _discard_revocations(session, previous_transaction):
+    """after_soft_rollback: 丢弃未提交的吊销"""
+    session.info.pop(_PENDING_KEY, None)
+
+
+def init_token_denylist(app):
+    """为应用创建 Token 代数表并注册会话事件"""
+    app.extensions['token_denylist'] = TokenDenylist(
+        refresh_seconds=app.config.get('JWT_DENYLIST_REFRESH_SECONDS', 5),
+    )
+    for name, fn in (('after_commit', _apply_revocations),
+                     ('after_soft_rollback', _discard_revocations)):
+        if not event.contains(Session, name, fn):
+            event.listen(Session, name, fn)
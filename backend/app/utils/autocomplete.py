@@ -0,0 +1,327 @@
+"""进程内自动补全索引
+
+为 /api/search/quick 提供服务器和容器名称的 bigram 倒排索引，查询不访问数据库：
+- 服务启动时（每个工作进程 fork 后）从数据库构建，表尚未创建时推迟到首次查询；
+  之后每隔 AUTOCOMPLETE_REFRESH_SECONDS 重建一次，以吸收其他工作进程的写入
+- 本进程的写入通过会话事件增量同步：after_flush 记录变更，after_commit 生效，
+  回滚则丢弃
+- 条目数超过 AUTOCOMPLETE_MAX_ENTRIES 时停用索引，由调用方回退到数据库检索
+"""
+import bisect
+import heapq
+import sys
+import threading
+import time
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.extensions import db
+from app.models import Server, Container, Datacenter
+from app.utils.table_versions import table_ready
+
+GRAM_SIZE = 2
+_PENDING_KEY = 'autocomplete_pending'
+RESOURCE_TYPES = ('server', 'container')
+
+
+def _grams(text):
+    """切分 bigram（不足两个字符时整体作为一个gram）"""
+    if len(text) < GRAM_SIZE:
+        return {text} if text else set()
+    return {text[i:i + GRAM_SIZE] for i in range(len(text) - GRAM_SIZE + 1)}
+
+
+class AutocompleteIndex:
+    """服务器/容器名称索引
+
+    - 按类型维护 (小写名称, id) 有序列表，前缀匹配用二分查找
+    - bigram 倒排表用于补充非前缀的子串匹配
+    条目以元组存储: server -> (name, name_lower, internal_ip, datacenter_id)，
+    container -> (name, name_lower, server_id)
+    """
+
+    def __init__(self, max_entries=100000, refresh_seconds=300):
+        self.max_entries = max_entries
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.RLock()
+        self._build_lock = threading.Lock()  # 同一时刻只有一个线程重建
+        self._built_at = None
+        self._invalidated_at = 0.0
+        self._replay = None  # 重建期间提交的变更，替换后重放
+        self.enabled = True
+        self._reset()
+
+    def _reset(self):
+        self._entries = {}                                  # (type, id) -> entry tuple
+        self._sorted = {rtype: [] for rtype in RESOURCE_TYPES}  # type -> [(name_lower, id)]
+        self._postings = {}                                 # gram -> set((type, id))
+        self._datacenters = {}                              # datacenter_id -> name
+
+    # ---------- 构建与维护 ----------
+
+    def build(self):
+        """从数据库全量构建：在锁外查询并构建新索引，完成后在锁内替换，期间查询不受影响"""
+        started = time.monotonic()
+        with self._lock:
+            self._replay = []
+        try:
+            fresh = AutocompleteIndex(self.max_entries, self.refresh_seconds)
+            fresh._datacenters = dict(
+                Datacenter.query.with_entities(Datacenter.id, Datacenter.name).all()
+            )
+            total = Server.query.count() + Container.query.count()
+            fresh.enabled = total <= self.max_entries
+            if fresh.enabled:
+                rows = Server.query.with_entities(
+                    Server.id, Server.name, Server.internal_ip, Server.datacenter_id
+                ).all()
+                for sid, name, internal_ip, datacenter_id in rows:
+                    fresh._add(('server', sid), (name, name.lower(), internal_ip, datacenter_id))
+                rows = Container.query.with_entities(
+                    Container.id, Container.name, Container.server_id
+                ).all()
+                for cid, name, server_id in rows:
+                    fresh._add(('container', cid), (name, name.lower(), server_id))
+                for names in fresh._sorted.values():
+                    names.sort()
+        except Exception:
+            with self._lock:
+                self._replay = None
+            raise
+        with self._lock:
+            self._entries, self._sorted = fresh._entries, fresh._sorted
+            self._postings, self._datacenters = fresh._postings, fresh._datacenters
+            self.enabled = fresh.enabled
+            replay, self._replay = self._replay, None
+            self._apply(replay)
+            # 构建期间被标记失效（如批量导入）时保持失效，下次使用时再次重建
+            self._built_at = None if self._invalidated_at > started else started
+
+    def ensure_fresh(self):
+        """首次使用或超过刷新间隔时重建；已有索引时由一个线程重建，其他线程继续使用旧索引"""
+        if self._built_at is not None and time.monotonic() - self._built_at <= self.refresh_seconds:
+            return
+        # 首次构建（或已失效）时等待正在进行的构建，否则不等待
+        if not self._build_lock.acquire(blocking=self._built_at is None):
+            return
+        try:
+            if self._built_at is None or time.monotonic() - self._built_at > self.refresh_seconds:
+                self.build()
+        finally:
+            self._build_lock.release()
+
+    def invalidate(self):
+        """标记失效，下次使用时重建（用于绕过会话事件的批量写入）"""
+        self._invalidated_at = time.monotonic()
+        self._built_at = None
+
+    def _add(self, key, entry, keep_sorted=False):
+        self._entries[key] = entry
+        item = (entry[1], key[1])
+        if keep_sorted:
+            bisect.insort(self._sorted[key[0]], item)
+        else:
+            self._sorted[key[0]].append(item)
+        for gram in _grams(entry[1]):
+            self._postings.setdefault(gram, set()).add(key)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        names = self._sorted[key[0]]
+        pos = bisect.bisect_left(names, (entry[1], key[1]))
+        if pos < len(names) and names[pos] == (entry[1], key[1]):
+            names.pop(pos)
+        for gram in _grams(entry[1]):
+            keys = self._postings.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._postings[gram]
+
+    def apply(self, changes):
+        """应用已提交的变更 [(op, type, id, fields)]"""
+        with self._lock:
+            if self._replay is not None:
+                self._replay.extend(changes)
+            if self._built_at is not None:
+                self._apply(changes)
+
+    def _apply(self, changes):
+        """应用变更（调用方持有锁）"""
+        for op, resource_type, resource_id, fields in changes:
+            if resource_type == 'datacenter':
+                if op == 'delete':
+                    self._datacenters.pop(resource_id, None)
+                else:
+                    self._datacenters[resource_id] = fields[0]
+                continue
+            key = (resource_type, resource_id)
+            self._remove(key)
+            if op == 'put' and self.enabled:
+                self._add(key, (fields[0], fields[0].lower()) + fields[1:], keep_sorted=True)
+        if len(self._entries) > self.max_entries:
+            self.enabled = False
+            self._reset()
+
+    # ---------- 查询 ----------
+
+    def _suggestion(self, key):
+        entry = self._entries[key]
+        if key[0] == 'server':
+            description = f'{entry[2]} - {self._datacenters.get(entry[3], "")}'
+        else:
+            server = self._entries.get(('server', entry[2]))
+            description = f'on {server[0] if server else ""}'
+        return {'type': key[0], 'id': key[1], 'name': entry[0], 'description': description}
+
+    def _prefix_matches(self, resource_type, keyword, limit):
+        names = self._sorted[resource_type]
+        pos = bisect.bisect_left(names, (keyword,))
+        matches = []
+        while pos < len(names) and len(matches) < limit and names[pos][0].startswith(keyword):
+            matches.append((resource_type, names[pos][1]))
+            pos += 1
+        return matches
+
+    def _substring_matches(self, resource_type, keyword, limit, exclude):
+        postings = [self._postings.get(g, ()) for g in _grams(keyword)]
+        if not postings:
+            return []
+        postings.sort(key=len)
+        candidates = (
+            key for key in postings[0]
+            if key[0] == resource_type and key not in exclude
+            and all(key in p for p in postings[1:])
+            and keyword in self._entries[key][1]
+        )
+        # 名称更短的优先
+        return heapq.nsmallest(limit, candidates, key=lambda k: (len(self._entries[k][1]), self._entries[k][1]))
+
+    def suggest(self, keyword, limit=10):
+        """
+        名称子串匹配，前缀命中优先
+
+        Returns:
+            list: 建议列表；索引停用时返回 None
+        """
+        keyword = keyword.lower()
+        with self._lock:
+            if not self.enabled:
+                return None
+            suggestions = []
+            for resource_type in RESOURCE_TYPES:
+                keys = self._prefix_matches(resource_type, keyword, limit)
+                if len(keys) < limit:
+                    keys += self._substring_matches(
+                        resource_type, keyword, limit - len(keys), set(keys)
+                    )
+                suggestions.extend(self._suggestion(key) for key in keys)
+                if len(suggestions) >= limit:
+                    break
+            return suggestions[:limit]
+
+    def stats(self):
+        """索引规模及近似内存占用（字节）"""
+        with self._lock:
+            size = sys.getsizeof(self._entries) + sys.getsizeof(self._postings)
+            for key, entry in self._entries.items():
+                size += sys.getsizeof(key) + sys.getsizeof(entry)
+                size += sum(sys.getsizeof(v) for v in entry)
+            for names in self._sorted.values():
+                size += sys.getsizeof(names) + sum(sys.getsizeof(item) for item in names)
+            for gram, keys in self._postings.items():
+                size += sys.getsizeof(gram) + sys.getsizeof(keys)
+            return {
+                'enabled': self.enabled,
+                'entries': len(self._entries),
+                'grams': len(self._postings),
+                'postings': sum(len(keys) for keys in self._postings.values()),
+                'max_entries': self.max_entries,
+                'memory_bytes': size,
+                'age_seconds': round(time.monotonic() - self._built_at, 1) if self._built_at else None,
+            }
+
+
+# ---------- 会话事件 ----------
+
+def _snapshot(obj):
+    """提取索引所需字段（提交后对象会过期，必须在flush时取值）"""
+    if isinstance(obj, Server):
+        return 'server', (obj.name, obj.internal_ip, obj.datacenter_id)
+    if isinstance(obj, Container):
+        return 'container', (obj.name, obj.server_id)
+    return 'datacenter', (obj.name,)
+
+
+def _collect_changes(session, flush_context):
+    """after_flush: 记录待提交的索引变更"""
+    tracked = (Server, Container, Datacenter)
+    pending = session.info.setdefault(_PENDING_KEY, [])
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, tracked):
+            resource_type, fields = _snapshot(obj)
+            pending.append(('put', resource_type, obj.id, fields))
+    for obj in session.deleted:
+        if isinstance(obj, tracked):
+            resource_type, _ = _snapshot(obj)
+            pending.append(('delete', resource_type, obj.id, None))
+
+
+def record_changes(session, changes):
+    """
+    登记绕过ORM单元工作的批量变更 [(op, type, id, fields)]
+
+    与会话事件收集的变更一样，提交后生效、回滚时丢弃。
+    """
+    session.info.setdefault(_PENDING_KEY, []).extend(changes)
+
+
+def _apply_changes(session):
+    """after_commit: 变更生效"""
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending and has_app_context():
+        index = current_app.extensions.get('autocomplete')
+        if index is not None:
+            index.apply(pending)
+
+
+def _discard_changes(session, previous_transaction):
+    """after_soft_rollback: 丢弃未提交的变更"""
+    session.info.pop(_PENDING_KEY, None)
+
+
+def init_autocomplete(app):
+    """为应用创建自动补全索引并注册会话事件"""
+    app.extensions['autocomplete'] = AutocompleteIndex(
+        max_entries=app.config.get('AUTOCOMPLETE_MAX_ENTRIES', 100000),
+        refresh_seconds=app.config.get('AUTOCOMPLETE_REFRESH_SECONDS', 300),
+    )
+    for name, fn in (('after_flush', _collect_changes),
+                     ('after_commit', _apply_changes),
+                     ('after_soft_rollback', _discard_changes)):
+        if not event.contains(Session, name, fn):
+            event.listen(Session, name, fn)
+
+
+def warm_autocomplete(app):
+    """服务启动时构建索引（表尚未创建或构建失败时跳过，首次查询时再构建）"""
+    with app.app_context():
+        with db.engine.connect() as connection:
+            if not all(table_ready(connection, model.__tablename__)
+                       for model in (Datacenter, Server, Container)):
+                return
+        try:
+            app.extensions['autocomplete'].ensure_fresh()
+        except Exception:
+            app.logger.exception('自动补全索引启动构建失败，首次查询时重试')
+        finally:
+            db.session.remove()
+
+
+def get_autocomplete_index():
+    """当前应用的自动补全索引（按需构建/刷新）"""
+    index = current_app.extensions['autocomplete']
+    index.ensure_fresh()
+    return index
@@ -0,0 +1,210 @@
+"""批量操作
+
+集合式实现，语句数与批量大小无关（IN 列表按 CHUNK_SIZE 分块）：
+- 一次 IN 查询取出目标记录，子资源数量按 GROUP BY 一次统计
+- 一条批量 UPDATE / DELETE 语句写入（排序用 UPDATE ... CASE）
+- 审计日志批量 INSERT（排序变更同样记录，按时间点还原可回放）
+批量语句不经过ORM单元工作，搜索文档按ID刷新，自动补全索引变更随事务登记。
+"""
+import time
+from sqlalchemy.orm import joinedload
+from app.extensions import db
+from app.models import Server, Container, Service, GPU, AuditLog
+from app.utils.autocomplete import record_changes
+from app.utils.change_journal import journal_changes
+from app.utils.counts import server_counts
+from app.utils.search_index import INDEXED_RESOURCES, refresh_documents
+
+CHUNK_SIZE = 1000
+
+# 可批量排序的模型 -> (审计资源类型, 审计资源名称列)
+_SORTABLE = {
+    Container: ('container', Container.name),
+    Service: ('service', Service.name),
+    GPU: ('gpu', GPU.model),
+}
+
+# 影响搜索文档的服务器字段
+_SEARCH_FIELDS = {INDEXED_RESOURCES['server'][1], *INDEXED_RESOURCES['server'][2]}
+
+
+def _chunks(items, size=CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _normalize_ids(ids, failed):
+    """转换为整数ID并去重（保持顺序），无法转换的ID记入 failed"""
+    unique = {}
+    for raw in ids:
+        try:
+            if isinstance(raw, bool):
+                raise TypeError
+            unique.setdefault(int(raw))
+        except (TypeError, ValueError):
+            failed.append({'id': raw, 'reason': '无效的服务器ID'})
+    return list(unique)
+
+
+def update_servers(ids, updates, user, ip_address=None):
+    """
+    批量更新服务器
+
+    Args:
+        ids: 服务器ID列表
+        updates: {字段: 新值}，调用方已校验字段可更新
+
+    Returns:
+        tuple: (success, failed)
+    """
+    success, failed = [], []
+    unique_ids = _normalize_ids(ids, failed)
+    fields = list(updates)
+    columns = [getattr(Server, f) for f in fields]
+
+    found = {}
+    for chunk in _chunks(unique_ids):
+        for server_id, name, internal_ip, *values in db.session.query(
+            Server.id, Server.name, Server.internal_ip, *columns
+        ).filter(Server.id.in_(chunk)):
+            found[server_id] = (name, internal_ip, values)
+
+    entries = []
+    for server_id in unique_ids:
+        if server_id not in found:
+            failed.append({'id': server_id, 'reason': '服务器不存在'})
+            continue
+        name, _, values = found[server_id]
+        changes = {
+            field: {'old': old, 'new': updates[field]}
+            for field, old in zip(fields, values) if old != updates[field]
+        }
+        if changes:
+            entries.append({'resource_id': server_id, 'resource_name': name, 'changes': changes})
+        success.append(server_id)
+
+    changed_ids = [entry['resource_id'] for entry in entries]
+    for chunk in _chunks(changed_ids):
+        db.session.execute(
+            db.update(Server).where(Server.id.in_(chunk)).values(**updates)
+            .execution_options(synchronize_session=False)
+        )
+    AuditLog.log_actions(user, 'batch_update', 'server', entries, ip_address=ip_address)
+
+    journal_changes(db.session, Server, changed_ids)
+    if _SEARCH_FIELDS & set(fields):
+        refresh_documents('server', changed_ids, CHUNK_SIZE)
+    if 'datacenter_id' in updates:
+        record_changes(db.session, [
+            ('put', 'server', sid, (found[sid][0], found[sid][1], updates['datacenter_id']))
+            for sid in changed_ids
+        ])
+    return success, failed
+
+
+def delete_servers(ids, user, ip_address=None):
+    """
+    批量删除服务器（有容器或GPU的服务器不删除，记入 failed）
+
+    Returns:
+        tuple: (success, failed)
+    """
+    success, failed = [], []
+    unique_ids = _normalize_ids(ids, failed)
+
+    servers = {}
+    for chunk in _chunks(unique_ids):
+        for server in Server.query.options(
+            joinedload(Server.datacenter), joinedload(Server.environment)
+        ).filter(Server.id.in_(chunk)):
+            servers[server.id] = server
+    counts = server_counts([])
+    for chunk in _chunks(list(servers)):
+        counts.update(server_counts(chunk))
+
+    entries = []
+    for server_id in unique_ids:
+        server = servers.get(server_id)
+        if server is None:
+            failed.append({'id': server_id, 'reason': '服务器不存在'})
+            continue
+        container_count = counts[server_id]['container_count']
+        gpu_count = counts[server_id]['gpu_count']
+        if container_count > 0:
+            failed.append({'id': server_id, 'reason': f'服务器有 {container_count} 个容器,请先删除容器'})
+            continue
+        if gpu_count > 0:
+            failed.append({'id': server_id, 'reason': f'服务器有 {gpu_count} 个GPU,请先删除GPU'})
+            continue
+
+        # 可删除的服务器没有子资源，快照与 to_dict(include_children=True) 一致
+        snapshot = server.to_dict(counts=counts[server_id])
+        snapshot.update(containers=[], gpus=[])
+        entries.append({'resource_id': server_id, 'resource_name': server.name, 'snapshot': snapshot})
+        success.append(server_id)
+
+    AuditLog.log_actions(user, 'batch_delete', 'server', entries, ip_address=ip_address)
+    for chunk in _chunks(success):
+        db.session.execute(
+            db.delete(Server).where(Server.id.in_(chunk))
+            .execution_options(synchronize_session=False)
+        )
+
+    journal_changes(db.session, Server, success, 'delete')
+    refresh_documents('server', success, CHUNK_SIZE)
+    record_changes(db.session, [('delete', 'server', sid, None) for sid in success])
+    return success, failed
+
+
+def update_sort_orders(model, items, user, ip_address=None):
+    """
+    批量更新排序（容器、GPU、服务共用）
+
+    Args:
+        model: 含 sort_order 列的模型
+        items: [{'id': 1, 'sort_order': 0}, ...]，同一ID出现多次时以最后一次为准，
+               缺少字段或无法转换为整数的条目忽略
+        user: 操作用户（记入审计日志）
+
+    Returns:
+        dict: {'requested', 'updated', 'missing_ids', 'elapsed_ms'}
+    """
+    started = time.perf_counter()
+    orders = {}
+    for item in items:
+        if not isinstance(item, dict) or item.get('id') is None or item.get('sort_order') is None:
+            continue
+        try:
+            orders[int(item['id'])] = int(item['sort_order'])
+        except (TypeError, ValueError):
+            continue
+
+    # 一次查询校验ID，并跳过排序未变化的记录
+    resource_type, name_column = _SORTABLE[model]
+    current = {}
+    for chunk in _chunks(list(orders)):
+        for rid, name, sort_order in db.session.query(
+            model.id, name_column, model.sort_order
+        ).filter(model.id.in_(chunk)):
+            current[rid] = (name, sort_order)
+    changed = {rid: order for rid, order in orders.items() if rid in current and current[rid][1] != order}
+
+    for chunk in _chunks(list(changed)):
+        db.session.execute(
+            db.update(model).where(model.id.in_(chunk)).values(
+                sort_order=db.case({rid: changed[rid] for rid in chunk}, value=model.id)
+            ).execution_options(synchronize_session=False)
+        )
+    AuditLog.log_actions(user, 'sort', resource_type, [
+        {'resource_id': rid, 'resource_name': current[rid][0],
+         'changes': {'sort_order': {'old': current[rid][1], 'new': order}}}
+        for rid, order in changed.items()
+    ], ip_address=ip_address)
+    journal_changes(db.session, model, list(changed))
+
+    return {
+        'requested': len(orders),
+        'updated': len(changed),
+        'missing_ids': [rid for rid in orders if rid not in current],
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 2),
+    }
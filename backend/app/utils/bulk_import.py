@@ -0,0 +1,308 @@
+"""Excel 批量导入
+
+按块处理流式读取的工作表行：
+- 机房、环境、服务器、容器的名称到ID映射在导入开始时一次性预取
+- 新记录按块批量 INSERT，已存在记录（overwrite 时）按主键批量 UPDATE；
+  每块在保存点中写入，失败时只回滚该块并记录一条块级错误
+- 批量语句不经过ORM单元工作（不触发模型校验和会话事件），
+  IP排序键在此直接计算，搜索文档在导入结束前按ID统一刷新
+- 每块的新建（import）与覆盖（import_update，含字段新旧值）审计日志随该块批量写入，
+  供按时间点还原回放
+"""
+from app.extensions import db
+from app.models import Server, Container, Datacenter, Environment, AuditLog
+from app.models.ip_key import ip_to_key
+from app.utils.change_journal import journal_changes
+from app.utils.search_index import refresh_documents
+
+CHUNK_SIZE = 1000
+
+# 由其他列计算得出、不记入审计变更的列
+_DERIVED_COLUMNS = {'internal_ip_key', 'external_ip_key'}
+
+SERVER_COLUMNS = 13
+CONTAINER_COLUMNS = 7
+
+
+def _str(value):
+    return str(value).strip() if value else None
+
+
+def _int(value, default=None):
+    return int(value) if value else default
+
+
+def _float(value):
+    return float(value) if value else None
+
+
+def _pad(row, width):
+    """只读模式下行尾空单元格可能被省略"""
+    row = tuple(row)
+    return row + (None,) * (width - len(row)) if len(row) < width else row
+
+
+def _key_ids(model, key_columns):
+    """业务键 -> ID，重复时取ID最小的一条（与 filter_by(...).first() 一致）"""
+    columns = [getattr(model, c) for c in key_columns]
+    ids = {}
+    for *key, rid in db.session.query(*columns, model.id).order_by(model.id):
+        ids.setdefault(tuple(key), rid)
+    return ids
+
+
+class _ChunkWriter:
+    """按块批量写入：inserts 以业务键去重，updates 以主键去重
+
+    每块在一个保存点中写入：写入失败时只回滚本块，记录一条注明行范围的错误，
+    本块的行不计入 created / updated。
+    """
+
+    def __init__(self, model, resource_type, key_columns, chunk_size, result, user, ip_address):
+        self.model = model
+        self.resource_type = resource_type
+        self.user = user
+        self.ip_address = ip_address
+        self.key_columns = key_columns
+        self.known_ids = _key_ids(model, key_columns)
+        self.chunk_size = chunk_size
+        self.result = result
+        self.max_id = db.session.query(db.func.max(model.id)).scalar() or 0
+        self.inserts = {}
+        self.updates = {}
+        self.rows = []  # 本块的 (行号, 是否更新)
+        self.touched_ids = set()
+
+    def exists(self, key):
+        return key in self.known_ids or key in self.inserts
+
+    @property
+    def full(self):
+        return len(self.inserts) + len(self.updates) >= self.chunk_size
+
+    def put(self, row_idx, key, values):
+        """登记一行（只修改内存中的块，不访问数据库）"""
+        rid = self.known_ids.get(key)
+        self.rows.append((row_idx, self.exists(key)))
+        if rid is not None:
+            self.updates[rid] = {**self.updates.get(rid, {}), 'id': rid, **values}
+        else:
+            self.inserts[key] = {**self.inserts.get(key, {}), **values}
+
+    def flush(self):
+        """写入当前块"""
+        if not self.rows:
+            return
+        first, last = self.rows[0][0], self.rows[-1][0]
+        try:
+            with db.session.begin_nested():
+                new_ids = self._write()
+        except Exception as e:
+            error = getattr(e, 'orig', None) or e
+            self.result['errors'].append(f'行{first}-{last}: 批量写入失败，本块未导入: {error}')
+        else:
+            self.known_ids.update(new_ids)
+            self.touched_ids.update(self.updates)
+            self.touched_ids.update(new_ids.values())
+            updated = sum(1 for _, is_update in self.rows if is_update)
+            self.result['updated'] += updated
+            self.result['created'] += len(self.rows) - updated
+        finally:
+            self.inserts, self.updates, self.rows = {}, {}, []
+
+    def _write(self):
+        """执行本块的批量 UPDATE / INSERT，返回新记录的 {业务键: ID}"""
+        new_ids = {}
+        if self.updates:
+            self._audit_updates()
+            db.session.execute(db.update(self.model), list(self.updates.values()))
+        if self.inserts:
+            db.session.execute(db.insert(self.model), list(self.inserts.values()))
+            # 回查本块新记录ID，供后续同名行按主键更新
+            names = [key[-1] for key in self.inserts]
+            columns = [getattr(self.model, c) for c in self.key_columns]
+            rows = db.session.query(*columns, self.model.id).filter(
+                self.model.id > self.max_id, self.model.name.in_(names)
+            ).order_by(self.model.id)
+            for *key, rid in rows:
+                if tuple(key) in self.inserts:
+                    new_ids.setdefault(tuple(key), rid)
+            AuditLog.log_actions(self.user, 'import', self.resource_type, [
+                {'resource_id': rid, 'resource_name': key[-1]} for key, rid in new_ids.items()
+            ], ip_address=self.ip_address)
+        return new_ids
+
+    def _audit_updates(self):
+        """按覆盖前的值记录本块更新的字段变更"""
+        fields = sorted({f for values in self.updates.values() for f in values} - {'id'} - _DERIVED_COLUMNS)
+        columns = [getattr(self.model, f) for f in fields]
+        entries = []
+        for rid, name, *olds in db.session.query(self.model.id, self.model.name, *columns).filter(
+            self.model.id.in_(list(self.updates))
+        ):
+            values = self.updates[rid]
+            changes = {
+                field: {'old': old, 'new': values[field]}
+                for field, old in zip(fields, olds) if field in values and old != values[field]
+            }
+            if changes:
+                entries.append({'resource_id': rid, 'resource_name': name, 'changes': changes})
+        AuditLog.log_actions(self.user, 'import_update', self.resource_type, entries,
+                             ip_address=self.ip_address)
+
+
+def import_servers(rows, user, overwrite, chunk_size=CHUNK_SIZE, ip_address=None):
+    """
+    导入服务器
+
+    Args:
+        rows: 工作表数据行（不含表头），按模板列顺序
+        user: 执行导入的用户（记入审计日志）
+        overwrite: 已存在的同名服务器是否覆盖
+
+    Returns:
+        dict: {'created', 'updated', 'rows', 'errors'}
+    """
+    result = {'created': 0, 'updated': 0, 'rows': 0, 'errors': []}
+
+    datacenters = dict(db.session.query(Datacenter.name, Datacenter.id).all())
+    environments = dict(db.session.query(Environment.name, Environment.id).all())
+    writer = _ChunkWriter(Server, 'server', ['name'], chunk_size, result, user, ip_address)
+
+    for row_idx, row in enumerate(rows, 2):
+        row = _pad(row, SERVER_COLUMNS)
+        if not row[0]:  # 跳过空行
+            continue
+        result['rows'] += 1
+
+        try:
+            name = str(row[0]).strip()
+            datacenter_name = _str(row[1])
+            environment_name = _str(row[2])
+            internal_ip = _str(row[3])
+
+            if not all([name, datacenter_name, environment_name, internal_ip]):
+                result['errors'].append(f'行{row_idx}: 必填字段不完整')
+                continue
+
+            # 查找环境
+            if environment_name not in environments:
+                result['errors'].append(f'行{row_idx}: 环境 "{environment_name}" 不存在')
+                continue
+
+            external_ip = _str(row[4])
+            values = {
+                'name': name,
+                'environment_id': environments[environment_name],
+                'internal_ip': internal_ip,
+                'internal_ip_key': ip_to_key(internal_ip),
+                'external_ip': external_ip,
+                'external_ip_key': ip_to_key(external_ip),
+                'cpu_cores': _int(row[5]),
+                'memory_gb': _int(row[6]),
+                'disk_gb': _int(row[7]),
+                'os_type': _str(row[8]),
+                'ssh_port': _int(row[9], 22),
+                'ssh_user': _str(row[10]) or 'root',
+                'responsible_person': _str(row[11]),
+                'description': _str(row[12]),
+            }
+
+            if writer.exists((name,)) and not overwrite:
+                result['errors'].append(f'行{row_idx}: 服务器 "{name}" 已存在')
+                continue
+
+        except Exception as e:
+            result['errors'].append(f'行{row_idx}: {str(e)}')
+            continue
+
+        # 查找机房（不存在时创建）
+        if datacenter_name not in datacenters:
+            datacenter = Datacenter(name=datacenter_name)
+            try:
+                with db.session.begin_nested():
+                    db.session.add(datacenter)
+            except Exception as e:
+                error = getattr(e, 'orig', None) or e
+                result['errors'].append(f'行{row_idx}: 创建机房 "{datacenter_name}" 失败: {error}')
+                continue
+            datacenters[datacenter_name] = datacenter.id
+
+        values['datacenter_id'] = datacenters[datacenter_name]
+        writer.put(row_idx, (name,), values)
+        if writer.full:
+            writer.flush()
+
+    writer.flush()
+    journal_changes(db.session, Server, writer.touched_ids)
+    refresh_documents('server', writer.touched_ids, chunk_size)
+    return result
+
+
+def import_containers(rows, user, overwrite, chunk_size=CHUNK_SIZE, ip_address=None):
+    """
+    导入容器
+
+    Args:
+        rows: 工作表数据行（不含表头），按模板列顺序
+        user: 新建容器的所有者（同时记入审计日志）
+        overwrite: 同一服务器上已存在的同名容器是否覆盖
+
+    Returns:
+        dict: {'created', 'updated', 'rows', 'errors'}
+    """
+    result = {'created': 0, 'updated': 0, 'rows': 0, 'errors': []}
+
+    servers = _key_ids(Server, ['name'])
+    writer = _ChunkWriter(Container, 'container', ['server_id', 'name'], chunk_size, result,
+                          user, ip_address)
+
+    for row_idx, row in enumerate(rows, 2):
+        row = _pad(row, CONTAINER_COLUMNS)
+        if not row[0]:
+            continue
+        result['rows'] += 1
+
+        try:
+            name = str(row[0]).strip()
+            server_name = _str(row[1])
+
+            if not all([name, server_name]):
+                result['errors'].append(f'行{row_idx}: 必填字段不完整')
+                continue
+
+            server_id = servers.get((server_name,))
+            if server_id is None:
+                result['errors'].append(f'行{row_idx}: 服务器 "{server_name}" 不存在')
+                continue
+
+            values = {
+                'server_id': server_id,
+                'name': name,
+                'image': _str(row[2]),
+                'cpu_limit': _float(row[3]),
+                'memory_limit_mb': _int(row[4]),
+                'status': _str(row[5]) or 'running',
+                'description': _str(row[6]),
+            }
+
+            key = (server_id, name)
+            if writer.exists(key):
+                if not overwrite:
+                    result['errors'].append(f'行{row_idx}: 容器 "{name}" 已存在')
+                    continue
+            else:
+                values['owner_id'] = user.id
+
+        except Exception as e:
+            result['errors'].append(f'行{row_idx}: {str(e)}')
+            continue
+
+        writer.put(row_idx, key, values)
+        if writer.full:
+            writer.flush()
+
+    writer.flush()
+    journal_changes(db.session, Container, writer.touched_ids)
+    refresh_documents('container', writer.touched_ids, chunk_size)
+    return result
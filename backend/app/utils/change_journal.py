@@ -0,0 +1,251 @@
+"""资源变更日志与增量同步
+
+- 服务器、容器、GPU、服务、端口映射的写入在同一事务内追加到 change_journal：
+  after_flush 登记单元工作中新增/修改/删除的对象，绕过单元工作的批量写入由调用方用
+  journal_changes 登记，提交前（before_commit）一次性追加
+- 追加前递增 table_versions 中的 change_journal 计数行，行锁持有到提交，写入事务因此按提交顺序
+  依次取得自增ID，客户端以最后收到的ID为游标不会漏掉提交较晚的变更；
+  行锁只在提交前后短暂持有，事务的其余部分可以并发执行
+- GET /api/sync?since=<序号> 返回序号之后变更过的资源的当前状态（按ID批量加载，含 updated_at）
+  以及已删除资源的ID（墓碑）；不传 since、游标超出当前序号或早于已清理的日志时返回全量
+- 日志由 `flask maintain-audit-logs` 按 SYNC_JOURNAL_RETENTION_DAYS 清理
+- journal_changes 登记的批量变更同时登记到 SSE 事件推送（event_stream）
+"""
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.extensions import db
+from app.models import (
+    ChangeJournal, TableVersion, User, Datacenter, Environment,
+    Server, Container, GPU, Service, PortMapping
+)
+from app.utils.counts import server_counts, container_counts
+from app.utils.event_stream import record_events
+from app.utils.table_versions import bump_counters, table_ready
+
+SYNC_RESOURCES = {
+    'server': Server, 'container': Container, 'gpu': GPU,
+    'service': Service, 'port_mapping': PortMapping,
+}
+_MODEL_TYPES = {model: rtype for rtype, model in SYNC_RESOURCES.items()}
+
+JOURNAL_COUNTER = 'change_journal'         # 追加日志前递增，用作提交顺序锁
+PRUNED_COUNTER = 'change_journal_pruned'   # 已清理日志的最大序号
+CHUNK_SIZE = 1000
+_PENDING_KEY = 'change_journal_pending'
+
+
+# ---------- 写入 ----------
+
+def _append(connection, entries):
+    """在当前事务中追加变更 [(type, id, op)]"""
+    if not entries or not table_ready(connection) \
+            or not table_ready(connection, ChangeJournal.__tablename__):
+        return
+    bump_counters(connection, [JOURNAL_COUNTER])
+    now = datetime.utcnow()
+    connection.execute(ChangeJournal.__table__.insert(), [
+        {'resource_type': resource_type, 'resource_id': resource_id, 'op': op, 'created_at': now}
+        for resource_type, resource_id, op in entries
+    ])
+
+
+def journal_changes(session, model, ids, op='upsert'):
+    """
+    登记绕过ORM单元工作的批量变更（写入调用方当前事务，并在提交后推送事件）
+
+    Args:
+        model: 资源模型，如 Server
+        ids: 变更的资源ID
+        op: upsert / delete
+    """
+    resource_type = _MODEL_TYPES[model]
+    _record(session, [(resource_type, rid, op) for rid in ids])
+    record_events(session, model, ids, op)
+
+
+def _record(session, entries):
+    """登记待提交的变更（同一资源的相同操作只保留一条）"""
+    pending = session.info.setdefault(_PENDING_KEY, {})
+    for entry in entries:
+        pending.pop(entry, None)
+        pending[entry] = None
+
+
+def _journal_flushed(session, flush_context):
+    """after_flush: 登记单元工作中有实际变更的资源"""
+    entries = [
+        (_MODEL_TYPES[type(obj)], obj.id, 'upsert')
+        for obj in session.new if type(obj) in _MODEL_TYPES
+    ]
+    entries += [
+        (_MODEL_TYPES[type(obj)], obj.id, 'upsert')
+        for obj in session.dirty
+        if type(obj) in _MODEL_TYPES and session.is_modified(obj, include_collections=False)
+    ]
+    entries += [
+        (_MODEL_TYPES[type(obj)], obj.id, 'delete')
+        for obj in session.deleted if type(obj) in _MODEL_TYPES
+    ]
+    if entries:
+        _record(session, entries)
+
+
+def _append_pending(session):
+    """before_commit: 写出剩余变更后追加登记的日志（保存点提交时留给外层事务）"""
+    if session.in_nested_transaction():
+        return
+    session.flush()
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        _append(session.connection(), list(pending))
+
+
+def _discard_pending(session, previous_transaction):
+    """after_soft_rollback: 丢弃未提交的登记"""
+    session.info.pop(_PENDING_KEY, None)
+
+
+def register_change_journal():
+    """注册会话事件，提交写入时追加变更日志"""
+    for name, fn in (('after_flush', _journal_flushed),
+                     ('before_commit', _append_pending),
+                     ('after_soft_rollback', _discard_pending)):
+        if not event.contains(Session, name, fn):
+            event.listen(Session, name, fn)
+
+
+def prune_journal(cutoff):
+    """
+    删除早于 cutoff 的日志并记录已清理的最大序号，返回删除数量
+
+    保留最新的一条：自增计数器在表清空后可能从头开始（SQLite 复用 rowid，MySQL 5.7 重启后重算）
+    """
+    last_id = db.session.query(db.func.max(ChangeJournal.id)).filter(
+        ChangeJournal.created_at < cutoff, ChangeJournal.id < current_seq()
+    ).scalar()
+    if last_id is None:
+        return 0
+    result = db.session.execute(db.delete(ChangeJournal).where(ChangeJournal.id <= last_id))
+    counter = db.session.get(TableVersion, PRUNED_COUNTER)
+    if counter is None:
+        db.session.add(TableVersion(table_name=PRUNED_COUNTER, version=last_id))
+    else:
+        counter.version = max(counter.version, last_id)
+    db.session.commit()
+    return result.rowcount
+
+
+# ---------- 读取 ----------
+
+def _load(model, ids=None):
+    """按ID分块加载（ids 为 None 时加载全部）"""
+    if ids is None:
+        return model.query.order_by(model.id).all()
+    ids = sorted(set(ids) - {None})
+    objects = []
+    for start in range(0, len(ids), CHUNK_SIZE):
+        objects += model.query.filter(model.id.in_(ids[start:start + CHUNK_SIZE])).all()
+    return objects
+
+
+def _chunked_counts(count_fn, ids):
+    counts = count_fn([])
+    for start in range(0, len(ids), CHUNK_SIZE):
+        counts.update(count_fn(ids[start:start + CHUNK_SIZE]))
+    return counts
+
+
+def serialize_resources(resource_type, ids=None):
+    """
+    批量序列化资源（关联对象预加载到 identity map，查询次数与资源数量无关）
+
+    Args:
+        ids: 资源ID，None 表示全部；已删除的ID不出现在结果中
+    """
+    objects = _load(SYNC_RESOURCES[resource_type], ids)
+    if not objects:
+        return []
+    # 局部变量持有预加载对象的引用，防止弱引用的 identity map 提前回收
+    if resource_type == 'server':
+        related = Datacenter.query.all() + Environment.query.all()
+        counts = _chunked_counts(server_counts, [s.id for s in objects])
+        return [s.to_dict(counts=counts[s.id]) for s in objects]
+    if resource_type == 'container':
+        related = _load(Server, [c.server_id for c in objects]) + _load(
+            User, [c.owner_id for c in objects] + [c.assigned_user_id for c in objects]
+        )
+        container_ids = [c.id for c in objects]
+        counts = _chunked_counts(container_counts, container_ids)
+        mappings = defaultdict(list)
+        for start in range(0, len(container_ids), CHUNK_SIZE):
+            for mapping in PortMapping.query.filter(
+                PortMapping.container_id.in_(container_ids[start:start + CHUNK_SIZE])
+            ).order_by(PortMapping.container_port, PortMapping.id):
+                mappings[mapping.container_id].append(mapping)
+        return [
+            c.to_dict(counts=counts[c.id], port_mappings=mappings.get(c.id, []))
+            for c in objects
+        ]
+    if resource_type == 'gpu':
+        related = _load(Server, [g.server_id for g in objects]) + _load(
+            User, [g.assigned_to for g in objects]
+        )
+    elif resource_type == 'service':
+        related = _load(Container, [s.container_id for s in objects]) + _load(
+            User, [s.owner_id for s in objects]
+        )
+    else:
+        containers = _load(Container, [m.container_id for m in objects])
+        related = containers + _load(Server, [c.server_id for c in containers])
+    return [obj.to_dict() for obj in objects]
+
+
+def current_seq():
+    """当前最大变更序号"""
+    return db.session.query(db.func.max(ChangeJournal.id)).scalar() or 0
+
+
+def sync_changes(since=None, limit=1000):
+    """
+    增量同步
+
+    Args:
+        since: 客户端已同步到的序号，None 表示全量
+        limit: 单次最多读取的日志条数（同一资源多次变更只返回一次）
+
+    Returns:
+        dict: {'since', 'next_since', 'full', 'has_more',
+               'changes': {类型: [资源]}, 'deleted': {类型: [ID]}}
+    """
+    latest = current_seq()
+    pruned = db.session.get(TableVersion, PRUNED_COUNTER)
+    if since is None or since > latest or since < (pruned.version if pruned else 0):
+        # 先取序号再读数据：期间提交的变更会在下次同步中重复下发，客户端按ID覆盖即可
+        return {
+            'since': since, 'next_since': latest, 'full': True, 'has_more': False,
+            'changes': {rtype: serialize_resources(rtype) for rtype in SYNC_RESOURCES},
+            'deleted': {rtype: [] for rtype in SYNC_RESOURCES},
+        }
+
+    rows = db.session.query(
+        ChangeJournal.id, ChangeJournal.resource_type, ChangeJournal.resource_id
+    ).filter(ChangeJournal.id > since).order_by(ChangeJournal.id).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    touched = defaultdict(set)
+    for _, resource_type, resource_id in rows:
+        touched[resource_type].add(resource_id)
+    changes, deleted = {}, {}
+    for rtype in SYNC_RESOURCES:
+        ids = touched.get(rtype, set())
+        changes[rtype] = serialize_resources(rtype, ids) if ids else []
+        # 日志中出现但已不存在的资源即为删除
+        deleted[rtype] = sorted(ids - {item['id'] for item in changes[rtype]})
+    return {
+        'since': since, 'next_since': rows[-1].id if rows else since,
+        'full': False, 'has_more': has_more,
+        'changes': changes, 'deleted': deleted,
+    }
@@ -0,0 +1,64 @@
+"""子资源数量批量统计
+
+按页一次性统计子资源数量（每种关联一条 GROUP BY 查询），
+再通过 to_dict(counts=...) 注入序列化，替代逐行 COUNT。
+"""
+from collections import defaultdict
+from app.extensions import db
+from app.models import Container, Service, GPU
+
+
+def count_by(fk_column, parent_ids):
+    """
+    按外键分组计数
+
+    Args:
+        fk_column: 子表外键列，如 Container.server_id
+        parent_ids: 父记录ID列表，或返回ID的子查询
+
+    Returns:
+        dict: {parent_id: count}，没有子记录的父ID不出现在结果中
+    """
+    if isinstance(parent_ids, (list, tuple, set)) and not parent_ids:
+        return {}
+    rows = db.session.query(fk_column, db.func.count()).filter(
+        fk_column.in_(parent_ids)
+    ).group_by(fk_column).all()
+    return dict(rows)
+
+
+def server_counts(server_ids):
+    """批量统计服务器的容器数和GPU数，未命中的ID返回0"""
+    container_counts = count_by(Container.server_id, server_ids)
+    gpu_counts = count_by(GPU.server_id, server_ids)
+    return defaultdict(
+        lambda: {'container_count': 0, 'gpu_count': 0},
+        {
+            sid: {
+                'container_count': container_counts.get(sid, 0),
+                'gpu_count': gpu_counts.get(sid, 0),
+            }
+            for sid in set(container_counts) | set(gpu_counts)
+        }
+    )
+
+
+def container_counts(container_ids):
+    """批量统计容器的服务数，未命中的ID返回0"""
+    service_counts = count_by(Service.container_id, container_ids)
+    return defaultdict(
+        lambda: {'service_count': 0},
+        {cid: {'service_count': count} for cid, count in service_counts.items()}
+    )
+
+
+def servers_to_dicts(servers, **kwargs):
+    """批量序列化服务器，数量字段一次性统计"""
+    counts = server_counts([s.id for s in servers])
+    return [s.to_dict(counts=counts[s.id], **kwargs) for s in servers]
+
+
+def containers_to_dicts(containers, **kwargs):
+    """批量序列化容器，数量字段一次性统计"""
+    counts = container_counts([c.id for c in containers])
+    return [c.to_dict(counts=counts[c.id], **kwargs) for c in containers]
@@ -0,0 +1,336 @@
+"""库存变更事件推送（Server-Sent Events）
+
+- 服务器、容器、GPU、服务、端口映射的写入在 after_flush 登记精简事件 {type, id, op, users}，
+  绕过单元工作的批量写入经 journal_changes 一并登记；提交后（after_commit）发布，回滚时丢弃，
+  同一事务内同一资源只发布一次
+- 事件总线后端可插拔：进程内分发（默认）或 Redis 发布订阅（多工作进程，每个进程一个订阅线程
+  把频道消息分发给本进程的连接）
+- 每个 SSE 连接一个有界队列，发布方从不阻塞：队列满时丢弃积压并向该连接下发 resync 事件，
+  客户端据此调用 /api/sync 补齐
+- 连接可按资源类型过滤；mine=1 时容器、服务、GPU 只推送与自己相关（所有者/使用人/分配对象，
+  含变更前的值）的事件，批量写入的事件不含用户信息，照常推送
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from app.models import Server, Container, GPU, Service, PortMapping
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+EVENT_TYPES = {
+    Server: 'server', Container: 'container', GPU: 'gpu',
+    Service: 'service', PortMapping: 'port_mapping',
+}
+# 与用户相关的字段，mine=1 的连接按这些字段过滤
+USER_FIELDS = {
+    Container: ('owner_id', 'assigned_user_id'),
+    GPU: ('assigned_to',),
+    Service: ('owner_id',),
+}
+_PENDING_KEY = 'pending_events'
+
+
+class Subscriber:
+    """单个 SSE 连接：事件过滤条件与有界队列"""
+
+    def __init__(self, user_id, types=None, mine=False, queue_size=256):
+        self.user_id = user_id
+        self.types = frozenset(types) if types else None
+        self.mine = mine
+        self.queue_size = queue_size
+        self.dropped = 0
+        self._events = deque()
+        self._overflowed = False
+        self._cond = threading.Condition()
+
+    def accepts(self, item):
+        if self.types is not None and item['type'] not in self.types:
+            return False
+        if self.mine and item['users'] is not None:
+            return self.user_id in item['users']
+        return True
+
+    def put(self, items):
+        """放入事件（不阻塞），积压超过上限时清空并标记需要重新同步，返回是否溢出"""
+        with self._cond:
+            if self._overflowed:
+                self.dropped += len(items)
+                return False
+            if len(self._events) + len(items) > self.queue_size:
+                self.dropped += len(self._events) + len(items)
+                self._events.clear()
+                self._overflowed = True
+                self._cond.notify()
+                return True
+            self._events.extend(items)
+            self._cond.notify()
+            return False
+
+    def get(self, timeout):
+        """
+        等待并取出积压的事件
+
+        Returns:
+            tuple: (events, resync)，超时返回 ([], False)；溢出后返回 ([], True)
+        """
+        with self._cond:
+            if not self._events and not self._overflowed:
+                self._cond.wait(timeout)
+            if self._overflowed:
+                self._overflowed = False
+                return [], True
+            items = list(self._events)
+            self._events.clear()
+            return items, False
+
+
+class MemoryEventBackend:
+    """进程内事件总线（单工作进程）"""
+
+    name = 'memory'
+    _dispatch = None
+
+    def start(self, dispatch):
+        self._dispatch = dispatch
+
+    def publish(self, items):
+        if self._dispatch is not None:  # 尚无连接时无需分发
+            self._dispatch(items)
+
+
+class RedisEventBackend:
+    """Redis 发布订阅事件总线（需支持 publish / pubsub），本进程发布的事件也经频道接收"""
+
+    name = 'redis'
+
+    def __init__(self, client, channel='itam:events', retry_interval=1.0):
+        self.client = client
+        self.channel = channel
+        self.retry_interval = retry_interval
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def start(self, dispatch):
+        """启动本进程的订阅线程（fork 出的工作进程各自启动）"""
+        self._dispatch = dispatch
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._listen, name='event-subscriber', daemon=True)
+            self._thread.start()
+
+    def publish(self, items):
+        self.client.publish(self.channel, json.dumps(items, ensure_ascii=False))
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                for message in pubsub.listen():
+                    if message.get('type') == 'message':
+                        self._dispatch(json.loads(message['data']))
+            except Exception:
+                # 连接断开后重连；期间的事件由客户端收到 resync 或重连后通过 /api/sync 补齐
+                time.sleep(self.retry_interval)
+
+
+class EventBroker:
+    """事件分发：发布到后端，后端回调分发给本进程的订阅者"""
+
+    def __init__(self, backend, queue_size=256, max_subscribers=100):
+        self.backend = backend
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._stats = {'published': 0, 'delivered': 0, 'dropped': 0,
+                       'resyncs': 0, 'rejected': 0, 'errors': 0}
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self._stats[name] += n
+
+    def subscribe(self, user_id, types=None, mine=False):
+        """注册连接，超过连接上限时返回 None"""
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                self._stats['rejected'] += 1
+                return None
+            subscriber = Subscriber(user_id, types, mine, self.queue_size)
+            self._subscribers.add(subscriber)
+        self.backend.start(self._dispatch)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+            self._stats['dropped'] += subscriber.dropped
+
+    def publish(self, items):
+        """发布事件（在提交后调用，失败只计数不抛出）"""
+        try:
+            self.backend.publish(items)
+        except Exception:
+            self._count('errors')
+            return
+        self._count('published', len(items))
+
+    def _dispatch(self, items):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        delivered = resyncs = 0
+        for subscriber in subscribers:
+            matched = [item for item in items if subscriber.accepts(item)]
+            if matched:
+                resyncs += subscriber.put(matched)
+                delivered += len(matched)
+        self._count('delivered', delivered)
+        self._count('resyncs', resyncs)
+
+    def stats(self):
+        """推送统计"""
+        with self._lock:
+            return dict(
+                self._stats,
+                backend=self.backend.name,
+                subscribers=len(self._subscribers),
+                dropped=self._stats['dropped'] + sum(s.dropped for s in self._subscribers),
+                max_subscribers=self.max_subscribers,
+                queue_size=self.queue_size,
+            )
+
+
+def format_sse(data, event_name=None):
+    """编码一条 SSE 消息"""
+    lines = [f'event: {event_name}'] if event_name else []
+    lines.append(f'data: {json.dumps(data, ensure_ascii=False, separators=(",", ":"))}')
+    return '\n'.join(lines) + '\n\n'
+
+
+# ---------- 会话事件 ----------
+
+def _users(obj, new=False):
+    """
+    资源当前与变更前关联的用户ID
+
+    无用户字段的资源，或修改前未加载、旧值未知时返回 None（推送给所有连接）
+    """
+    fields = USER_FIELDS.get(type(obj))
+    if fields is None:
+        return None
+    state = inspect(obj)
+    users = set()
+    for field in fields:
+        history = state.attrs[field].history
+        if not new and history.added and not history.deleted and not history.unchanged:
+            return None
+        users.update(history.added or ())
+        users.update(history.unchanged or ())
+        users.update(history.deleted or ())
+    users.discard(None)
+    return sorted(users)
+
+
+def _queue(session, items):
+    """登记待发布的事件 [(type, id, op, users)]，同一资源合并为一条"""
+    if not has_app_context() or current_app.extensions.get('event_broker') is None:
+        return
+    pending = session.info.setdefault(_PENDING_KEY, {})
+    for resource_type, resource_id, op, users in items:
+        previous = pending.get((resource_type, resource_id))
+        if previous is not None:
+            if previous['users'] is None or users is None:
+                users = None
+            else:
+                users = sorted(set(previous['users']) | set(users))
+        pending[(resource_type, resource_id)] = {
+            'type': resource_type, 'id': resource_id, 'op': op, 'users': users,
+        }
+
+
+def record_events(session, model, ids, op='upsert'):
+    """登记绕过ORM单元工作的批量变更（不含用户信息），提交后发布、回滚时丢弃"""
+    resource_type = EVENT_TYPES[model]
+    _queue(session, [(resource_type, rid, op, None) for rid in ids])
+
+
+def _collect_events(session, flush_context):
+    """after_flush: 记录单元工作中有实际变更的资源"""
+    items = [
+        (EVENT_TYPES[type(obj)], obj.id, 'upsert', _users(obj, new=True))
+        for obj in session.new if type(obj) in EVENT_TYPES
+    ]
+    items += [
+        (EVENT_TYPES[type(obj)], obj.id, 'upsert', _users(obj))
+        for obj in session.dirty
+        if type(obj) in EVENT_TYPES and session.is_modified(obj, include_collections=False)
+    ]
+    items += [
+        (EVENT_TYPES[type(obj)], obj.id, 'delete', _users(obj))
+        for obj in session.deleted if type(obj) in EVENT_TYPES
+    ]
+    if items:
+        _queue(session, items)
+
+
+def _publish_events(session):
+    """after_commit: 发布事件"""
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending and has_app_context():
+        broker = current_app.extensions.get('event_broker')
+        if broker is not None:
+            broker.publish(list(pending.values()))
+
+
+def _discard_events(session, previous_transaction):
+    """after_soft_rollback: 丢弃未提交的事件"""
+    session.info.pop(_PENDING_KEY, None)
+
+
+def create_backend(app):
+    """按配置创建事件总线后端（redis 客户端未安装或未配置地址时退回进程内分发）"""
+    name = app.config.get('EVENTS_BACKEND', 'memory')
+    if name == 'redis':
+        url = app.config.get('EVENTS_REDIS_URL')
+        if redis is not None and url:
+            return RedisEventBackend(redis.Redis.from_url(url))
+        app.logger.warning('Redis 事件总线不可用（未安装 redis 或未配置地址），使用进程内分发')
+    return MemoryEventBackend()
+
+
+def init_event_stream(app, backend=None):
+    """
+    为应用创建事件分发器并注册会话事件
+
+    Args:
+        backend: 指定事件总线后端（如 Redis 兼容的本地替身），默认按配置创建
+    """
+    if not app.config.get('EVENTS_ENABLED', True):
+        app.extensions.pop('event_broker', None)
+        return
+    app.extensions['event_broker'] = EventBroker(
+        backend or create_backend(app),
+        queue_size=app.config.get('EVENTS_QUEUE_SIZE', 256),
+        max_subscribers=app.config.get('EVENTS_MAX_SUBSCRIBERS', 100),
+    )
+    for name, fn in (('after_flush', _collect_events),
+                     ('after_commit', _publish_events),
+                     ('after_soft_rollback', _discard_events)):
+        if not event.contains(Session, name, fn):
+            event.listen(Session, name, fn)
+
+
+def get_event_broker():
+    """当前应用的事件分发器（未启用时为 None）"""
+    return current_app.extensions.get('event_broker')
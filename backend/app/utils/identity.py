@@ -0,0 +1,119 @@
+"""当前用户身份缓存
+
+- get_current_user 在同一请求内只加载一次用户
+- 权限检查只需要角色等少量字段：进程内缓存 用户ID -> (角色, 是否启用, 显示名)，
+  条目在 IDENTITY_CACHE_TTL 秒后过期；update_user / delete_user 提交后主动失效本进程的条目，
+  其他工作进程在过期后读到新值
+"""
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from flask import current_app, has_request_context, request
+from app.extensions import db
+from app.models import User
+
+_REQUEST_KEY = '_identities'
+
+
+class Identity(namedtuple('Identity', 'id role is_active display_name')):
+    """用户身份（权限检查所需字段）"""
+
+    __slots__ = ()
+
+    @property
+    def is_admin(self):
+        """是否管理员"""
+        return self.role == 'admin'
+
+    @classmethod
+    def from_user(cls, user):
+        return cls(user.id, user.role, user.is_active, user.display_name)
+
+
+class IdentityCache:
+    """进程内身份缓存（LRU，条目带过期时间）"""
+
+    def __init__(self, ttl=30, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # user_id -> (expires_at, Identity)
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return entry[1]
+
+    def put(self, identity):
+        with self._lock:
+            self._entries[identity.id] = (time.monotonic() + self.ttl, identity)
+            self._entries.move_to_end(identity.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id=None):
+        """失效指定用户（None 表示全部）"""
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+
+def _request_memo():
+    return request.__dict__.setdefault(_REQUEST_KEY, {}) if has_request_context() else {}
+
+
+def remember_user(user):
+    """登记已加载的用户身份（请求内与进程内缓存）"""
+    identity = Identity.from_user(user)
+    _request_memo()[user.id] = identity
+    cache = current_app.extensions.get('identity_cache')
+    if cache is not None:
+        cache.put(identity)
+    return identity
+
+
+def get_identity(user_id):
+    """用户身份（用户不存在时返回 None）"""
+    memo = _request_memo()
+    if user_id in memo:
+        return memo[user_id]
+    cache = current_app.extensions.get('identity_cache')
+    identity = cache.get(user_id) if cache is not None else None
+    if identity is None:
+        row = db.session.execute(
+            db.select(User.id, User.role, User.is_active, User.display_name)
+            .where(User.id == user_id)
+        ).first()
+        identity = Identity(*row) if row else None
+        if identity is not None and cache is not None:
+            cache.put(identity)
+    memo[user_id] = identity
+    return identity
+
+
+def invalidate_identity(user_id=None):
+    """用户变更提交后失效缓存（None 表示全部）"""
+    if has_request_context():
+        request.__dict__.pop(_REQUEST_KEY, None)
+    cache = current_app.extensions.get('identity_cache')
+    if cache is not None:
+        cache.invalidate(user_id)
+
+
+def init_identity_cache(app):
+    """为应用创建身份缓存（IDENTITY_CACHE_TTL 为 0 时不缓存）"""
+    ttl = app.config.get('IDENTITY_CACHE_TTL', 30)
+    if ttl <= 0:
+        app.extensions.pop('identity_cache', None)
+        return
+    app.extensions['identity_cache'] = IdentityCache(
+        ttl=ttl, max_entries=app.config.get('IDENTITY_CACHE_MAX_ENTRIES', 10000),
+    )
@@ -0,0 +1,125 @@
+"""IP地址检索
+
+把IP类关键词解析为排序键区间，由 *_ip_key 列上的索引做范围扫描：
+- 完整地址: 10.1.2.3 / fd00::1
+- 前缀: 10.1. (10.1.0.0/16)、10.1 (10.1.*、10.10-19.*、10.100-199.*)
+- CIDR: 10.1.0.0/16 / fd00::/8
+- 区间: 10.1.0.1-10.1.0.50
+"""
+import ipaddress
+import re
+from app.extensions import db
+from app.models import Server, PortMapping
+from app.models.ip_key import ip_to_key, int_to_key
+
+_IPV4_PREFIX = re.compile(r'^(\d{1,3}\.){1,3}\d{0,3}$')
+
+
+def _octet_ranges(partial):
+    """以 partial 为十进制前缀的八位组取值区间"""
+    if partial == '':
+        return [(0, 255)]
+    if partial.startswith('0'):
+        return [(0, 0)] if partial == '0' else []
+    value = int(partial)
+    ranges = []
+    for scale in (1, 10, 100):
+        low, high = value * scale, value * scale + scale - 1
+        if low > 255:
+            break
+        ranges.append((low, min(high, 255)))
+    return ranges
+
+
+def _ipv4_prefix_ranges(keyword):
+    parts = keyword.split('.')
+    complete, partial = parts[:-1], parts[-1]
+    if any(int(octet) > 255 for octet in complete):
+        return []
+    if len(parts) == 4 and partial:
+        # 四段完整地址按精确匹配处理
+        key = ip_to_key(keyword)
+        return [(key, key)] if key else []
+
+    shift = 8 * (3 - len(complete))
+    base = 0
+    for i, octet in enumerate(complete):
+        base |= int(octet) << (8 * (3 - i))
+    return [
+        (int_to_key(base | low << shift, 4),
+         int_to_key(base | high << shift | ((1 << shift) - 1), 4))
+        for low, high in _octet_ranges(partial)
+    ]
+
+
+def parse_ip_query(keyword):
+    """
+    解析IP检索关键词
+
+    Returns:
+        list: [(low_key, high_key)] 闭区间列表；不是IP类关键词时返回 None
+    """
+    keyword = keyword.strip()
+    try:
+        if '/' in keyword:
+            network = ipaddress.ip_network(keyword, strict=False)
+            return [(ip_to_key(str(network.network_address)),
+                     ip_to_key(str(network.broadcast_address)))]
+        if '-' in keyword:
+            start, end = (ipaddress.ip_address(p.strip()) for p in keyword.split('-', 1))
+            if start.version != end.version:
+                return None
+            start, end = min(start, end), max(start, end)
+            return [(ip_to_key(str(start)), ip_to_key(str(end)))]
+        if ':' in keyword:
+            key = ip_to_key(keyword)
+            return [(key, key)] if key else None
+    except ValueError:
+        return None
+    if _IPV4_PREFIX.match(keyword):
+        return _ipv4_prefix_ranges(keyword)
+    return None
+
+
+def ip_condition(columns, ranges):
+    """任一列落在任一区间内"""
+    if not ranges:
+        return db.false()
+    return db.or_(*[column.between(low, high) for column in columns for low, high in ranges])
+
+
+def server_ip_condition(ranges):
+    """服务器内网/外网IP检索条件"""
+    return ip_condition([Server.internal_ip_key, Server.external_ip_key], ranges)
+
+
+def port_mapping_ip_condition(ranges):
+    """端口映射内网/外网IP检索条件"""
+    return ip_condition([PortMapping.internal_ip_key, PortMapping.external_ip_key], ranges)
+
+
+def rebuild_ip_keys(batch_size=1000):
+    """回填IP排序键（用于升级前已有的数据），返回各表更新行数"""
+    stats = {}
+    for model in (Server, PortMapping):
+        table = model.__table__
+        stats[table.name] = 0
+        last_id = 0
+        while True:
+            rows = db.session.query(model.id, model.internal_ip, model.external_ip).filter(
+                model.id > last_id
+            ).order_by(model.id).limit(batch_size).all()
+            if not rows:
+                break
+            db.session.execute(
+                table.update().where(table.c.id == db.bindparam('rid')).values(
+                    internal_ip_key=db.bindparam('internal_key'),
+                    external_ip_key=db.bindparam('external_key'),
+                ),
+                [{'rid': rid, 'internal_key': ip_to_key(internal_ip), 'external_key': ip_to_key(external_ip)}
+                 for rid, internal_ip, external_ip in rows],
+            )
+            stats[table.name] += len(rows)
+            last_id = rows[-1][0]
+    db.session.commit()
+    return stats
@@ -0,0 +1,216 @@
+"""登录保护：密码哈希线程池与登录限流
+
+- 密码校验与哈希交给有界线程池（LOGIN_HASH_WORKERS 个线程，最多 LOGIN_HASH_QUEUE 个排队），
+  同时进行的哈希计算有上限，登录高峰不会占满全部请求线程；排队已满或等待超时时登录返回 503
+- 令牌桶限流（进程内）：按来源IP计每次尝试；失败的尝试按 (用户名, 来源IP) 计，
+  另按用户名计全局上限防止分散IP的猜测，曾在该IP登录成功的用户不受全局上限影响，
+  他人无法从其他IP锁定账号；超出时返回 429 与 Retry-After，不进行哈希计算
+- 部署在反向代理之后时由 PROXY_FIX_X_FOR（见 create_app）还原真实来源IP
+- 登录成功时若密码哈希的算法或参数与 PASSWORD_HASH_METHOD 不同，按新参数重新哈希并保存
+"""
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class LoginBusyError(Exception):
+    """哈希线程池已满或等待超时"""
+
+
+class TokenBucketLimiter:
+    """按键的令牌桶（LRU 淘汰不活跃的键）"""
+
+    def __init__(self, capacity, per_minute, max_keys=100000):
+        self.capacity = capacity
+        self.rate = per_minute / 60.0
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()  # key -> (tokens, updated_at)
+
+    def _tokens(self, key, now):
+        tokens, updated_at = self._buckets.get(key, (self.capacity, now))
+        return min(self.capacity, tokens + (now - updated_at) * self.rate)
+
+    def _wait(self, tokens):
+        return math.ceil((1 - tokens) / self.rate) if self.rate > 0 else 60
+
+    def check(self, key):
+        """不消耗令牌，返回需要等待的秒数（0 表示可以尝试）"""
+        with self._lock:
+            tokens = self._tokens(key, time.monotonic())
+            return 0 if tokens >= 1 else self._wait(tokens)
+
+    def consume(self, key):
+        """消耗一个令牌，返回需要等待的秒数（0 表示已消耗）"""
+        with self._lock:
+            now = time.monotonic()
+            tokens = self._tokens(key, now)
+            if tokens < 1:
+                return self._wait(tokens)
+            self._buckets[key] = (tokens - 1, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return 0
+
+
+class PasswordHasher:
+    """有界线程池中的密码哈希（workers 为 0 时在请求线程中计算）"""
+
+    def __init__(self, method='scrypt', workers=2, queue_size=16, timeout=10.0):
+        self.method = method
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(workers + queue_size) if workers else None
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self._prefix = None
+        self.rejected = 0
+
+    def _get_executor(self):
+        """按进程创建线程池（兼容预加载后 fork 的工作进程）"""
+        with self._lock:
+            if self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix='password-hash')
+                self._pid = os.getpid()
+            return self._executor
+
+    def _run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise LoginBusyError()
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(self.timeout)
+        except FutureTimeoutError:
+            self.rejected += 1
+            raise LoginBusyError()
+
+    def verify(self, pwhash, password):
+        return self._run(check_password_hash, pwhash, password)
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def needs_rehash(self, pwhash):
+        """哈希的算法与参数是否与当前配置不同"""
+        if self._prefix is None:
+            # 规范化的参数前缀（如 pbkdf2:sha256 -> pbkdf2:sha256:600000），首次使用时计算一次
+            self._prefix = self.hash('').split('$', 1)[0]
+        return pwhash.split('$', 1)[0] != self._prefix
+
+
+class LoginGuard:
+    """登录限流与密码哈希"""
+
+    def __init__(self, hasher, ip_limiter, user_limiter, account_limiter,
+                 trusted_seconds=30 * 86400, max_trusted=100000):
+        self.hasher = hasher
+        self.ip_limiter = ip_limiter
+        self.user_limiter = user_limiter        # (用户名, IP) 的失败次数
+        self.account_limiter = account_limiter  # 用户名的失败次数（全局上限）
+        self.trusted_seconds = trusted_seconds
+        self.max_trusted = max_trusted
+        self._lock = threading.Lock()
+        self._trusted = OrderedDict()  # (用户名, IP) -> 最近登录成功时刻
+        self.throttled = 0
+
+    def _is_trusted(self, key):
+        with self._lock:
+            succeeded_at = self._trusted.get(key)
+            return succeeded_at is not None and time.monotonic() - succeeded_at < self.trusted_seconds
+
+    def throttle(self, ip, username):
+        """登录尝试前调用，返回需要等待的秒数（0 表示放行）"""
+        key = (username.lower(), ip)
+        wait = self.user_limiter.check(key)
+        if not wait and not self._is_trusted(key):
+            wait = self.account_limiter.check(key[0])
+        wait = wait or self.ip_limiter.consume(ip)
+        if wait:
+            self.throttled += 1
+        return wait
+
+    def failed(self, ip, username):
+        """登录失败后计入 (用户名, IP) 与用户名的限流"""
+        key = (username.lower(), ip)
+        self.user_limiter.consume(key)
+        self.account_limiter.consume(key[0])
+
+    def succeeded(self, ip, username):
+        """登录成功后记录该IP，之后不受用户名全局上限影响"""
+        with self._lock:
+            key = (username.lower(), ip)
+            self._trusted[key] = time.monotonic()
+            self._trusted.move_to_end(key)
+            while len(self._trusted) > self.max_trusted:
+                self._trusted.popitem(last=False)
+
+    def authenticate(self, user, password):
+        """
+        校验密码，成功且需要时按新参数重新哈希（由调用方提交）
+
+        Raises:
+            LoginBusyError: 哈希线程池已满或等待超时
+        """
+        if not self.hasher.verify(user.password_hash, password):
+            return False
+        if self.hasher.needs_rehash(user.password_hash):
+            user.password_hash = self.hasher.hash(password)
+        return True
+
+    def stats(self):
+        """限流与线程池统计"""
+        return {
+            'throttled': self.throttled,
+            'busy_rejected': self.hasher.rejected,
+            'hash_workers': self.hasher.workers,
+            'hash_method': self.hasher.method,
+            'tracked_ips': len(self.ip_limiter._buckets),
+            'tracked_usernames': len(self.account_limiter._buckets),
+            'tracked_user_ips': len(self.user_limiter._buckets),
+            'trusted_user_ips': len(self._trusted),
+        }
+
+
+def init_login_guard(app):
+    """为应用创建登录保护"""
+    app.extensions['login_guard'] = LoginGuard(
+        PasswordHasher(
+            method=app.config.get('PASSWORD_HASH_METHOD', 'scrypt'),
+            workers=app.config.get('LOGIN_HASH_WORKERS', 2),
+            queue_size=app.config.get('LOGIN_HASH_QUEUE', 16),
+            timeout=app.config.get('LOGIN_HASH_TIMEOUT', 10.0),
+        ),
+        ip_limiter=TokenBucketLimiter(
+            app.config.get('LOGIN_RATE_IP_BURST', 20),
+            app.config.get('LOGIN_RATE_IP_PER_MINUTE', 30),
+        ),
+        user_limiter=TokenBucketLimiter(
+            app.config.get('LOGIN_RATE_USER_BURST', 5),
+            app.config.get('LOGIN_RATE_USER_PER_MINUTE', 5),
+        ),
+        account_limiter=TokenBucketLimiter(
+            app.config.get('LOGIN_RATE_ACCOUNT_BURST', 50),
+            app.config.get('LOGIN_RATE_ACCOUNT_PER_MINUTE', 20),
+        ),
+    )
+
+
+def get_login_guard():
+    """当前应用的登录保护"""
+    return current_app.extensions['login_guard']
+
@@ -0,0 +1,215 @@
+"""数据库连接池统计与断线处理
+
+- 配置了 pool_size 时使用 InstrumentedQueuePool：记录每次取连接的耗时
+  （含等待空闲连接、新建连接与探测），耗时超过 slow_checkout_ms 的次数与超时次数
+- 连接池事件记录新建 / 关闭 / 失效的连接数、当前连接的存活时间、借出与溢出连接数的峰值
+- DB_POOL_PRE_PING 关闭时不在每次取连接时探测，只探测空闲超过 DB_POOL_PING_IDLE_SECONDS 秒的连接
+  （数据库或中间设备最可能在空闲期间断开连接），探测失败时丢弃该连接并重新取；
+  语句执行中遇到断线错误时 SQLAlchemy 使整个连接池失效，之后的请求使用新连接
+- 统计按进程记录，由 GET /api/metrics/pool 返回
+"""
+import threading
+import time
+from collections import deque
+from flask import current_app
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+from app.extensions import db
+
+
+class InstrumentedQueuePool(QueuePool):
+    """记录取连接耗时的 QueuePool"""
+
+    monitor = None
+
+    def connect(self):
+        monitor = self.monitor
+        if monitor is None:
+            return super().connect()
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            monitor.record_checkout(time.perf_counter() - start, timed_out=True)
+            raise
+        monitor.record_checkout(time.perf_counter() - start)
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.monitor = self.monitor
+        return pool
+
+
+def engine_options(options):
+    """配置了连接池大小时改用 InstrumentedQueuePool（内存 SQLite 等单连接池保持不变）"""
+    options = dict(options)
+    if 'pool_size' in options:
+        options.setdefault('poolclass', InstrumentedQueuePool)
+    return options
+
+
+class PoolMonitor:
+    """单个引擎的连接池统计"""
+
+    def __init__(self, engine, ping_idle_seconds=0, slow_checkout_ms=5, window=1024):
+        self.engine = engine
+        self.ping_idle_seconds = ping_idle_seconds
+        self.slow_checkout_ms = slow_checkout_ms
+        self._lock = threading.Lock()
+        self._checkout_ms = deque(maxlen=window)
+        self._created = {}  # id(connection_record) -> 建立时刻
+        self.checkouts = 0
+        self.slow_checkouts = 0
+        self.timeouts = 0
+        self.opened = 0
+        self.closed = 0
+        self.invalidated = 0
+        self.pings = 0
+        self.ping_failures = 0
+        self.disconnects = 0
+        self.peak_checked_out = 0
+        self.peak_overflow = 0
+
+    def attach(self):
+        """注册连接池与引擎事件"""
+        for name, fn in (('connect', self._on_connect),
+                         ('close', self._on_close),
+                         ('close_detached', self._on_close_detached),
+                         ('invalidate', self._on_invalidate),
+                         ('checkout', self._on_checkout),
+                         ('checkin', self._on_checkin),
+                         ('handle_error', self._on_error)):
+            if not event.contains(self.engine, name, fn):
+                event.listen(self.engine, name, fn)
+        if isinstance(self.engine.pool, InstrumentedQueuePool):
+            self.engine.pool.monitor = self
+
+    def record_checkout(self, seconds, timed_out=False):
+        ms = seconds * 1000
+        with self._lock:
+            self._checkout_ms.append(ms)
+            self.slow_checkouts += ms > self.slow_checkout_ms
+            self.timeouts += timed_out
+
+    # ---------- 连接池事件 ----------
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.opened += 1
+            self._created[id(connection_record)] = time.monotonic()
+
+    def _on_close(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.closed += 1
+            self._created.pop(id(connection_record), None)
+
+    def _on_close_detached(self, dbapi_connection):
+        with self._lock:
+            self.closed += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.invalidated += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        pool = self.engine.pool
+        with self._lock:
+            self.checkouts += 1
+            if isinstance(pool, QueuePool):
+                self.peak_checked_out = max(self.peak_checked_out, pool.checkedout())
+                self.peak_overflow = max(self.peak_overflow, pool.overflow())
+        checked_in_at = connection_record.info.pop('checked_in_at', None)
+        if (self.ping_idle_seconds and checked_in_at is not None
+                and time.monotonic() - checked_in_at > self.ping_idle_seconds):
+            self._ping(dbapi_connection)
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        connection_record.info['checked_in_at'] = time.monotonic()
+
+    def _on_error(self, context):
+        if context.is_disconnect:
+            with self._lock:
+                self.disconnects += 1
+
+    def _ping(self, dbapi_connection):
+        """探测空闲连接，失败时由连接池丢弃该连接并重新取"""
+        with self._lock:
+            self.pings += 1
+        try:
+            cursor = dbapi_connection.cursor()
+            try:
+                cursor.execute('SELECT 1')
+            finally:
+                cursor.close()
+        except Exception as e:
+            with self._lock:
+                self.ping_failures += 1
+            raise exc.DisconnectionError() from e
+
+    # ---------- 统计 ----------
+
+    def stats(self):
+        pool = self.engine.pool
+        now = time.monotonic()
+        with self._lock:
+            checkout_ms = sorted(self._checkout_ms)
+            ages = [now - created for created in self._created.values()]
+            result = {
+                'pool': type(pool).__name__,
+                'checkouts': self.checkouts,
+                'slow_checkouts': self.slow_checkouts,
+                'slow_checkout_ms': self.slow_checkout_ms,
+                'timeouts': self.timeouts,
+                'checkout_ms': {
+                    'avg': round(sum(checkout_ms) / len(checkout_ms), 3) if checkout_ms else None,
+                    'p95': round(checkout_ms[int(len(checkout_ms) * 0.95)], 3) if checkout_ms else None,
+                    'max': round(checkout_ms[-1], 3) if checkout_ms else None,
+                },
+                'connections': {
+                    'open': len(ages),
+                    'opened': self.opened,
+                    'closed': self.closed,
+                    'invalidated': self.invalidated,
+                    'age_seconds': {
+                        'min': round(min(ages), 1) if ages else None,
+                        'avg': round(sum(ages) / len(ages), 1) if ages else None,
+                        'max': round(max(ages), 1) if ages else None,
+                    },
+                },
+                'pre_ping': bool(getattr(pool, '_pre_ping', False)),
+                'idle_pings': self.pings,
+                'ping_failures': self.ping_failures,
+                'disconnects': self.disconnects,
+            }
+        if isinstance(pool, QueuePool):
+            result.update(
+                size=pool.size(),
+                checked_out=pool.checkedout(),
+                peak_checked_out=self.peak_checked_out,
+                idle=pool.checkedin(),
+                overflow=max(pool.overflow(), 0),
+                max_overflow=pool._max_overflow,
+                peak_overflow=max(self.peak_overflow, 0),
+                timeout=pool.timeout(),
+                recycle=pool._recycle,
+            )
+        return result
+
+
+def init_pool_metrics(app):
+    """为应用的数据库引擎注册连接池统计（关闭 pre_ping 时探测空闲连接）"""
+    with app.app_context():
+        engine = db.engine
+    pre_ping = app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}).get('pool_pre_ping', False)
+    monitor = PoolMonitor(
+        engine,
+        ping_idle_seconds=0 if pre_ping else app.config.get('DB_POOL_PING_IDLE_SECONDS', 30),
+    )
+    monitor.attach()
+    app.extensions['pool_monitor'] = monitor
+
+
+def get_pool_monitor():
+    """当前应用的连接池统计"""
+    return current_app.extensions.get('pool_monitor')
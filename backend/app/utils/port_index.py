@@ -0,0 +1,311 @@
+"""端口占用索引
+
+进程内维护 (IP, 协议, 端口) -> 端口映射ID 的占用表，用于：
+- 写入时 O(1) 检测端口冲突
+- 按 IP 分配空闲端口段（每个 IP+协议 维护有序的已占用端口列表）
+- 全量冲突报告（一次联表查询，单遍分组）
+
+内网侧使用映射的 internal_ip（为空时取所属服务器的内网IP），外网侧仅在
+external_ip 和 external_port 都存在时占用。与自动补全索引相同，本进程写入在
+提交后同步，其他工作进程的写入在 PORT_INDEX_REFRESH_SECONDS 后重建时生效。
+
+索引只用于提前拒绝；写入端口映射的事务在插入前调用 lock_port_slots 锁定
+table_versions 中的 port_slots 计数行，再按待写入端口查询数据库复核
+（find_conflicts_in_db），并发请求或其他工作进程的写入不会产生重复占用。
+"""
+import bisect
+import ipaddress
+import threading
+import time
+from collections import defaultdict
+from functools import lru_cache
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from app.extensions import db
+from app.models import Server, Container, PortMapping
+from app.utils.table_versions import bump_counters, table_ready
+
+MIN_PORT = 1
+MAX_PORT = 65535
+SLOT_LOCK = 'port_slots'  # 写端口映射前递增，用作端口占用锁
+_PENDING_KEY = 'port_index_pending'
+
+
+@lru_cache(maxsize=65536)
+def normalize_ip(ip):
+    """统一IP写法（如 IPv6 压缩形式），IP数量远小于映射数，结果缓存"""
+    ip = (ip or '').strip()
+    try:
+        return ipaddress.ip_address(ip).compressed
+    except ValueError:
+        return ip.lower()
+
+
+def mapping_slots(server_ip, internal_ip, internal_port, external_ip, external_port, protocol):
+    """端口映射占用的 (ip, 协议, 端口) 列表"""
+    protocol = (protocol or 'tcp').lower()
+    slots = []
+    ip = internal_ip or server_ip
+    if ip and internal_port:
+        slots.append((normalize_ip(ip), protocol, int(internal_port)))
+    if external_ip and external_port:
+        slots.append((normalize_ip(external_ip), protocol, int(external_port)))
+    return slots
+
+
+class PortIndex:
+    """端口占用索引"""
+
+    def __init__(self, refresh_seconds=60):
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.RLock()
+        self._built_at = None
+        self._reset()
+
+    def _reset(self):
+        self._slots = {}                  # (ip, protocol, port) -> set(mapping_id)
+        self._used = defaultdict(list)    # (ip, protocol) -> 有序已占用端口
+        self._mappings = {}               # mapping_id -> (container_id, [slot])
+
+    # ---------- 构建与维护 ----------
+
+    def build(self):
+        """
+        从数据库全量构建（单次联表查询）
+
+        Returns:
+            list: 构建过程中发现的冲突
+        """
+        rows = db.session.execute(db.select(
+            PortMapping.id, PortMapping.container_id, Server.internal_ip,
+            PortMapping.internal_ip, PortMapping.internal_port,
+            PortMapping.external_ip, PortMapping.external_port, PortMapping.protocol,
+        ).join(Container, PortMapping.container_id == Container.id).join(
+            Server, Container.server_id == Server.id
+        )).all()
+        with self._lock:
+            self._reset()
+            for mapping_id, container_id, server_ip, *fields in rows:
+                self._add(mapping_id, container_id, mapping_slots(server_ip, *fields))
+            self._built_at = time.monotonic()
+            return self.conflicts()
+
+    def ensure_fresh(self):
+        """首次使用、超过刷新间隔或被标记失效时重建"""
+        if self._built_at is None or time.monotonic() - self._built_at > self.refresh_seconds:
+            self.build()
+
+    def invalidate(self):
+        """标记失效，下次使用时重建（用于无法增量同步的变更）"""
+        self._built_at = None
+
+    def _add(self, mapping_id, container_id, slots):
+        self._mappings[mapping_id] = (container_id, slots)
+        for slot in slots:
+            owners = self._slots.get(slot)
+            if owners is None:
+                self._slots[slot] = {mapping_id}
+                bisect.insort(self._used[slot[:2]], slot[2])
+            else:
+                owners.add(mapping_id)
+
+    def _remove(self, mapping_id):
+        entry = self._mappings.pop(mapping_id, None)
+        if entry is None:
+            return
+        for slot in entry[1]:
+            owners = self._slots.get(slot)
+            if owners is None:
+                continue
+            owners.discard(mapping_id)
+            if not owners:
+                del self._slots[slot]
+                ports = self._used[slot[:2]]
+                ports.pop(bisect.bisect_left(ports, slot[2]))
+                if not ports:
+                    del self._used[slot[:2]]
+
+    def apply(self, changes):
+        """应用已提交的变更 [(op, mapping_id, container_id, slots)]"""
+        if self._built_at is None:
+            return
+        with self._lock:
+            for op, mapping_id, container_id, slots in changes:
+                if op == 'invalidate':
+                    self.invalidate()
+                    return
+                self._remove(mapping_id)
+                if op == 'put':
+                    self._add(mapping_id, container_id, slots)
+
+    # ---------- 查询 ----------
+
+    def find_conflicts(self, slots, exclude_container_id=None):
+        """
+        检测待写入端口与已有映射（及彼此之间）的冲突
+
+        Args:
+            slots: 待写入的 (ip, 协议, 端口) 列表
+            exclude_container_id: 忽略该容器现有的映射（更新容器时整体替换）
+
+        Returns:
+            list: [{'ip', 'protocol', 'port', 'container_ids'}]
+        """
+        conflicts = []
+        seen = set()
+        with self._lock:
+            for slot in slots:
+                container_ids = {
+                    self._mappings[mid][0] for mid in self._slots.get(slot, ())
+                } - {exclude_container_id}
+                if container_ids or slot in seen:
+                    conflicts.append({
+                        'ip': slot[0], 'protocol': slot[1], 'port': slot[2],
+                        'container_ids': sorted(container_ids),  # 为空表示与本次提交的其他映射重复
+                    })
+                seen.add(slot)
+        return conflicts
+
+    def free_ranges(self, ip, count, protocol='tcp', start=MIN_PORT, end=MAX_PORT, contiguous=False):
+        """
+        按首次适配分配空闲端口
+
+        Returns:
+            list: [[起始端口, 结束端口]]，合计 count 个端口；空间不足时返回空列表
+        """
+        with self._lock:
+            used = self._used.get((normalize_ip(ip), protocol.lower()), [])
+            ranges, remaining = [], count
+            port = start
+            for taken in used[bisect.bisect_left(used, start):] + [end + 1]:
+                gap_end = min(taken - 1, end)
+                gap = gap_end - port + 1
+                if gap >= (count if contiguous else 1):
+                    size = min(gap, remaining)
+                    ranges.append([port, port + size - 1])
+                    remaining -= size
+                    if remaining == 0:
+                        return ranges
+                port = max(port, taken + 1)
+                if port > end:
+                    break
+            return []
+
+    def conflicts(self):
+        """当前索引中的全部冲突"""
+        with self._lock:
+            duplicated = sorted(slot for slot, owners in self._slots.items() if len(owners) > 1)
+            return [
+                {
+                    'ip': ip, 'protocol': protocol, 'port': port,
+                    'mapping_ids': sorted(self._slots[(ip, protocol, port)]),
+                    'container_ids': sorted({
+                        self._mappings[mid][0] for mid in self._slots[(ip, protocol, port)]
+                    }),
+                }
+                for ip, protocol, port in duplicated
+            ]
+
+
+# ---------- 事务内复核 ----------
+
+def lock_port_slots(connection):
+    """在 connection 的当前事务中锁定端口占用，写端口映射的事务依次执行到提交"""
+    if table_ready(connection):
+        bump_counters(connection, [SLOT_LOCK])
+
+
+def find_conflicts_in_db(slots, exclude_container_id=None):
+    """
+    按数据库中已有的映射检测冲突（在 lock_port_slots 之后调用）
+
+    只查询端口相同的映射，结果格式同 PortIndex.find_conflicts。
+    """
+    ports = {slot[2] for slot in slots}
+    if not ports:
+        return []
+    query = db.select(
+        PortMapping.container_id, Server.internal_ip,
+        PortMapping.internal_ip, PortMapping.internal_port,
+        PortMapping.external_ip, PortMapping.external_port, PortMapping.protocol,
+    ).join(Container, PortMapping.container_id == Container.id).join(
+        Server, Container.server_id == Server.id
+    ).where(PortMapping.internal_port.in_(ports) | PortMapping.external_port.in_(ports))
+    if exclude_container_id is not None:
+        query = query.where(PortMapping.container_id != exclude_container_id)
+    owners = defaultdict(set)
+    for container_id, server_ip, *fields in db.session.execute(query):
+        for slot in mapping_slots(server_ip, *fields):
+            owners[slot].add(container_id)
+    conflicts = []
+    seen = set()
+    for slot in slots:
+        if owners.get(slot) or slot in seen:
+            conflicts.append({
+                'ip': slot[0], 'protocol': slot[1], 'port': slot[2],
+                'container_ids': sorted(owners.get(slot, ())),
+            })
+        seen.add(slot)
+    return conflicts
+
+
+# ---------- 会话事件 ----------
+
+def _changed(obj, *fields):
+    state = inspect(obj)
+    return any(state.attrs[f].history.has_changes() for f in fields)
+
+
+def _collect_changes(session, flush_context):
+    """after_flush: 记录待提交的端口占用变更"""
+    pending = session.info.setdefault(_PENDING_KEY, [])
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, PortMapping):
+            container = session.get(Container, obj.container_id)
+            server = session.get(Server, container.server_id) if container else None
+            pending.append(('put', obj.id, obj.container_id, mapping_slots(
+                server.internal_ip if server else None, obj.internal_ip, obj.internal_port,
+                obj.external_ip, obj.external_port, obj.protocol,
+            )))
+    for obj in session.dirty:
+        # 服务器IP或容器所属服务器变化会影响沿用服务器IP的映射，整体重建
+        if (isinstance(obj, Server) and _changed(obj, 'internal_ip')) or \
+                (isinstance(obj, Container) and _changed(obj, 'server_id')):
+            pending.append(('invalidate', None, None, None))
+    for obj in session.deleted:
+        if isinstance(obj, PortMapping):
+            pending.append(('delete', obj.id, None, None))
+
+
+def _apply_changes(session):
+    """after_commit: 变更生效"""
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending and has_app_context():
+        index = current_app.extensions.get('port_index')
+        if index is not None:
+            index.apply(pending)
+
+
+def _discard_changes(session, previous_transaction):
+    """after_soft_rollback: 丢弃未提交的变更"""
+    session.info.pop(_PENDING_KEY, None)
+
+
+def init_port_index(app):
+    """为应用创建端口占用索引并注册会话事件"""
+    app.extensions['port_index'] = PortIndex(
+        refresh_seconds=app.config.get('PORT_INDEX_REFRESH_SECONDS', 60),
+    )
+    for name, fn in (('after_flush', _collect_changes),
+                     ('after_commit', _apply_changes),
+                     ('after_soft_rollback', _discard_changes)):
+        if not event.contains(Session, name, fn):
+            event.listen(Session, name, fn)
+
+
+def get_port_index():
+    """当前应用的端口占用索引（按需构建/刷新）"""
+    index = current_app.extensions['port_index']
+    index.ensure_fresh()
+    return index
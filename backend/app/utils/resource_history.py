@@ -0,0 +1,211 @@
+"""资源变更历史与按时间点还原
+
+- 单个资源的审计日志按 (resource_type, resource_id, created_at) 索引读取
+- 按时间点还原：从时间点之后最早的检查点（没有则为当前状态）开始，按时间倒序回放其间的审计日志，
+  把 changes 中的字段恢复为 old 值；遇到删除日志时以删除快照为状态（已删除的资源也能还原），
+  遇到创建日志说明该时间点资源尚不存在
+- 检查点由 `flask maintain-audit-logs` 定期写入：自上次检查点以来变更达到
+  AUDIT_CHECKPOINT_INTERVAL 条的资源保存一份当前状态，单次回放的日志条数因此有上界
+"""
+import json
+from datetime import datetime, timedelta, timezone
+from flask import current_app
+from sqlalchemy.orm import undefer
+from app.extensions import db
+from app.models import (
+    ResourceCheckpoint, Server, Container, Service, GPU, Datacenter, Environment, User
+)
+from app.utils import cursor_paginate_query
+from app.utils.audit_partitions import audit_log_entity, retention_cutoff
+from app.utils.audit_writer import READ_FLUSH_TIMEOUT, get_audit_writer
+
+YIELD_PER = 1000
+CHUNK_SIZE = 1000
+# 从检查点回放时多回放的时间窗口：审计日志在业务提交之后生成，时间可能略晚于已包含该变更的检查点。
+# 倒序回放未体现在状态中的变更，最终会恢复为状态中的原值，多回放不影响结果
+CHECKPOINT_SKEW = timedelta(seconds=5)
+
+RESOURCE_MODELS = {
+    'server': Server, 'container': Container, 'service': Service,
+    'gpu': GPU, 'datacenter': Datacenter, 'user': User,
+}
+CREATE_ACTIONS = ('create', 'import')
+DELETE_ACTIONS = ('delete', 'batch_delete')
+
+# 不参与还原的子资源与统计字段（删除快照中包含）
+_DERIVED_KEYS = (
+    'containers', 'gpus', 'services', 'port_mappings',
+    'container_count', 'gpu_count', 'service_count',
+)
+
+
+def _flush_pending():
+    writer = get_audit_writer()
+    if writer is not None:
+        writer.flush(timeout=READ_FLUSH_TIMEOUT)
+
+
+def parse_as_of(value):
+    """
+    解析时间点参数（ISO 8601，带时区时转换为UTC）
+
+    Raises:
+        ValueError: 格式无效或早于审计日志保留期
+    """
+    try:
+        as_of = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError('as_of 时间格式无效')
+    if as_of.tzinfo is not None:
+        as_of = as_of.astimezone(timezone.utc).replace(tzinfo=None)
+    if as_of < retention_cutoff(current_app.config.get('AUDIT_RETENTION_MONTHS', 12)):
+        raise ValueError('该时间点早于审计日志保留期，无法还原')
+    return as_of
+
+
+def resource_history(resource_type, resource_id, cursor=None, page_size=20):
+    """
+    单个资源的审计日志（按时间倒序，游标分页，含变更内容）
+
+    Returns:
+        dict: {'items': [...], 'pagination': {...}}
+    """
+    _flush_pending()
+    entity = audit_log_entity()
+    query = db.session.query(entity).options(undefer(entity.changes)).filter(
+        entity.resource_type == resource_type, entity.resource_id == resource_id
+    )
+    result = cursor_paginate_query(
+        query, [entity.created_at, entity.id], cursor, page_size, descending=True
+    )
+    result['items'] = [dict(log.to_dict(), changes=log.get_changes()) for log in result['items']]
+    return result
+
+
+def _strip(state):
+    return {key: value for key, value in state.items() if key not in _DERIVED_KEYS}
+
+
+def state_as_of(resource_type, resource_id, as_of, current=None):
+    """
+    还原资源在 as_of 时刻的状态
+
+    Args:
+        current: 资源当前状态（to_dict），资源已删除时为 None
+
+    Returns:
+        tuple: (state, replayed)，该时间点资源不存在时 state 为 None；replayed 为回放的日志条数
+    """
+    _flush_pending()
+    checkpoint = ResourceCheckpoint.query.filter(
+        ResourceCheckpoint.resource_type == resource_type,
+        ResourceCheckpoint.resource_id == resource_id,
+        ResourceCheckpoint.created_at > as_of,
+    ).order_by(ResourceCheckpoint.created_at.asc()).first()
+    if checkpoint is not None:
+        state, until = checkpoint.get_state(), checkpoint.created_at + CHECKPOINT_SKEW
+    else:
+        state, until = (dict(current) if current is not None else None), None
+
+    entity = audit_log_entity(as_of, until)
+    conditions = [
+        entity.resource_type == resource_type,
+        entity.resource_id == resource_id,
+        entity.created_at > as_of,
+    ]
+    if until is not None:
+        conditions.append(entity.created_at <= until)
+    rows = db.session.query(entity.action, entity.changes, entity.snapshot).filter(
+        *conditions
+    ).order_by(entity.created_at.desc(), entity.id.desc()).yield_per(YIELD_PER)
+
+    replayed = 0
+    for action, changes, snapshot in rows:
+        replayed += 1
+        if action in CREATE_ACTIONS:
+            return None, replayed
+        if action in DELETE_ACTIONS:
+            if snapshot:
+                state = json.loads(snapshot)
+        elif state is not None and changes:
+            for field, change in json.loads(changes).items():
+                if field in state and isinstance(change, dict) and 'old' in change:
+                    state[field] = change['old']
+
+    if state is None:
+        return None, replayed
+    state = _strip(state)
+    resolve = _RESOLVERS.get(resource_type)
+    if resolve:
+        resolve(state)
+    return state, replayed
+
+
+def _resolve_server(state):
+    """按还原后的关联ID刷新名称，重新拼接 SSH 命令"""
+    datacenter = db.session.get(Datacenter, state['datacenter_id']) if state.get('datacenter_id') else None
+    environment = db.session.get(Environment, state['environment_id']) if state.get('environment_id') else None
+    state['datacenter_name'] = datacenter.name if datacenter else None
+    state['environment_name'] = environment.name if environment else None
+    state['environment_color'] = environment.color if environment else None
+    state['ssh_command'] = Server.format_ssh_command(
+        state.get('ssh_port'), state.get('ssh_user'), state.get('internal_ip')
+    )
+
+
+_RESOLVERS = {'server': _resolve_server}
+
+
+def write_checkpoints(interval=50):
+    """
+    为自上次检查点以来审计日志达到 interval 条的现存资源写入检查点
+
+    Returns:
+        dict: {资源类型: 写入数量}
+    """
+    ResourceCheckpoint.__table__.create(db.engine, checkfirst=True)  # 已有数据库首次运行时建表
+    entity = audit_log_entity()
+    last = db.session.query(
+        ResourceCheckpoint.resource_type, ResourceCheckpoint.resource_id,
+        db.func.max(ResourceCheckpoint.created_at).label('created_at'),
+    ).group_by(ResourceCheckpoint.resource_type, ResourceCheckpoint.resource_id).subquery()
+    due = db.session.query(entity.resource_type, entity.resource_id).outerjoin(
+        last, db.and_(last.c.resource_type == entity.resource_type,
+                      last.c.resource_id == entity.resource_id)
+    ).filter(
+        entity.resource_type.in_(list(RESOURCE_MODELS)),
+        db.or_(last.c.created_at.is_(None), entity.created_at > last.c.created_at),
+    ).group_by(entity.resource_type, entity.resource_id).having(db.func.count() >= interval).all()
+
+    by_type = {}
+    for resource_type, resource_id in due:
+        by_type.setdefault(resource_type, []).append(resource_id)
+
+    written = {}
+    for resource_type, ids in by_type.items():
+        model = RESOURCE_MODELS[resource_type]
+        for start in range(0, len(ids), CHUNK_SIZE):
+            states = [
+                (obj.id, json.dumps(_strip(obj.to_dict()), ensure_ascii=False, default=str))
+                for obj in model.query.filter(model.id.in_(ids[start:start + CHUNK_SIZE]))
+            ]
+            # 检查点时间取读取状态之后
+            created_at = datetime.utcnow()
+            if states:
+                db.session.execute(ResourceCheckpoint.__table__.insert(), [
+                    {'resource_type': resource_type, 'resource_id': resource_id,
+                     'state': state, 'created_at': created_at}
+                    for resource_id, state in states
+                ])
+                db.session.commit()
+            written[resource_type] = written.get(resource_type, 0) + len(states)
+    return written
+
+
+def prune_checkpoints(cutoff):
+    """删除早于保留期的检查点（按时间点还原不会早于保留期），返回删除数量"""
+    result = db.session.execute(
+        db.delete(ResourceCheckpoint).where(ResourceCheckpoint.created_at < cutoff)
+    )
+    db.session.commit()
+    return result.rowcount
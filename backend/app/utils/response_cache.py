@@ -0,0 +1,215 @@
+"""读多写少接口的响应缓存
+
+仪表盘轮询的 /api/servers/tree、/api/datacenters/overview 等接口数据很少变化，
+缓存序列化后的响应体，写入时按表精确失效：
+- 缓存键由端点、规范化的查询参数（按名称排序，多值排序，忽略空值）和所依赖各表的版本号组成
+- 表版本号由 table_versions 维护（会话 after_flush 与批量 DML 在写入事务内递增），
+  依赖其他表的缓存不受影响；旧版本的条目不再命中，由 LRU / TTL 淘汰。
+  版本号与数据在同一事务中读取，计算期间有写入提交时结果存入旧键，不会被读到；
+  版本号存储在数据库中，进程内缓存也能感知其他工作进程的写入
+- 后端可插拔：进程内 LRU（默认）或 Redis 兼容客户端（多工作进程共享缓存条目）
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, request
+from app.utils.table_versions import get_versions
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+KEY_PREFIX = 'resp:'
+
+
+class MemoryCacheBackend:
+    """进程内 LRU 缓存（条目带过期时间）"""
+
+    name = 'memory'
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def size(self):
+        return len(self._entries)
+
+
+class RedisCacheBackend:
+    """Redis 兼容客户端后端（需支持 get / set(ex=) / scan_iter / delete）"""
+
+    name = 'redis'
+
+    def __init__(self, client, prefix='itam:'):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key):
+        return self.client.get(self.prefix + key)
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, value, ex=max(1, int(ttl)))
+
+    def clear(self):
+        keys = list(self.client.scan_iter(f'{self.prefix}{KEY_PREFIX}*'))
+        if keys:
+            self.client.delete(*keys)
+
+    def size(self):
+        return None
+
+
+class ResponseCache:
+    """响应缓存：按端点、参数与表版本号缓存响应体"""
+
+    def __init__(self, backend, default_ttl=30):
+        self.backend = backend
+        self.default_ttl = default_ttl
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'stores': 0, 'errors': 0}
+        self._endpoints = {}  # endpoint -> {'hits', 'misses'}
+
+    def _count(self, endpoint, name):
+        with self._lock:
+            self._stats[name] += 1
+            if name in ('hits', 'misses'):
+                counts = self._endpoints.setdefault(endpoint, {'hits': 0, 'misses': 0})
+                counts[name] += 1
+
+    def make_key(self, endpoint, args, tables):
+        """缓存键: 端点 + 规范化参数 + 依赖表版本号（版本号不可用时返回 None）"""
+        params = sorted(
+            (name, sorted(value for value in args.getlist(name) if value != ''))
+            for name in args
+        )
+        query = '&'.join(f'{name}={",".join(values)}' for name, values in params if values)
+        versions = get_versions(tables)
+        if versions is None:
+            return None
+        stamp = ','.join(f'{name}:{version}' for name, (version, _) in versions.items())
+        digest = hashlib.sha1(f'{query}|{stamp}'.encode('utf-8')).hexdigest()
+        return f'{KEY_PREFIX}{endpoint}:{digest}'
+
+    def get(self, endpoint, key):
+        try:
+            value = self.backend.get(key)
+        except Exception:
+            # 缓存不可用时直接回源
+            self._count(endpoint, 'errors')
+            value = None
+        self._count(endpoint, 'misses' if value is None else 'hits')
+        return value
+
+    def set(self, key, value, ttl=None):
+        try:
+            self.backend.set(key, value, ttl or self.default_ttl)
+        except Exception:
+            self._count(None, 'errors')
+            return
+        self._count(None, 'stores')
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        """命中统计"""
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return dict(
+                self._stats,
+                backend=self.backend.name,
+                entries=self.backend.size(),
+                default_ttl=self.default_ttl,
+                hit_rate=round(self._stats['hits'] / lookups, 4) if lookups else None,
+                endpoints={name: dict(counts) for name, counts in self._endpoints.items()},
+            )
+
+
+def cached_response(tables, ttl=None):
+    """
+    缓存成功响应的装饰器（放在 jwt_required 之后，鉴权仍逐次执行）
+
+    Args:
+        tables: 响应所依赖的表名（须在 table_versions.TRACKED_TABLES 中），任一表有写入提交时缓存失效
+        ttl: 过期秒数，默认 RESPONSE_CACHE_TTL
+    """
+    tables = sorted(tables)
+
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            cache = current_app.extensions.get('response_cache')
+            if cache is None:
+                return fn(*args, **kwargs)
+            endpoint = request.endpoint
+            key = cache.make_key(endpoint, request.args, tables)
+            if key is None:
+                return fn(*args, **kwargs)
+            body = cache.get(endpoint, key)
+            if body is not None:
+                return current_app.response_class(body, mimetype='application/json')
+
+            response = current_app.make_response(fn(*args, **kwargs))
+            if response.status_code == 200:
+                cache.set(key, response.get_data(), ttl)
+            return response
+        return wrapper
+    return decorator
+
+
+def create_backend(app):
+    """按配置创建缓存后端（redis 客户端未安装或未配置地址时退回进程内缓存）"""
+    name = app.config.get('RESPONSE_CACHE_BACKEND', 'memory')
+    if name == 'redis':
+        url = app.config.get('RESPONSE_CACHE_REDIS_URL')
+        if redis is not None and url:
+            return RedisCacheBackend(redis.Redis.from_url(url))
+        app.logger.warning('Redis 缓存后端不可用（未安装 redis 或未配置地址），使用进程内缓存')
+    return MemoryCacheBackend(app.config.get('RESPONSE_CACHE_MAX_ENTRIES', 1024))
+
+
+def init_response_cache(app, backend=None):
+    """
+    为应用创建响应缓存
+
+    Args:
+        backend: 指定缓存后端（如 Redis 兼容的本地替身），默认按配置创建
+    """
+    if not app.config.get('RESPONSE_CACHE_ENABLED', True):
+        app.extensions.pop('response_cache', None)
+        return
+    app.extensions['response_cache'] = ResponseCache(
+        backend or create_backend(app),
+        default_ttl=app.config.get('RESPONSE_CACHE_TTL', 30),
+    )
+
+
+def get_response_cache():
+    """当前应用的响应缓存（未启用时为 None）"""
+    return current_app.extensions.get('response_cache')
@@ -0,0 +1,230 @@
+"""全文搜索索引
+
+维护 search_documents 反范式化索引表，并提供带相关度排序的检索：
+- SQLite: FTS5 trigram 虚拟表 + bm25 排序
+- MySQL: ngram FULLTEXT 索引 + MATCH ... AGAINST 排序
+- 其他数据库、索引未建立或关键词过短时，退化为对单表的 LIKE 扫描
+
+索引在会话 flush 后根据新增/修改/删除的资源自动同步。
+"""
+from sqlalchemy import event, inspect, text
+from sqlalchemy.orm import Session
+from app.extensions import db
+from app.models import Server, Container, Service, SearchDocument
+from app.models.search_document import SQLITE_FTS_DDL
+
+# 可搜索资源: resource_type -> (模型, 标题字段, 内容字段)
+INDEXED_RESOURCES = {
+    'server': (Server, 'name', ['responsible_person', 'description']),
+    'container': (Container, 'name', ['image', 'description']),
+    'service': (Service, 'name', ['service_type', 'description']),
+}
+_MODEL_TYPES = {model: rtype for rtype, (model, _, _) in INDEXED_RESOURCES.items()}
+
+# 各后端可走索引的最短关键词长度（字符数）
+SQLITE_MIN_KEYWORD_LENGTH = 3  # trigram
+MYSQL_MIN_KEYWORD_LENGTH = 2   # ngram_token_size 默认值
+
+# bm25 列权重：标题命中优先于内容命中
+TITLE_WEIGHT = 10.0
+CONTENT_WEIGHT = 1.0
+
+_backends = {}  # engine -> 'fts5' / 'fulltext' / 'like'
+
+
+def build_document(obj, resource_type=None):
+    """由资源对象（或含相同字段名的查询行）生成搜索文档行"""
+    resource_type = resource_type or _MODEL_TYPES[type(obj)]
+    _, title_field, content_fields = INDEXED_RESOURCES[resource_type]
+    values = (getattr(obj, f) for f in content_fields)
+    return {
+        'resource_type': resource_type,
+        'resource_id': obj.id,
+        'title': (getattr(obj, title_field) or '')[:128],
+        'content': ' '.join(str(v) for v in values if v),
+    }
+
+
+def _indexed_fields_changed(obj):
+    """判断已持久化对象的可搜索字段是否有变化"""
+    _, title_field, content_fields = INDEXED_RESOURCES[_MODEL_TYPES[type(obj)]]
+    state = inspect(obj)
+    return any(state.attrs[f].history.has_changes() for f in [title_field] + content_fields)
+
+
+def _replace_documents(connection, keys, rows):
+    """删除 keys 对应的旧文档并写入新文档"""
+    for resource_type in {rtype for rtype, _ in keys}:
+        ids = [rid for rtype, rid in keys if rtype == resource_type]
+        connection.execute(
+            SearchDocument.__table__.delete().where(
+                SearchDocument.resource_type == resource_type,
+                SearchDocument.resource_id.in_(ids),
+            )
+        )
+    if rows:
+        connection.execute(SearchDocument.__table__.insert(), rows)
+
+
+def _sync_documents(session, flush_context):
+    """flush 后同步搜索文档（after_flush 事件）"""
+    upserts = [obj for obj in session.new if type(obj) in _MODEL_TYPES]
+    upserts += [
+        obj for obj in session.dirty
+        if type(obj) in _MODEL_TYPES and _indexed_fields_changed(obj)
+    ]
+    deletes = [obj for obj in session.deleted if type(obj) in _MODEL_TYPES]
+    if not upserts and not deletes:
+        return
+
+    keys = [(_MODEL_TYPES[type(obj)], obj.id) for obj in upserts + deletes]
+    _replace_documents(session.connection(), keys, [build_document(obj) for obj in upserts])
+
+
+def register_search_index():
+    """注册会话事件，写入时自动维护搜索索引"""
+    if not event.contains(Session, 'after_flush', _sync_documents):
+        event.listen(Session, 'after_flush', _sync_documents)
+
+
+def refresh_documents(resource_type, ids, batch_size=1000):
+    """
+    重建指定资源的搜索文档
+
+    用于绕过ORM会话的批量 INSERT/UPDATE/DELETE，ids 中已不存在的资源会被移除。
+    按 batch_size 分批，避免 IN 列表过长。
+    """
+    ids = list(ids)
+    model, title_field, content_fields = INDEXED_RESOURCES[resource_type]
+    columns = [getattr(model, f) for f in ['id', title_field] + content_fields]
+    for start in range(0, len(ids), batch_size):
+        batch = ids[start:start + batch_size]
+        rows = [
+            build_document(row, resource_type)
+            for row in db.session.query(*columns).filter(model.id.in_(batch))
+        ]
+        _replace_documents(db.session.connection(), [(resource_type, rid) for rid in batch], rows)
+
+
+def rebuild_index(batch_size=1000):
+    """全量重建搜索索引，返回各类型文档数"""
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        for statement in SQLITE_FTS_DDL:
+            db.session.execute(text(statement))
+    db.session.execute(SearchDocument.__table__.delete())
+
+    stats = {}
+    for resource_type, (model, _, _) in INDEXED_RESOURCES.items():
+        stats[resource_type] = 0
+        rows = []
+        for obj in model.query.order_by(model.id).yield_per(batch_size):
+            rows.append(build_document(obj))
+            if len(rows) >= batch_size:
+                db.session.execute(SearchDocument.__table__.insert(), rows)
+                stats[resource_type] += len(rows)
+                rows = []
+        if rows:
+            db.session.execute(SearchDocument.__table__.insert(), rows)
+            stats[resource_type] += len(rows)
+
+    if dialect == 'sqlite':
+        db.session.execute(text(
+            "INSERT INTO search_documents_fts(search_documents_fts) VALUES ('rebuild')"
+        ))
+    db.session.commit()
+    _backends.clear()
+    return stats
+
+
+def _backend():
+    """探测当前数据库可用的索引后端"""
+    engine = db.engine
+    if engine not in _backends:
+        backend = 'like'
+        if engine.dialect.name == 'sqlite':
+            exists = db.session.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE name = 'search_documents_fts'"
+            )).first()
+            backend = 'fts5' if exists else 'like'
+        elif engine.dialect.name == 'mysql':
+            exists = db.session.execute(text(
+                "SHOW INDEX FROM search_documents WHERE Key_name = 'ft_search_documents'"
+            )).first()
+            backend = 'fulltext' if exists else 'like'
+        _backends[engine] = backend
+    return _backends[engine]
+
+
+def _search_fts5(keyword, resource_type, limit, title_only):
+    phrase = '"' + keyword.replace('"', '""') + '"'
+    if title_only:
+        phrase = 'title : ' + phrase
+    rows = db.session.execute(text(
+        "SELECT d.resource_id FROM search_documents_fts "
+        "JOIN search_documents d ON d.id = search_documents_fts.rowid "
+        "WHERE search_documents_fts MATCH :q AND d.resource_type = :resource_type "
+        f"ORDER BY bm25(search_documents_fts, {TITLE_WEIGHT}, {CONTENT_WEIGHT}) "
+        "LIMIT :limit"
+    ), {'q': phrase, 'resource_type': resource_type, 'limit': limit})
+    return [row[0] for row in rows]
+
+
+def _search_fulltext(keyword, resource_type, limit, title_only):
+    columns = 'title' if title_only else 'title, content'
+    phrase = '"' + keyword.replace('"', ' ') + '"'
+    rows = db.session.execute(text(
+        f"SELECT resource_id, MATCH({columns}) AGAINST (:q IN BOOLEAN MODE) AS score "
+        "FROM search_documents "
+        f"WHERE resource_type = :resource_type AND MATCH({columns}) AGAINST (:q IN BOOLEAN MODE) "
+        "ORDER BY score DESC LIMIT :limit"
+    ), {'q': phrase, 'resource_type': resource_type, 'limit': limit})
+    return [row[0] for row in rows]
+
+
+def _search_like(keyword, resource_type, limit, title_only):
+    pattern = f'%{keyword}%'
+    condition = SearchDocument.title.ilike(pattern)
+    if not title_only:
+        condition = db.or_(condition, SearchDocument.content.ilike(pattern))
+    # 名称前缀命中 > 名称包含 > 仅内容命中
+    rank = db.case(
+        (SearchDocument.title.ilike(f'{keyword}%'), 0),
+        (SearchDocument.title.ilike(pattern), 1),
+        else_=2,
+    )
+    rows = db.session.query(SearchDocument.resource_id).filter(
+        SearchDocument.resource_type == resource_type, condition
+    ).order_by(rank, SearchDocument.title).limit(limit)
+    return [row[0] for row in rows]
+
+
+def search_ids(keyword, resource_type, limit=50, title_only=False):
+    """
+    检索资源ID
+
+    Args:
+        keyword: 关键词（子串匹配语义）
+        resource_type: server, container, service
+        limit: 最大返回数量
+        title_only: 仅匹配名称
+
+    Returns:
+        list: 按相关度排序的资源ID
+    """
+    backend = _backend()
+    if backend == 'fts5' and len(keyword) >= SQLITE_MIN_KEYWORD_LENGTH:
+        return _search_fts5(keyword, resource_type, limit, title_only)
+    if backend == 'fulltext' and len(keyword) >= MYSQL_MIN_KEYWORD_LENGTH:
+        return _search_fulltext(keyword, resource_type, limit, title_only)
+    return _search_like(keyword, resource_type, limit, title_only)
+
+
+def search_resources(keyword, resource_type, limit=50, title_only=False):
+    """检索资源对象，保持相关度顺序"""
+    ids = search_ids(keyword, resource_type, limit, title_only)
+    if not ids:
+        return []
+    model = INDEXED_RESOURCES[resource_type][0]
+    objects = {obj.id: obj for obj in model.query.filter(model.id.in_(ids)).all()}
+    return [objects[rid] for rid in ids if rid in objects]
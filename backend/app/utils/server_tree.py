@@ -0,0 +1,151 @@
+"""服务器树构建
+
+一次性按表批量加载服务器及其容器、端口映射、服务、GPU，在内存中组装层级，
+查询次数与服务器数量无关。
+"""
+from collections import defaultdict
+from app.models import (
+    User, Datacenter, Environment, Server, Container, PortMapping, Service, GPU
+)
+from app.utils.counts import server_counts
+
+# 树所读取的表（响应缓存按这些表失效）
+TREE_TABLES = (
+    'users', 'datacenters', 'environments', 'servers',
+    'containers', 'port_mappings', 'services', 'gpus',
+)
+
+
+def _group_by(items, key):
+    """按外键分组"""
+    groups = defaultdict(list)
+    for item in items:
+        groups[getattr(item, key)].append(item)
+    return groups
+
+
+def _preload_users(user_ids):
+    """预加载关联用户到会话identity map，后续 owner/assigned_user 访问不再发SQL"""
+    user_ids = {uid for uid in user_ids if uid is not None}
+    if not user_ids:
+        return []
+    return User.query.filter(User.id.in_(user_ids)).all()
+
+
+def build_server_tree(query, expand_level=1):
+    """
+    构建服务器树
+
+    Args:
+        query: 已应用筛选条件的 Server 查询
+        expand_level: 1=服务器, 2=容器, 3=服务
+
+    Returns:
+        list: 树形节点列表
+    """
+    servers = query.order_by(Server.name).all()
+    if not servers:
+        return []
+
+    # 机房和环境为小表，整表加载后多对一访问直接命中identity map
+    # （局部变量持有引用，防止弱引用的identity map提前回收）
+    datacenters = Datacenter.query.all()
+    environments = Environment.query.all()
+
+    # 子表通过子查询限定范围，避免超长 IN 参数列表
+    server_ids = query.with_entities(Server.id).order_by(None)
+
+    if expand_level < 2:
+        # 只展示服务器时无需加载子表，数量通过分组统计得到
+        counts = server_counts(server_ids)
+        return [server.to_dict(counts=counts[server.id]) for server in servers]
+
+    containers = Container.query.filter(
+        Container.server_id.in_(server_ids)
+    ).order_by(Container.id).all()
+    gpus = GPU.query.filter(GPU.server_id.in_(server_ids)).order_by(GPU.id).all()
+
+    containers_by_server = _group_by(containers, 'server_id')
+    gpus_by_server = _group_by(gpus, 'server_id')
+
+    port_mappings = []
+    services = []
+    if containers:
+        container_ids = Container.query.with_entities(Container.id).filter(
+            Container.server_id.in_(server_ids)
+        )
+        port_mappings = PortMapping.query.filter(
+            PortMapping.container_id.in_(container_ids)
+        ).order_by(PortMapping.container_port, PortMapping.id).all()
+        services = Service.query.filter(
+            Service.container_id.in_(container_ids)
+        ).order_by(Service.id).all()
+    port_mappings_by_container = _group_by(port_mappings, 'container_id')
+    services_by_container = _group_by(services, 'container_id')
+
+    users = _preload_users(
+        [c.owner_id for c in containers] +
+        [c.assigned_user_id for c in containers] +
+        [s.owner_id for s in services] +
+        [g.assigned_to for g in gpus]
+    )
+
+    tree_data = []
+    for server in servers:
+        server_containers = containers_by_server.get(server.id, [])
+        server_gpus = gpus_by_server.get(server.id, [])
+        server_data = server.to_dict(counts={
+            'container_count': len(server_containers),
+            'gpu_count': len(server_gpus),
+        })
+
+        # 为树形展示准备 children 数组
+        children = []
+
+        # 第一个子节点：资源卡片（特殊类型）
+        children.append({
+            '_type': '_resource_card',
+            'id': f'card_{server.id}',
+            'cpu_usage': server_data.get('cpu_usage'),
+            'memory_usage': server_data.get('memory_usage'),
+            'disk_usage': server_data.get('disk_usage'),
+            'cpu_cores': server_data.get('cpu_cores'),
+            'memory_gb': server_data.get('memory_gb'),
+            'disk_gb': server_data.get('disk_gb'),
+            'gpu_count': server_data.get('gpu_count', 0),
+            'updated_at': server_data.get('updated_at'),
+            'ssh_command': server_data.get('ssh_command'),
+            'internal_ip': server_data.get('internal_ip')
+        })
+
+        # 添加容器到 children
+        for container in server_containers:
+            container_services = services_by_container.get(container.id, [])
+            container_data = container.to_dict(
+                counts={'service_count': len(container_services)},
+                port_mappings=port_mappings_by_container.get(container.id, []),
+            )
+            container_data['_type'] = 'container'  # 标记类型
+
+            if expand_level >= 3:
+                # 将服务作为容器的子节点
+                container_data['children'] = []
+                for service in container_services:
+                    service_data = service.to_dict()
+                    service_data['_type'] = 'service'  # 标记类型
+                    container_data['children'].append(service_data)
+
+            children.append(container_data)
+
+        # 添加 GPU 到 children（与容器平级）
+        for gpu in server_gpus:
+            gpu_data = gpu.to_dict()
+            gpu_data['_type'] = 'gpu'  # 标记类型
+            children.append(gpu_data)
+
+        server_data['children'] = children
+        server_data['hasChildren'] = len(children) > 0
+
+        tree_data.append(server_data)
+
+    return tree_data
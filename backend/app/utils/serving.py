@@ -0,0 +1,167 @@
+"""生产服务（flask serve）
+
+- 使用 gunicorn 的 gthread 工作进程：SERVER_WORKERS 个进程 × SERVER_THREADS 个线程
+- 应用在主进程中创建一次（模型、蓝图、配置只导入一次），工作进程 fork 后共享；
+  fork 后丢弃从主进程继承的数据库连接，各进程使用自己的连接池，并构建本进程的自动补全索引
+- 连接池大小按每进程线程数确定（见 Config.SQLALCHEMY_ENGINE_OPTIONS）；
+  SSE 连接持续占用线程，每进程的事件连接数限制为线程数的一半
+- 平滑重载：HUP 按当前代码重新创建工作进程；升级代码时 USR2 启动新的主进程，
+  新主进程就绪后向旧主进程发送 TERM，旧工作进程处理完进行中的请求后退出
+- 未安装 gunicorn（如 Windows）时退回单进程多线程的 werkzeug 服务
+"""
+import os
+import signal
+import sys
+import time
+from flask import current_app
+from werkzeug.serving import run_simple
+from app.extensions import db
+from app.utils.autocomplete import warm_autocomplete
+
+try:
+    from gunicorn.app.base import BaseApplication
+    from gunicorn.arbiter import Arbiter
+except ImportError:  # 未安装 gunicorn 或不支持的平台
+    BaseApplication = None
+
+
+def gunicorn_available():
+    """是否可以使用 gunicorn"""
+    return BaseApplication is not None
+
+
+def pid_file_path(app, pid_file=None):
+    """主进程 PID 文件路径（相对路径位于实例目录下，未配置时返回 None）"""
+    pid_file = pid_file or app.config['SERVER_PID_FILE']
+    return os.path.join(app.instance_path, pid_file) if pid_file else None
+
+
+def server_options(app, bind=None, workers=None):
+    """由 SERVER_* 配置生成 gunicorn 配置（参数优先）"""
+    config = app.config
+    max_requests = config['SERVER_MAX_REQUESTS']
+    return {
+        'bind': bind or config['SERVER_BIND'],
+        'workers': workers or config['SERVER_WORKERS'],
+        'threads': config['SERVER_THREADS'],
+        'worker_class': 'gthread',
+        'preload_app': True,
+        'timeout': config['SERVER_TIMEOUT'],
+        'graceful_timeout': config['SERVER_GRACEFUL_TIMEOUT'],
+        'keepalive': config['SERVER_KEEPALIVE'],
+        'max_requests': max_requests,
+        'max_requests_jitter': max_requests // 10,
+        'pidfile': pid_file_path(app),
+        'accesslog': '-' if config['SERVER_ACCESS_LOG'] else None,
+        'post_fork': _post_fork,
+        'worker_exit': _worker_exit,
+    }
+
+
+def _post_fork(server, worker):
+    """工作进程启动：丢弃继承的连接（不关闭，主进程的连接仍归主进程），构建自动补全索引"""
+    app = worker.app.wsgi()
+    with app.app_context():
+        db.engine.dispose(close=False)
+    warm_autocomplete(app)
+
+
+def _worker_exit(server, worker):
+    """工作进程退出：写完排队的审计日志"""
+    writer = worker.app.wsgi().extensions.get('audit_writer')
+    if writer is not None:
+        writer.close()
+
+
+def _application_class():
+    class FlaskApplication(BaseApplication):
+        """以已创建的 Flask 应用运行 gunicorn"""
+
+        def __init__(self, app, options):
+            self.application = app
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                if value is not None:
+                    self.cfg.set(key, value)
+
+        def load(self):
+            return self.application
+
+        def run(self):
+            arbiter = Arbiter(self)
+            # USR2 按原始命令行重新执行（python -m flask 时 sys.argv[0] 是模块文件，不能直接执行）
+            arbiter.START_CTX['args'] = list(getattr(sys, 'orig_argv', arbiter.START_CTX['args']))
+            try:
+                arbiter.run()
+            except RuntimeError as e:
+                sys.exit(f'Error: {e}')
+
+    return FlaskApplication
+
+
+def limit_event_connections(app):
+    """SSE 连接在整个连接期间占用一个线程：每进程的事件连接最多占用一半线程"""
+    broker = app.extensions.get('event_broker')
+    limit = max(app.config['SERVER_THREADS'] // 2, 1)
+    if broker is not None and broker.max_subscribers > limit:
+        app.logger.info('事件连接上限按线程数调整为每进程 %d 个', limit)
+        broker.max_subscribers = limit
+
+
+def serve(app, bind=None, workers=None, local=False):
+    """启动生产服务（local=True 或未安装 gunicorn 时使用 werkzeug 单进程服务）"""
+    if local or not gunicorn_available():
+        if not local:
+            app.logger.warning('未安装 gunicorn，使用单进程多线程服务')
+        host, _, port = (bind or app.config['SERVER_BIND']).rpartition(':')
+        warm_autocomplete(app)
+        run_simple(host or '0.0.0.0', int(port), app, threaded=True,
+                   use_reloader=False, use_debugger=False)
+        return
+    limit_event_connections(app)
+    options = server_options(app, bind, workers)
+    if options['pidfile']:
+        os.makedirs(os.path.dirname(options['pidfile']), exist_ok=True)
+    _application_class()(app, options).run()
+
+
+def _read_pid(pid_file):
+    try:
+        with open(pid_file) as f:
+            return int(f.read().strip())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def reload_server(pid_file=None, upgrade=False, timeout=30):
+    """
+    平滑重载运行中的服务
+
+    Args:
+        pid_file: 主进程 PID 文件，默认 SERVER_PID_FILE（相对路径位于实例目录下）
+        upgrade: True 时加载新代码（USR2 启动新主进程后 TERM 旧主进程），否则 HUP 重建工作进程
+
+    Returns:
+        int: 重载后的主进程 PID
+    """
+    pid_file = pid_file_path(current_app, pid_file)
+    pid = _read_pid(pid_file) if pid_file else None
+    if pid is None:
+        raise RuntimeError(f'无法读取主进程 PID: {pid_file}')
+    if not upgrade:
+        os.kill(pid, signal.SIGHUP)
+        return pid
+
+    os.kill(pid, signal.SIGUSR2)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        # 新主进程在旧主进程退出前使用 <pid_file>.2，旧主进程退出后改回原文件名
+        new_pid = _read_pid(pid_file + '.2')
+        if new_pid is not None and new_pid != pid:
+            os.kill(pid, signal.SIGTERM)
+            return new_pid
+        time.sleep(0.2)
+    raise RuntimeError(f'新主进程未在 {timeout} 秒内就绪，旧主进程 {pid} 保持运行')
@@ -0,0 +1,182 @@
+"""表版本号与条件请求
+
+- 资源表的写入在同一事务内递增 table_versions 中该表的版本号：after_flush 按单元工作中
+  新增/修改/删除的对象、do_orm_execute 按批量 DML 的目标表登记到会话，提交前（before_commit）
+  一次性递增。版本号随事务一起提交或回滚，各工作进程读到的版本号与数据一致；
+  计数行的行锁只在提交前后短暂持有，写入不同数据的事务不会因版本号互相等待
+- GET 接口用 conditional(tables) 装饰：按所依赖表的版本号（一次主键查询）生成 ETag，
+  If-None-Match 命中时直接返回 304，不执行接口本身的查询；响应缓存的键也使用这些版本号
+- 版本号在同一请求内只读取一次；table_versions 表由 `flask init-db` 创建，表不存在时不递增、
+  不生成 ETag
+"""
+import hashlib
+from datetime import datetime
+from functools import wraps
+from flask import current_app, has_request_context, request
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from app.extensions import db
+from app.models import TableVersion
+
+# 记录版本号的表（token_revocations 供各工作进程确认 Token 吊销是否变化）
+TRACKED_TABLES = frozenset((
+    'users', 'datacenters', 'environments', 'servers',
+    'containers', 'port_mappings', 'services', 'gpus',
+    'token_revocations',
+))
+_REQUEST_KEY = '_table_versions'
+_PENDING_KEY = 'table_versions_pending'
+
+_ready = set()  # 已确认存在的 (引擎, 表名)
+
+
+def table_ready(connection, name=TableVersion.__tablename__):
+    """表是否已创建（升级后未执行 init-db 的数据库可能缺少新表）"""
+    if (connection.engine, name) in _ready:
+        return True
+    if inspect(connection).has_table(name):
+        _ready.add((connection.engine, name))
+        return True
+    return False
+
+
+def bump_versions(connection, tables):
+    """在 connection 的当前事务中递增表版本号"""
+    tables = sorted(set(tables) & TRACKED_TABLES)
+    if tables and table_ready(connection):
+        bump_counters(connection, tables)
+
+
+def bump_counters(connection, names):
+    """递增 table_versions 中的计数行（不存在的行插入值 1），行锁持有到事务结束"""
+    table = TableVersion.__table__
+    now = datetime.utcnow()
+    result = connection.execute(
+        table.update().where(table.c.table_name.in_(names))
+        .values(version=table.c.version + 1, updated_at=now)
+    )
+    if result.rowcount < len(names):
+        existing = set(connection.execute(
+            db.select(table.c.table_name).where(table.c.table_name.in_(names))
+        ).scalars())
+        connection.execute(table.insert(), [
+            {'table_name': name, 'version': 1, 'updated_at': now}
+            for name in names if name not in existing
+        ])
+    if has_request_context():
+        request.__dict__.pop(_REQUEST_KEY, None)
+
+
+def get_versions(tables):
+    """
+    读取表版本号（同一请求内缓存）
+
+    Returns:
+        dict: {表名: (版本号, 更新时间)}，未写入过的表为 (0, None)；table_versions 表不存在时返回 None
+    """
+    known = request.__dict__.setdefault(_REQUEST_KEY, {}) if has_request_context() else {}
+    missing = [name for name in tables if name not in known]
+    if missing:
+        if not table_ready(db.session.connection()):
+            return None
+        table = TableVersion.__table__
+        rows = db.session.execute(
+            db.select(table.c.table_name, table.c.version, table.c.updated_at)
+            .where(table.c.table_name.in_(missing))
+        )
+        found = {name: (version, updated_at) for name, version, updated_at in rows}
+        for name in missing:
+            known[name] = found.get(name, (0, None))
+    return {name: known[name] for name in tables}
+
+
+def conditional(tables):
+    """
+    条件请求装饰器（放在 jwt_required 之后）：成功响应带 ETag / Last-Modified，
+    If-None-Match 与当前 ETag 相同时返回 304
+
+    ETag 由请求路径与参数、当前用户和所依赖表的版本号生成。
+
+    Args:
+        tables: 响应所依赖的表名
+    """
+    tables = sorted(tables)
+
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            versions = get_versions(tables)
+            if versions is None:
+                return fn(*args, **kwargs)
+            stamp = ','.join(f'{name}:{version}' for name, (version, _) in versions.items())
+            etag = hashlib.sha1(
+                f'{request.full_path}|{get_jwt_identity()}|{stamp}'.encode('utf-8')
+            ).hexdigest()[:20]
+
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = current_app.make_response(fn(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            modified = [updated_at for _, updated_at in versions.values() if updated_at]
+            if modified:
+                response.last_modified = max(modified)
+            # 客户端每次使用前重新验证
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            response.vary.add('Authorization')
+            return response
+        return wrapper
+    return decorator
+
+
+# ---------- 会话事件 ----------
+
+def _collect_flushed(session, flush_context):
+    """after_flush: 登记单元工作中有实际变更的表"""
+    tables = {obj.__table__.name for obj in list(session.new) + list(session.deleted)}
+    tables.update(
+        obj.__table__.name for obj in session.dirty
+        if session.is_modified(obj, include_collections=False)
+    )
+    tables &= TRACKED_TABLES
+    if tables:
+        session.info.setdefault(_PENDING_KEY, set()).update(tables)
+
+
+def _collect_bulk(orm_execute_state):
+    """do_orm_execute: 登记绕过单元工作的批量 INSERT / UPDATE / DELETE 的目标表"""
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update
+            or orm_execute_state.is_delete):
+        return
+    table = getattr(orm_execute_state.statement, 'table', None)
+    if table is not None and table.name in TRACKED_TABLES:
+        orm_execute_state.session.info.setdefault(_PENDING_KEY, set()).add(table.name)
+
+
+def _bump_pending(session):
+    """before_commit: 写出剩余变更后递增登记的表版本号（保存点提交时留给外层事务）"""
+    if session.in_nested_transaction():
+        return
+    session.flush()
+    tables = session.info.pop(_PENDING_KEY, None)
+    if tables:
+        bump_versions(session.connection(), tables)
+
+
+def _discard_pending(session, previous_transaction):
+    """after_soft_rollback: 丢弃未提交的登记"""
+    session.info.pop(_PENDING_KEY, None)
+
+
+def register_table_versions():
+    """注册会话事件，提交写入时递增表版本号"""
+    for name, fn in (('after_flush', _collect_flushed),
+                     ('do_orm_execute', _collect_bulk),
+                     ('before_commit', _bump_pending),
+                     ('after_soft_rollback', _discard_pending)):
+        if not event.contains(Session, name, fn):
+            event.listen(Session, name, fn)
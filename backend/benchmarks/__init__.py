@@ -0,0 +1,5 @@
+"""性能基准脚本
+
+在独立的内存SQLite应用上运行，不会触碰配置的数据库。
+在 backend 目录下执行：python -m benchmarks.<name>
+"""
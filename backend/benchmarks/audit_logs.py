@@ -0,0 +1,85 @@
+"""审计日志查询基准
+
+Core 批量写入 N 条审计日志（24 个月，操作多集中在少数用户），依次在三种状态下
+通过 /api/audit-logs 执行常见筛选组合（游标分页首页）与单月 csv 导出，记录最小耗时(ms)：
+- baseline: 只有 created_at 单列索引
+- indexes: 增加组合索引
+- partitions: 已结束月份移入模拟分区表（SQLite），查询只联合时间范围涉及的分区
+"""
+import time
+from datetime import datetime, timedelta
+from app.extensions import db
+from app.models import AuditLog
+from app.utils.audit_partitions import rotate_partitions
+from benchmarks.common import create_bench_app, measure
+
+START = datetime(2024, 1, 1)
+MONTHS = 24
+NOW = datetime(2026, 1, 15)
+
+CASES = [
+    ('all', ''),
+    ('rare user', 'user_id=97'),
+    ('type+action', 'resource_type=gpu&action=delete'),
+    ('rare type', 'resource_type=datacenter'),
+    ('user+month', 'user_id=5&start_date=2025-03-01&end_date=2025-03-31T23:59:59'),
+    ('month', 'start_date=2025-03-01&end_date=2025-03-31T23:59:59'),
+]
+TYPES = ['server'] * 6 + ['container'] * 6 + ['service'] * 4 + ['gpu'] * 3 + ['datacenter']
+
+
+def seed(rows):
+    step = MONTHS * 30 * 86400 / rows
+    batch = []
+    for i in range(rows):
+        # 少数用户产生大部分日志，用户 97 只有约 0.1%
+        user_id = 97 if i % 1000 == 0 else i % 10 + 1
+        batch.append({
+            'user_id': user_id, 'username': f'user{user_id}',
+            'action': ('create', 'update', 'update', 'delete')[i % 4],
+            'resource_type': TYPES[i * 7 % len(TYPES)], 'resource_id': i,
+            'resource_name': f'res-{i}', 'changes': '{"status": {"old": "a", "new": "b"}}',
+            'created_at': START + timedelta(seconds=int(i * step)),
+        })
+        if len(batch) >= 10000:
+            db.session.execute(AuditLog.__table__.insert(), batch)
+            batch = []
+    if batch:
+        db.session.execute(AuditLog.__table__.insert(), batch)
+    db.session.commit()
+
+
+def run_cases(client, headers):
+    results = []
+    for _, params in CASES:
+        url = f'/api/audit-logs?{params}&cursor=&page_size=20'
+        results.append(measure(lambda: client.get(url, headers=headers)))
+    url = '/api/audit-logs/export?format=csv&start_date=2025-03-01&end_date=2025-03-31T23:59:59'
+    results.append(measure(lambda: b''.join(client.get(url, headers=headers).response), repeat=3))
+    return results
+
+
+def main():
+    rows = 500000
+    _, client, headers, _ = create_bench_app()
+    seed(rows)
+    composite = [index for index in AuditLog.__table__.indexes if len(index.columns) > 1]
+    for index in composite:
+        index.drop(db.engine)
+
+    stages = [('baseline', run_cases(client, headers))]
+    for index in composite:
+        index.create(db.engine)
+    stages.append(('indexes', run_cases(client, headers)))
+    start = time.perf_counter()
+    rotate_partitions(NOW)
+    print(f'rows: {rows}, rotate: {time.perf_counter() - start:.1f}s')
+    stages.append(('partitions', run_cases(client, headers)))
+
+    print(f'{"case":>14}' + ''.join(f'{name:>12}' for name, _ in stages))
+    for i, name in enumerate([name for name, _ in CASES] + ['month csv']):
+        print(f'{name:>14}' + ''.join(f'{results[i]:>12.1f}' for _, results in stages))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""审计日志存储基准
+
+生成一台带 N 个容器（每个容器一个端口映射、两个服务）的服务器，以其完整快照写入 2000 条删除日志，
+分别以原文（旧格式）与压缩格式存储，对比存储字节数、列表首页与详情的耗时(ms)；
+列表同时对比延迟加载（当前）与一并读取 changes / snapshot（旧行为）。
+"""
+import json
+from datetime import datetime, timedelta
+from sqlalchemy.orm import undefer_group
+from app.extensions import db
+from app.models import AuditLog, Server
+from app.utils.audit_compression import compress_audit_logs
+from benchmarks.common import create_bench_app, measure, seed_fleet
+
+LOGS = 2000
+
+
+def seed_logs(snapshot):
+    # 以文本类型写入，模拟压缩前的旧数据
+    insert = AuditLog.__table__.insert().values(
+        snapshot=db.bindparam('raw_snapshot', type_=db.Text),
+        changes=db.bindparam('raw_changes', type_=db.Text),
+    )
+    db.session.execute(insert, [
+        {'user_id': 1, 'username': 'bench_admin', 'action': 'delete', 'resource_type': 'server',
+         'resource_id': i, 'resource_name': f'srv-{i}', 'raw_snapshot': snapshot,
+         'raw_changes': None, 'created_at': datetime(2026, 1, 1) + timedelta(minutes=i)}
+        for i in range(LOGS)
+    ])
+    db.session.commit()
+
+
+def run(client, headers):
+    def list_old():
+        db.session.query(AuditLog).options(undefer_group('details')).order_by(
+            AuditLog.created_at.desc()).limit(100).all()
+        db.session.expunge_all()
+
+    def list_new():
+        db.session.query(AuditLog).order_by(AuditLog.created_at.desc()).limit(100).all()
+        db.session.expunge_all()
+
+    return (
+        measure(list_old),
+        measure(list_new),
+        measure(lambda: client.get('/api/audit-logs?page_size=100', headers=headers)),
+        measure(lambda: client.get(f'/api/audit-logs/{LOGS // 2}', headers=headers)),
+    )
+
+
+def main():
+    print(f'{"containers":>10} {"snapshot(KB)":>12} {"storage":>10} {"size(MB)":>9} '
+          f'{"list+blobs":>10} {"list":>10} {"api list":>10} {"detail":>10}')
+    for containers in (10, 50):
+        _, client, headers, _ = create_bench_app()
+        seed_fleet(datacenters=1, servers_per_dc=1, containers_per_server=containers)
+        snapshot = json.dumps(Server.query.first().to_dict(include_children=True), ensure_ascii=False)
+        seed_logs(snapshot)
+
+        for storage in ('text', 'compressed'):
+            if storage == 'compressed':
+                compress_audit_logs()
+            stats = compress_audit_logs(dry_run=True)['snapshot']
+            timings = run(client, headers)
+            print(f'{containers:>10} {len(snapshot.encode()) / 1024:>12.1f} {storage:>10} '
+                  f'{stats["stored_bytes"] / 2**20:>9.1f} ' + ' '.join(f'{t:>10.1f}' for t in timings))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""自动补全基准
+
+批量写入服务器和容器后构建进程内索引，记录构建耗时、内存占用，
+并对比索引查询与全文索引数据库查询的单次耗时。
+"""
+import time
+from flask import current_app
+from app.extensions import db
+from app.models import Datacenter, Environment, Server, Container, User
+from app.utils.search_index import search_resources, rebuild_index
+from benchmarks.common import create_bench_app
+
+KEYWORDS = ['srv-12', 'ct-99', 'web', 'nomatch']
+
+
+def seed(servers, containers_per_server):
+    """通过Core批量插入，绕过ORM以加快造数"""
+    dc = Datacenter(name='bench-dc')
+    db.session.add(dc)
+    db.session.commit()
+    env_id = Environment.query.first().id
+    owner_id = User.query.first().id
+    db.session.execute(Server.__table__.insert(), [
+        {'name': f'{"web" if i % 10 == 0 else "srv"}-{i}', 'datacenter_id': dc.id,
+         'environment_id': env_id, 'internal_ip': f'10.{i // 65536}.{i // 256 % 256}.{i % 256}'}
+        for i in range(1, servers + 1)
+    ])
+    db.session.execute(Container.__table__.insert(), [
+        {'name': f'ct-{i}-{j}', 'server_id': i, 'owner_id': owner_id}
+        for i in range(1, servers + 1) for j in range(containers_per_server)
+    ])
+    db.session.commit()
+
+
+def per_call_us(fn, repeat=200):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    print(f'{"entries":>8} {"build(ms)":>10} {"memory(MB)":>11} {"keyword":>9} '
+          f'{"index(us)":>10} {"db(us)":>10}')
+    for servers in (1000, 10000, 30000):
+        create_bench_app()
+        seed(servers, containers_per_server=2)
+        rebuild_index()
+        index = current_app.extensions['autocomplete']
+
+        start = time.perf_counter()
+        index.build()
+        build_ms = (time.perf_counter() - start) * 1000
+        stats = index.stats()
+
+        for keyword in KEYWORDS:
+            index_us = per_call_us(lambda: index.suggest(keyword, 10))
+            db_us = per_call_us(lambda: (
+                search_resources(keyword, 'server', 10, title_only=True),
+                search_resources(keyword, 'container', 10, title_only=True),
+            ), repeat=20)
+            print(f'{stats["entries"]:>8} {build_ms:>10.1f} {stats["memory_bytes"] / 2**20:>11.1f} '
+                  f'{keyword:>9} {index_us:>10.1f} {db_us:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
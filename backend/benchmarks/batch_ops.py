@@ -0,0 +1,52 @@
+"""服务器批量操作基准
+
+Core 批量写入 N 台服务器（其中每 10 台有一个容器，删除时会被拒绝），
+通过 /api/servers/batch-update 与 /api/servers/batch-delete 处理全部ID，
+记录耗时与SQL语句数。
+"""
+import time
+from app.extensions import db
+from app.models import Datacenter, Environment, Server, Container, User
+from benchmarks.common import create_bench_app
+
+
+def seed(servers):
+    dc = Datacenter(name='bench-dc')
+    db.session.add(dc)
+    db.session.commit()
+    env_id = Environment.query.first().id
+    owner_id = User.query.first().id
+    db.session.execute(Server.__table__.insert(), [
+        {'name': f'srv-{i}', 'datacenter_id': dc.id, 'environment_id': env_id,
+         'internal_ip': f'10.{i // 65536}.{i // 256 % 256}.{i % 256}', 'status': 'online'}
+        for i in range(1, servers + 1)
+    ])
+    db.session.execute(Container.__table__.insert(), [
+        {'name': f'ct-{i}', 'server_id': i, 'owner_id': owner_id} for i in range(10, servers + 1, 10)
+    ])
+    db.session.commit()
+
+
+def run(client, headers, counter, url, payload):
+    counter.reset()
+    start = time.perf_counter()
+    data = client.post(url, headers=headers, json=payload).get_json()['data']
+    return time.perf_counter() - start, counter.count, data['success_count']
+
+
+def main():
+    print(f'{"servers":>8} {"update(s)":>10} {"queries":>8} {"updated":>8} '
+          f'{"delete(s)":>10} {"queries":>8} {"deleted":>8}')
+    for servers in (500, 5000, 20000):
+        _, client, headers, counter = create_bench_app()
+        seed(servers)
+        ids = list(range(1, servers + 1))
+        update = run(client, headers, counter, '/api/servers/batch-update',
+                     {'ids': ids, 'updates': {'status': 'maintenance', 'responsible_person': 'ops'}})
+        delete = run(client, headers, counter, '/api/servers/batch-delete', {'ids': ids})
+        print(f'{servers:>8} {update[0]:>10.2f} {update[1]:>8} {update[2]:>8} '
+              f'{delete[0]:>10.2f} {delete[1]:>8} {delete[2]:>8}')
+
+
+if __name__ == '__main__':
+    main()
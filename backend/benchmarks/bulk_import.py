@@ -0,0 +1,67 @@
+"""Excel 导入基准
+
+生成含 N 台服务器、N 个容器的工作簿，通过 /api/import-export/import 导入，
+记录耗时、吞吐、SQL语句数；另在全新应用上重复导入一次，
+用 tracemalloc 记录 Python 堆内存峰值（追踪开销较大，不计入耗时）。
+"""
+import io
+import time
+import tracemalloc
+import openpyxl
+from app.models import Environment
+from benchmarks.common import create_bench_app
+
+
+def build_workbook(rows):
+    """只写模式生成导入文件"""
+    environment = Environment.query.first().name
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet('服务器')
+    ws.append(['服务器名称*', '机房名称*', '环境*', '内网IP*', '外网IP', 'CPU核数', '内存(GB)',
+               '磁盘(GB)', '操作系统', 'SSH端口', 'SSH用户', '负责人', '描述'])
+    for i in range(rows):
+        ws.append([f'imp-srv-{i}', f'imp-dc-{i % 20}', environment,
+                   f'10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}', None,
+                   16, 64, 500, 'Ubuntu 22.04', 22, 'root', 'bench', 'imported'])
+    ws = wb.create_sheet('容器')
+    ws.append(['容器名称*', '服务器名称*', '镜像', 'CPU限制', '内存限制(MB)', '状态', '描述'])
+    for i in range(rows):
+        ws.append([f'imp-ct-{i}', f'imp-srv-{i}', 'nginx:latest', 2, 2048, 'running', 'imported'])
+    output = io.BytesIO()
+    wb.save(output)
+    return output.getvalue()
+
+
+def run_import(content):
+    _, client, headers, counter = create_bench_app()
+    counter.reset()
+    response = client.post(
+        '/api/import-export/import', headers=headers,
+        data={'file': (io.BytesIO(content), 'bench.xlsx')},
+        content_type='multipart/form-data',
+    )
+    return response.get_json()['data'], counter.count
+
+
+def main():
+    print(f'{"rows":>7} {"file(KB)":>9} {"seconds":>8} {"rows/s":>9} {"queries":>8} {"peak(MB)":>9} {"errors":>7}')
+    for rows in (1000, 10000, 50000):
+        create_bench_app()
+        content = build_workbook(rows)
+
+        start = time.perf_counter()
+        data, queries = run_import(content)
+        seconds = time.perf_counter() - start
+
+        tracemalloc.start()
+        run_import(content)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        errors = len(data['servers']['errors']) + len(data['containers']['errors'])
+        print(f'{rows * 2:>7} {len(content) / 1024:>9.0f} {seconds:>8.2f} {rows * 2 / seconds:>9.0f} '
+              f'{queries:>8} {peak / 2**20:>9.1f} {errors:>7}')
+
+
+if __name__ == '__main__':
+    main()
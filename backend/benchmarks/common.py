@@ -0,0 +1,99 @@
+"""基准测试公共工具"""
+import time
+from sqlalchemy import event
+from flask_jwt_extended import create_access_token
+from app import create_app
+from app.extensions import db
+from app.models import (
+    User, Datacenter, Environment, Server, Container, PortMapping, Service, GPU
+)
+
+
+class QueryCounter:
+    """统计引擎执行的SQL语句数"""
+
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, 'before_cursor_execute', self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+    def reset(self):
+        self.count = 0
+
+
+def create_bench_app():
+    """
+    创建基准测试用应用（内存SQLite）
+
+    Returns:
+        tuple: (app, client, headers, counter)，调用方需保持应用上下文
+    """
+    app = create_app('testing')
+    app.app_context().push()
+    db.create_all()
+    Environment.init_default_environments()
+
+    admin = User(username='bench_admin', display_name='Bench', role='admin', is_active=True)
+    admin.set_password('bench123')
+    db.session.add(admin)
+    db.session.commit()
+
+    headers = {'Authorization': f'Bearer {create_access_token(identity=str(admin.id))}'}
+    return app, app.test_client(), headers, QueryCounter(db.engine)
+
+
+def seed_fleet(datacenters=3, servers_per_dc=10, containers_per_server=3,
+               services_per_container=2, gpus_per_server=1, prefix='bench'):
+    """批量生成机房、服务器、容器、服务、端口映射和GPU"""
+    environments = Environment.query.all()
+    owner = User.query.first()
+    port = 20000
+
+    for d in range(datacenters):
+        dc = Datacenter(name=f'{prefix}-dc-{d}')
+        db.session.add(dc)
+        db.session.flush()
+        for s in range(servers_per_dc):
+            server = Server(
+                name=f'{prefix}-srv-{d}-{s}',
+                datacenter_id=dc.id,
+                environment_id=environments[s % len(environments)].id,
+                internal_ip=f'10.{d % 256}.{s // 256 % 256}.{s % 256}',
+                status=('online', 'offline', 'maintenance')[s % 3],
+                responsible_person='bench',
+                description=f'{dc.name} server {s}',
+            )
+            db.session.add(server)
+            db.session.flush()
+            for c in range(containers_per_server):
+                container = Container(
+                    name=f'{server.name}-ct-{c}', server_id=server.id,
+                    owner_id=owner.id, image=f'image-{c}:latest',
+                )
+                db.session.add(container)
+                db.session.flush()
+                port += 1
+                db.session.add(PortMapping(
+                    container_id=container.id, container_port=80,
+                    internal_ip=server.internal_ip, internal_port=port,
+                ))
+                for v in range(services_per_container):
+                    db.session.add(Service(
+                        name=f'{container.name}-svc-{v}', container_id=container.id,
+                        owner_id=owner.id, port=8000 + v,
+                    ))
+            for g in range(gpus_per_server):
+                db.session.add(GPU(server_id=server.id, model='NVIDIA A100', memory_gb=80, index=g))
+    db.session.commit()
+
+
+def measure(fn, repeat=5):
+    """返回多次执行的最小耗时(ms)"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, (time.perf_counter() - start) * 1000)
+    return best
@@ -0,0 +1,44 @@
+"""条件请求基准
+
+10 个机房 × 60 台服务器（每台 3 个容器），轮询常用接口：
+对比完整响应（200，未启用响应缓存）与携带 If-None-Match 的重新验证（304）
+的查询次数、响应字节数与耗时(ms)。
+"""
+from benchmarks.common import create_bench_app, seed_fleet, measure
+
+ENDPOINTS = (
+    '/api/servers/tree?expand_level=2',
+    '/api/servers?page_size=100',
+    '/api/servers/1',
+    '/api/containers?page_size=100',
+    '/api/datacenters/overview',
+)
+
+
+def main():
+    app, client, headers, counter = create_bench_app()
+    app.extensions.pop('response_cache', None)
+    seed_fleet(datacenters=10, servers_per_dc=60, containers_per_server=3)
+
+    def request(url, extra=None):
+        counter.reset()
+        response = client.get(url, headers=dict(headers, **(extra or {})))
+        return response, counter.count
+
+    print(f'{"endpoint":<36} {"200":>24} {"304":>24}')
+    for url in ENDPOINTS:
+        full, queries = request(url)
+        assert full.status_code == 200
+        revalidate = {'If-None-Match': full.headers['ETag']}
+        not_modified, revalidate_queries = request(url, revalidate)
+        assert not_modified.status_code == 304
+
+        cells = []
+        for response, count, extra in ((full, queries, None), (not_modified, revalidate_queries, revalidate)):
+            ms = measure(lambda: client.get(url, headers=dict(headers, **(extra or {}))))
+            cells.append(f'{count}q/{len(response.data)}B/{ms:.2f}ms')
+        print(f'{url:<36} {cells[0]:>24} {cells[1]:>24}')
+
+
+if __name__ == '__main__':
+    main()
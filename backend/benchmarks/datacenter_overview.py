@@ -0,0 +1,30 @@
+"""机房总览基准
+
+服务器总数固定，机房数量从3增长到300，观察
+GET /api/datacenters/overview 的查询次数和耗时是否随机房数增长
+（剩余的线性增长来自响应体本身的序列化）。
+"""
+from benchmarks.common import create_bench_app, seed_fleet, measure
+
+TOTAL_SERVERS = 600
+
+
+def main():
+    print(f'{"datacenters":>12} {"servers":>8} {"queries":>8} {"latency(ms)":>12}')
+    for datacenters in (3, 30, 100, 300):
+        app, client, headers, counter = create_bench_app()
+        seed_fleet(datacenters=datacenters, servers_per_dc=TOTAL_SERVERS // datacenters,
+                   containers_per_server=2, services_per_container=1)
+
+        counter.reset()
+        response = client.get('/api/datacenters/overview', headers=headers)
+        assert response.status_code == 200
+        assert len(response.get_json()['data']) == datacenters
+        queries = counter.count
+
+        latency = measure(lambda: client.get('/api/datacenters/overview', headers=headers))
+        print(f'{datacenters:>12} {TOTAL_SERVERS:>8} {queries:>8} {latency:>12.2f}')
+
+
+if __name__ == '__main__':
+    main()
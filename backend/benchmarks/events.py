@@ -0,0 +1,98 @@
+"""变更事件推送基准
+
+10 个机房 × 60 台服务器（每台 3 个容器、1 块 GPU）：
+- 轮询：仪表盘每 5 秒重新验证 /api/servers/tree 与 /api/gpus（304）或完整拉取（200）的单次耗时，
+  换算为 N 个客户端每分钟占用的服务端时间
+- 推送：N 个 SSE 连接（消费线程）在线时，一次 GPU 分配（提交 + 分发）的耗时与全部连接收到事件的延迟(ms)，
+  对比未启用推送时的提交耗时
+"""
+import threading
+import time
+from app.extensions import db
+from app.models import GPU, User
+from app.utils.event_stream import init_event_stream
+from benchmarks.common import create_bench_app, seed_fleet, measure
+
+POLL_INTERVAL = 5
+ENDPOINTS = ('/api/servers/tree?expand_level=2', '/api/gpus?page_size=100')
+
+
+def poll_cost(client, headers):
+    """一次轮询（全部接口）的完整拉取与重新验证耗时(ms)"""
+    full = revalidate = 0.0
+    for url in ENDPOINTS:
+        etag = client.get(url, headers=headers).headers['ETag']
+        full += measure(lambda: client.get(url, headers=headers))
+        revalidate += measure(lambda: client.get(url, headers=dict(headers, **{'If-None-Match': etag})))
+    return full, revalidate
+
+
+def assign(gpu, user_id):
+    """切换分配状态并提交，返回开始提交的时刻"""
+    gpu = db.session.get(GPU, gpu.id)  # 事件中的用户字段需要变更前的值
+    gpu.assigned_to
+    start = time.perf_counter()
+    gpu.assigned_to = None if gpu.assigned_to else user_id
+    db.session.commit()
+    return start
+
+
+def push_cost(app, gpu, user_id, clients):
+    """N 个连接在线时一次分配的提交耗时与全部送达耗时(ms)"""
+    broker = app.extensions['event_broker']
+    subscribers = [broker.subscribe(user_id) for _ in range(clients)]
+    received = threading.Barrier(clients + 1)
+    stop = threading.Event()
+
+    def consume(subscriber):
+        while not stop.is_set():
+            items, _ = subscriber.get(0.05)
+            if items:
+                received.wait()
+
+    threads = [threading.Thread(target=consume, args=(s,), daemon=True) for s in subscribers]
+    for thread in threads:
+        thread.start()
+    commit_ms = deliver_ms = float('inf')
+    for _ in range(5):
+        start = assign(gpu, user_id)
+        commit_ms = min(commit_ms, (time.perf_counter() - start) * 1000)
+        received.wait()
+        deliver_ms = min(deliver_ms, (time.perf_counter() - start) * 1000)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    for subscriber in subscribers:
+        broker.unsubscribe(subscriber)
+    return commit_ms, deliver_ms
+
+
+def main():
+    app, client, headers, _ = create_bench_app()
+    app.extensions.pop('response_cache', None)
+    seed_fleet(datacenters=10, servers_per_dc=60, containers_per_server=3)
+    user_id = User.query.first().id
+    gpu = GPU.query.first()
+
+    full, revalidate = poll_cost(client, headers)
+    print(f'poll every {POLL_INTERVAL}s: full {full:.1f}ms, revalidate {revalidate:.2f}ms per poll')
+
+    app.extensions.pop('event_broker')
+    baseline = float('inf')
+    for _ in range(5):
+        start = assign(gpu, user_id)
+        baseline = min(baseline, (time.perf_counter() - start) * 1000)
+    init_event_stream(app)
+    print(f'GPU assign commit without events: {baseline:.2f}ms')
+
+    print(f'{"clients":>8} {"poll full/min":>14} {"poll 304/min":>13} '
+          f'{"push commit":>12} {"push deliver":>13}')
+    for clients in (10, 100):
+        per_minute = clients * 60 / POLL_INTERVAL
+        commit_ms, deliver_ms = push_cost(app, gpu, user_id, clients)
+        print(f'{clients:>8} {full * per_minute:>12.0f}ms {revalidate * per_minute:>11.0f}ms '
+              f'{commit_ms:>10.2f}ms {deliver_ms:>11.2f}ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""导出基准
+
+Core 批量写入 N 台服务器（每台一个容器、两个端口映射）与 N 条审计日志，
+分别以 xlsx / csv / ndjson 导出容器与审计日志，记录耗时、SQL语句数、响应大小；
+另重复导出一次，用 tracemalloc 记录 Python 堆内存峰值（不计入耗时）。
+"""
+import json
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from app.extensions import db
+from app.models import Datacenter, Environment, Server, Container, PortMapping, User, AuditLog
+from benchmarks.common import create_bench_app
+
+
+def seed(rows):
+    dc = Datacenter(name='bench-dc')
+    db.session.add(dc)
+    db.session.commit()
+    env_id = Environment.query.first().id
+    owner = User.query.first()
+    db.session.execute(Server.__table__.insert(), [
+        {'name': f'srv-{i}', 'datacenter_id': dc.id, 'environment_id': env_id,
+         'internal_ip': f'10.{i // 65536}.{i // 256 % 256}.{i % 256}'}
+        for i in range(1, rows + 1)
+    ])
+    db.session.execute(Container.__table__.insert(), [
+        {'name': f'ct-{i}', 'server_id': i, 'owner_id': owner.id, 'image': 'nginx:latest'}
+        for i in range(1, rows + 1)
+    ])
+    db.session.execute(PortMapping.__table__.insert(), [
+        {'container_id': i, 'container_port': 80 + p, 'internal_port': 20000 + p,
+         'external_ip': '8.8.8.8' if p else None, 'external_port': 30000 + i % 30000 if p else None}
+        for i in range(1, rows + 1) for p in range(2)
+    ])
+    start = datetime(2024, 1, 1)
+    changes = json.dumps({'status': {'old': 'online', 'new': 'offline'}}, ensure_ascii=False)
+    db.session.execute(AuditLog.__table__.insert(), [
+        {'user_id': owner.id, 'username': owner.username, 'action': 'update', 'resource_type': 'server',
+         'resource_id': i, 'resource_name': f'srv-{i}', 'changes': changes, 'ip_address': '10.0.0.1',
+         'created_at': start + timedelta(seconds=i)}
+        for i in range(1, rows + 1)
+    ])
+    db.session.commit()
+
+
+def run_export(client, headers, url):
+    response = client.get(url, headers=headers)
+    size = sum(len(chunk) for chunk in response.response)
+    response.close()
+    return size
+
+
+def main():
+    print(f'{"rows":>7} {"export":>16} {"seconds":>8} {"queries":>8} {"size(KB)":>9} {"peak(MB)":>9}')
+    for rows in (10000, 100000):
+        _, client, headers, counter = create_bench_app()
+        seed(rows)
+        for name, url in (('containers xlsx', '/api/import-export/export?type=containers&format=xlsx'),
+                          ('containers csv', '/api/import-export/export?type=containers&format=csv'),
+                          ('audit xlsx', '/api/audit-logs/export?format=xlsx'),
+                          ('audit csv', '/api/audit-logs/export?format=csv'),
+                          ('audit ndjson', '/api/audit-logs/export?format=ndjson')):
+            counter.reset()
+            start = time.perf_counter()
+            size = run_export(client, headers, url)
+            seconds = time.perf_counter() - start
+            queries = counter.count
+
+            tracemalloc.start()
+            run_export(client, headers, url)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f'{rows:>7} {name:>16} {seconds:>8.2f} {queries:>8} {size / 1024:>9.0f} {peak / 2**20:>9.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""权限检查基准
+
+管理员接口的权限检查：对比不含声明的旧 Token（关闭 / 开启进程内身份缓存）
+与带角色声明的 Token 时，每个请求对 users 表的查询次数与耗时(ms)。
+每个请求前移除会话，与独立请求一致。
+"""
+from sqlalchemy import event
+from app.extensions import db
+from app.models import User
+from app.utils.auth_tokens import issue_tokens
+from app.utils.identity import init_identity_cache
+from benchmarks.common import create_bench_app, seed_fleet, measure
+
+REQUESTS = (
+    ('GET', '/api/metrics/cache', None),
+    ('GET', '/api/users/1/history', None),
+    ('PUT', '/api/datacenters/1', {'description': 'bench'}),
+)
+
+
+def main():
+    app, client, headers, _ = create_bench_app()
+    seed_fleet(datacenters=1, servers_per_dc=5, containers_per_server=1)
+    user_queries = []
+    event.listen(db.engine, 'before_cursor_execute',
+                 lambda conn, cursor, statement, *args: user_queries.append(statement)
+                 if 'FROM users' in statement else None)
+
+    claims = {'Authorization': f'Bearer {issue_tokens(User.query.first())["access_token"]}'}
+
+    def call(method, url, body, auth):
+        db.session.remove()
+        return client.open(url, method=method, headers=auth, json=body)
+
+    print(f'{"request":<32} {"no cache":>16} {"cache":>16} {"claims":>16}')
+    rows = {}
+    for ttl, auth in ((0, headers), (30, headers), (30, claims)):
+        app.config['IDENTITY_CACHE_TTL'] = ttl
+        init_identity_cache(app)
+        for method, url, body in REQUESTS:
+            assert call(method, url, body, auth).status_code == 200
+            user_queries.clear()
+            call(method, url, body, auth)
+            count = len(user_queries)
+            ms = measure(lambda: call(method, url, body, auth), repeat=20)
+            rows.setdefault(f'{method} {url}', []).append(f'{count}q/{ms:.2f}ms')
+    for name, cells in rows.items():
+        print(f'{name:<32} {cells[0]:>16} {cells[1]:>16} {cells[2]:>16}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""登录基准
+
+- 哈希成本：scrypt（werkzeug 默认）与 pbkdf2:sha256 单次校验耗时(ms)
+- 登录高峰：32 个线程同时登录时，在请求线程中计算哈希（LOGIN_HASH_WORKERS=0）
+  与交给有界线程池时的登录吞吐(次/秒)、繁忙拒绝数，以及同时进行的普通请求耗时(ms)
+- 暴力尝试：对同一用户名连续 100 次错误密码，实际进行的哈希次数
+"""
+import statistics
+import threading
+import time
+from werkzeug.security import check_password_hash, generate_password_hash
+from app.utils.login_guard import init_login_guard
+from benchmarks.common import create_bench_app, measure
+
+CONCURRENT_LOGINS = 32
+POOLS = ((0, 0), (2, 16), (2, 64))
+
+
+def hash_cost():
+    for method in ('scrypt', 'pbkdf2:sha256'):
+        pwhash = generate_password_hash('bench123', method)
+        ms = measure(lambda: check_password_hash(pwhash, 'bench123'), repeat=3)
+        print(f'{pwhash.split("$", 1)[0]:<24} verify {ms:.1f}ms')
+
+
+def login_burst(app, client, headers):
+    """并发登录期间主线程持续请求普通接口，返回 (吞吐, 繁忙拒绝数, 普通请求中位耗时)"""
+    statuses = []
+    start_gate = threading.Barrier(CONCURRENT_LOGINS + 1)
+
+    def login(i):
+        c = app.test_client()
+        start_gate.wait()
+        r = c.post('/api/auth/login', json={'username': 'bench_admin', 'password': 'bench123'},
+                   environ_base={'REMOTE_ADDR': f'10.0.0.{i}'})
+        statuses.append(r.status_code)
+
+    threads = [threading.Thread(target=login, args=(i,)) for i in range(CONCURRENT_LOGINS)]
+    for thread in threads:
+        thread.start()
+    start_gate.wait()
+    start = time.perf_counter()
+    latencies = []
+    while any(thread.is_alive() for thread in threads):
+        t = time.perf_counter()
+        client.get('/api/metrics/cache', headers=headers)
+        latencies.append((time.perf_counter() - t) * 1000)
+    elapsed = time.perf_counter() - start
+    for thread in threads:
+        thread.join()
+    return statuses.count(200) / elapsed, statuses.count(503), statistics.median(latencies)
+
+
+def brute_force(client):
+    """被限流的尝试不计算哈希：每个 401 对应一次哈希"""
+    statuses = [client.post('/api/auth/login', json={'username': 'bench_admin', 'password': 'wrong'},
+                            environ_base={'REMOTE_ADDR': '10.1.0.1'}).status_code for _ in range(100)]
+    print(f'100 wrong passwords: {statuses.count(401)} hashed (401), {statuses.count(429)} throttled (429)')
+
+
+def main():
+    app, client, headers, _ = create_bench_app()
+    hash_cost()
+
+    baseline = measure(lambda: client.get('/api/metrics/cache', headers=headers))
+    print(f'\nidle GET /api/metrics/cache: {baseline:.2f}ms')
+    print(f'{"hash pool":<16} {"logins/s":>9} {"503":>5} {"concurrent GET":>15}')
+    app.config.update(LOGIN_RATE_IP_BURST=1000, LOGIN_RATE_USER_BURST=1000)
+    for workers, queue in POOLS:
+        app.config.update(LOGIN_HASH_WORKERS=workers, LOGIN_HASH_QUEUE=queue)
+        init_login_guard(app)
+        rate, busy, latency = login_burst(app, client, headers)
+        label = f'{workers} + {queue} queued' if workers else 'inline'
+        print(f'{label:<16} {rate:>9.1f} {busy:>5} {latency:>13.2f}ms')
+
+    app.config.update(LOGIN_RATE_IP_BURST=20, LOGIN_RATE_USER_BURST=5)
+    init_login_guard(app)
+    print()
+    brute_force(client)
+
+
+if __name__ == '__main__':
+    main()
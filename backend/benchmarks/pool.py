@@ -0,0 +1,124 @@
+"""数据库连接池基准
+
+临时 SQLite 文件库，DBAPI 连接包装为每条语句附加 0.5ms 往返（模拟局域网 MySQL）：
+- 探测开销：每次取连接执行一条查询，对比 pre_ping（每次取连接探测）与只探测空闲连接时
+  每次请求的数据库往返数与耗时(ms)
+- 断线恢复：连接池中的空闲连接全部被服务端关闭后，再执行 20 次请求时失败的请求数与重连数
+- 连接池饱和：pool_size=4、max_overflow=2、pool_timeout=1s，12 个线程各自反复占用连接 20ms，
+  PoolMonitor 统计的等待、溢出与超时
+"""
+import sqlite3
+import tempfile
+import threading
+import time
+from sqlalchemy import create_engine, exc, text
+from app.utils.pool_metrics import InstrumentedQueuePool, PoolMonitor
+from benchmarks.common import measure
+
+RTT = 0.0005
+
+
+class SlowConnection:
+    """每条语句附加一次往返延迟，并统计往返数"""
+
+    round_trips = 0
+
+    def __init__(self, path):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+
+    def cursor(self):
+        conn = self
+
+        class Cursor:
+            def __init__(self):
+                self._cursor = conn._conn.cursor()
+
+            def execute(self, *args):
+                SlowConnection.round_trips += 1
+                time.sleep(RTT)
+                return self._cursor.execute(*args)
+
+            def __getattr__(self, name):
+                return getattr(self._cursor, name)
+
+        return Cursor()
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def make_engine(path, **options):
+    engine = create_engine('sqlite://', creator=lambda: SlowConnection(path),
+                           poolclass=InstrumentedQueuePool, **options)
+    return engine
+
+
+def query(engine):
+    with engine.connect() as conn:
+        conn.execute(text('SELECT 1')).fetchall()
+
+
+def kill_idle(engine):
+    """模拟服务端关闭空闲连接"""
+    for record in list(engine.pool._pool.queue):
+        record.dbapi_connection._conn.close()
+
+
+def main():
+    with tempfile.TemporaryDirectory() as workdir:
+        path = f'{workdir}/pool.db'
+        modes = (('pre_ping', dict(pool_pre_ping=True), 0),
+                 ('idle ping only', dict(pool_pre_ping=False), 0.2),
+                 ('no ping', dict(pool_pre_ping=False), 0))
+
+        print(f'{"mode":<16} {"trips/req":>10} {"ms/req":>8} {"failed after drop":>18} {"reconnects":>11}')
+        for name, options, idle in modes:
+            engine = make_engine(path, pool_size=4, max_overflow=2, **options)
+            monitor = PoolMonitor(engine, ping_idle_seconds=idle)
+            monitor.attach()
+            query(engine)
+            SlowConnection.round_trips = 0
+            ms = measure(lambda: query(engine), repeat=200)
+            trips = SlowConnection.round_trips / 200
+
+            time.sleep(0.3)
+            kill_idle(engine)
+            opened = monitor.opened
+            failed = 0
+            for _ in range(20):
+                try:
+                    query(engine)
+                except exc.DBAPIError as e:
+                    assert e.connection_invalidated
+                    failed += 1
+            print(f'{name:<16} {trips:>10.2f} {ms:>8.2f} {failed:>18} {monitor.opened - opened:>11}')
+            engine.dispose()
+
+        engine = make_engine(path, pool_size=4, max_overflow=2, pool_timeout=1, pool_pre_ping=False)
+        monitor = PoolMonitor(engine)
+        monitor.attach()
+
+        def worker():
+            for _ in range(10):
+                try:
+                    with engine.connect() as conn:
+                        conn.execute(text('SELECT 1'))
+                        time.sleep(0.02)
+                except exc.TimeoutError:
+                    pass
+
+        threads = [threading.Thread(target=worker) for _ in range(12)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats = monitor.stats()
+        print(f'\nsaturation (12 threads, pool 4 + 2 overflow): {stats["checkouts"]} checkouts, '
+              f'{stats["slow_checkouts"]} over {stats["slow_checkout_ms"]}ms, {stats["timeouts"]} timeouts, '
+              f'peak overflow {stats["peak_overflow"]}, checkout p95 {stats["checkout_ms"]["p95"]:.1f}ms '
+              f'max {stats["checkout_ms"]["max"]:.1f}ms')
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
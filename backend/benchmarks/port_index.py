@@ -0,0 +1,81 @@
+"""端口占用索引基准
+
+批量写入端口映射后，对比：
+- 写入前冲突检测：索引查表 vs 按 (IP, 端口, 协议) 查库（internal_port 无索引，需扫描）
+- 全量冲突报告：已构建索引直接报告 / 单遍重建索引 vs GROUP BY ... HAVING COUNT(*) > 1
+"""
+import time
+from flask import current_app
+from app.extensions import db
+from app.models import Datacenter, Environment, Server, Container, PortMapping, User
+from benchmarks.common import create_bench_app, measure
+
+PORTS_PER_SERVER = 50
+
+
+def seed(servers):
+    """通过Core批量插入，每台服务器一个容器、PORTS_PER_SERVER 个映射（含少量重复）"""
+    dc = Datacenter(name='bench-dc')
+    db.session.add(dc)
+    db.session.commit()
+    env_id = Environment.query.first().id
+    owner_id = User.query.first().id
+    db.session.execute(Server.__table__.insert(), [
+        {'name': f'srv-{i}', 'datacenter_id': dc.id, 'environment_id': env_id,
+         'internal_ip': f'10.{i // 65536}.{i // 256 % 256}.{i % 256}'}
+        for i in range(1, servers + 1)
+    ])
+    db.session.execute(Container.__table__.insert(), [
+        {'name': f'ct-{i}', 'server_id': i, 'owner_id': owner_id} for i in range(1, servers + 1)
+    ])
+    db.session.execute(PortMapping.__table__.insert(), [
+        {'container_id': i, 'container_port': 80, 'internal_port': 20000 + (p if i % 100 else p // 2),
+         'protocol': 'tcp'}
+        for i in range(1, servers + 1) for p in range(PORTS_PER_SERVER)
+    ])
+    db.session.commit()
+
+
+def db_conflict_check(server_ip, port):
+    """不使用索引时的写入前检查"""
+    return db.session.query(PortMapping.id).join(Container).join(Server).filter(
+        db.func.coalesce(PortMapping.internal_ip, Server.internal_ip) == server_ip,
+        PortMapping.internal_port == port,
+        PortMapping.protocol == 'tcp',
+    ).first()
+
+
+def db_conflict_report():
+    """不使用索引时的全量冲突报告"""
+    ip = db.func.coalesce(PortMapping.internal_ip, Server.internal_ip)
+    return db.session.query(ip, PortMapping.internal_port, db.func.count()).join(Container).join(
+        Server
+    ).group_by(ip, PortMapping.internal_port, PortMapping.protocol).having(db.func.count() > 1).all()
+
+
+def main():
+    print(f'{"mappings":>9} {"check idx(us)":>14} {"check db(us)":>13} {"report idx(ms)":>15} '
+          f'{"rebuild(ms)":>12} {"report db(ms)":>14} {"free(us)":>9} {"conflicts":>10}')
+    for servers in (200, 2000, 10000):
+        create_bench_app()
+        seed(servers)
+        index = current_app.extensions['port_index']
+
+        start = time.perf_counter()
+        conflicts = index.build()
+        rebuild_ms = (time.perf_counter() - start) * 1000
+        report_idx_ms = measure(index.conflicts, repeat=3)
+        report_db_ms = measure(db_conflict_report, repeat=3)
+
+        ip = f'10.0.{servers // 2 // 256 % 256}.{servers // 2 % 256}'
+        slots = [(ip, 'tcp', 20000 + p) for p in range(0, PORTS_PER_SERVER, 10)]
+        check_idx_us = measure(lambda: index.find_conflicts(slots), repeat=200) * 1000
+        check_db_us = measure(lambda: [db_conflict_check(s[0], s[2]) for s in slots], repeat=5) * 1000
+        free_us = measure(lambda: index.free_ranges(ip, 10, start=20000), repeat=200) * 1000
+
+        print(f'{servers * PORTS_PER_SERVER:>9} {check_idx_us:>14.1f} {check_db_us:>13.1f} {report_idx_ms:>15.1f} '
+              f'{rebuild_ms:>12.1f} {report_db_ms:>14.1f} {free_us:>9.1f} {len(conflicts):>10}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""按时间点还原基准
+
+一台服务器有 N 条更新日志（每分钟一条，交替修改 status 与 cpu_cores），
+分别在无检查点、每 50 条一个检查点时通过 GET /api/servers/<id>?as_of= 还原历史上不同位置的状态，
+记录最小耗时(ms)与回放的日志条数；另记录第一页历史 /api/servers/<id>/history 的耗时。
+"""
+import json
+from datetime import datetime, timedelta
+from app.extensions import db
+from app.models import AuditLog, Datacenter, Environment, ResourceCheckpoint, Server
+from app.utils.resource_history import CHECKPOINT_SKEW
+from benchmarks.common import create_bench_app, measure
+
+INTERVAL = 50
+STATUSES = ('online', 'offline', 'maintenance')
+
+
+def seed(updates):
+    dc = Datacenter(name='bench-dc')
+    db.session.add(dc)
+    db.session.commit()
+    server = Server(name='srv', datacenter_id=dc.id, environment_id=Environment.query.first().id,
+                    internal_ip='10.0.0.1', status=STATUSES[0], cpu_cores=1)
+    db.session.add(server)
+    db.session.commit()
+
+    # 检查点间隔须大于回放窗口，日志时间从足够早的时刻开始
+    start = datetime.utcnow() - timedelta(minutes=updates + 60)
+    rows, states = [], []
+    status, cpu_cores = STATUSES[0], 1
+    for i in range(updates):
+        if i % 2:
+            changes = {'cpu_cores': {'old': cpu_cores, 'new': cpu_cores + 1}}
+            cpu_cores += 1
+        else:
+            new = STATUSES[(STATUSES.index(status) + 1) % len(STATUSES)]
+            changes = {'status': {'old': status, 'new': new}}
+            status = new
+        created_at = start + timedelta(minutes=i + 1)
+        rows.append(AuditLog.build_row(None, 'update', 'server', server.id, 'srv', changes))
+        rows[-1]['created_at'] = created_at
+        states.append((created_at, status, cpu_cores))
+    db.session.execute(AuditLog.__table__.insert(), rows)
+    server.status, server.cpu_cores = status, cpu_cores
+    db.session.commit()
+    return server, start, states
+
+
+def add_checkpoints(server, states):
+    base = server.to_dict(counts={})
+    for key in ('container_count', 'gpu_count'):
+        base.pop(key)
+    rows = []
+    for created_at, status, cpu_cores in states[INTERVAL - 1::INTERVAL]:
+        # 检查点在该日志之后、下一条日志的回放窗口之外写入
+        state = dict(base, status=status, cpu_cores=cpu_cores)
+        rows.append({'resource_type': 'server', 'resource_id': server.id,
+                     'state': json.dumps(state, ensure_ascii=False),
+                     'created_at': created_at + timedelta(seconds=30) - CHECKPOINT_SKEW})
+    db.session.execute(ResourceCheckpoint.__table__.insert(), rows)
+    db.session.commit()
+
+
+def run(client, headers, server, states):
+    results = []
+    for fraction in (0.1, 0.5, 0.9):
+        created_at, status, cpu_cores = states[int(len(states) * fraction)]
+        url = f'/api/servers/{server.id}?as_of={(created_at + timedelta(seconds=1)).isoformat()}'
+        data = client.get(url, headers=headers).get_json()['data']
+        assert (data['status'], data['cpu_cores']) == (status, cpu_cores)
+        results.append((measure(lambda: client.get(url, headers=headers)), data['replayed']))
+    history = measure(lambda: client.get(f'/api/servers/{server.id}/history', headers=headers))
+    return results, history
+
+
+def main():
+    print(f'{"updates":>8} {"checkpoints":>12} {"as_of@10%":>16} {"as_of@50%":>16} '
+          f'{"as_of@90%":>16} {"history":>8}')
+    for updates in (1000, 10000):
+        _, client, headers, _ = create_bench_app()
+        server, _, states = seed(updates)
+        for label in ('none', f'every {INTERVAL}'):
+            if label != 'none':
+                add_checkpoints(server, states)
+            results, history = run(client, headers, server, states)
+            cells = ' '.join(f'{f"{ms:.1f}ms/{replayed}":>16}' for ms, replayed in results)
+            print(f'{updates:>8} {label:>12} {cells} {history:>8.1f}')
+
+
+if __name__ == '__main__':
+    main()
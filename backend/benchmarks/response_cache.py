@@ -0,0 +1,53 @@
+"""响应缓存基准
+
+10 个机房 × 60 台服务器（每台 3 个容器），对仪表盘轮询的接口分别测量
+未启用缓存、缓存命中时的查询次数与耗时(ms)，以及修改一台服务器并提交后再请求的耗时
+（含写入本身；/api/users/options 不依赖 servers 表，写入后仍然命中）。
+"""
+from app.extensions import db
+from app.models import Server
+from app.utils.response_cache import init_response_cache
+from benchmarks.common import create_bench_app, seed_fleet, measure
+
+ENDPOINTS = (
+    '/api/servers/tree?expand_level=2',
+    '/api/datacenters/overview',
+    '/api/environments',
+    '/api/users/options',
+)
+
+
+def main():
+    app, client, headers, counter = create_bench_app()
+    seed_fleet(datacenters=10, servers_per_dc=60, containers_per_server=3)
+    server = Server.query.first()
+
+    def request(url):
+        counter.reset()
+        response = client.get(url, headers=headers)
+        assert response.status_code == 200
+        return counter.count
+
+    print(f'{"endpoint":<36} {"uncached":>16} {"hit":>16} {"after write":>12}')
+    for url in ENDPOINTS:
+        app.config['RESPONSE_CACHE_ENABLED'] = False
+        init_response_cache(app)
+        uncached = (request(url), measure(lambda: client.get(url, headers=headers)))
+
+        app.config['RESPONSE_CACHE_ENABLED'] = True
+        init_response_cache(app)
+        request(url)
+        hit = (request(url), measure(lambda: client.get(url, headers=headers)))
+
+        def write_then_get():
+            server.description = f'{server.description}.'
+            db.session.commit()
+            client.get(url, headers=headers)
+        after_write = measure(write_then_get)
+
+        cells = ' '.join(f'{f"{queries}q/{ms:.2f}ms":>16}' for queries, ms in (uncached, hit))
+        print(f'{url:<36} {cells} {after_write:>10.2f}ms')
+
+
+if __name__ == '__main__':
+    main()
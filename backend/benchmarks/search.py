@@ -0,0 +1,57 @@
+"""智能搜索基准
+
+对比旧的四表 ILIKE '%kw%' 扫描与 search_documents 全文索引检索的耗时。
+"""
+from app.extensions import db
+from app.models import Server, Container, Service
+from app.utils.search_index import search_resources, _backend
+from benchmarks.common import create_bench_app, seed_fleet, measure
+
+KEYWORDS = ['srv-7-12', 'image-2', 'svc-1', 'server 4', 'nomatch-xyz']
+LIMIT = 50
+
+
+def ilike_search(keyword):
+    """旧实现：逐表 ILIKE 扫描"""
+    pattern = f'%{keyword}%'
+    Server.query.filter(db.or_(
+        Server.name.ilike(pattern),
+        Server.responsible_person.ilike(pattern),
+        Server.description.ilike(pattern),
+    )).limit(LIMIT).all()
+    Container.query.filter(db.or_(
+        Container.name.ilike(pattern),
+        Container.image.ilike(pattern),
+        Container.description.ilike(pattern),
+    )).limit(LIMIT).all()
+    Service.query.filter(db.or_(
+        Service.name.ilike(pattern),
+        Service.service_type.ilike(pattern),
+        Service.description.ilike(pattern),
+    )).limit(LIMIT).all()
+
+
+def index_search(keyword):
+    """新实现：全文索引"""
+    for resource_type in ('server', 'container', 'service'):
+        search_resources(keyword, resource_type, LIMIT)
+
+
+def main():
+    create_bench_app()
+    seed_fleet(datacenters=10, servers_per_dc=300, containers_per_server=3,
+               services_per_container=2, gpus_per_server=0)
+    print(f'index backend: {_backend()}, servers: {Server.query.count()}, '
+          f'containers: {Container.query.count()}, services: {Service.query.count()}')
+
+    print(f'{"keyword":>14} {"ilike(ms)":>10} {"index(ms)":>10}')
+    for keyword in KEYWORDS:
+        db.session.expunge_all()
+        ilike_ms = measure(lambda: ilike_search(keyword))
+        db.session.expunge_all()
+        index_ms = measure(lambda: index_search(keyword))
+        print(f'{keyword:>14} {ilike_ms:>10.2f} {index_ms:>10.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+"""生产服务吞吐基准
+
+用临时 SQLite 文件库（3 个机房 × 20 台服务器）分别启动：
+- werkzeug 单进程多线程服务（flask serve --local，即未安装 gunicorn 时的回退）
+- gunicorn 1 个、SERVER_WORKERS 个（本机默认值）与其 2 倍个工作进程，每进程 SERVER_THREADS 线程
+
+16 个客户端线程对列表接口持续请求，输出吞吐(请求/秒)与 p50/p99 延迟(ms)；
+随后在持续请求期间执行 flask reload-server（HUP）与 --upgrade（USR2），统计失败的请求数。
+客户端与服务端运行在同一台机器上，结果用于相对比较。
+"""
+import http.client
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+CLIENTS = 16
+DURATION = 5
+PORT = 5097
+ENDPOINTS = ('/api/servers?page_size=20', '/api/gpus?page_size=20')
+
+
+def _env(workdir):
+    # 显式指定数据库，.env 中的配置不会覆盖已设置的环境变量
+    return dict(os.environ,
+                DATABASE_URL=f'sqlite:///{workdir}/bench.db',
+                FLASK_ENV='production',
+                SERVER_PID_FILE=f'{workdir}/server.pid')
+
+
+def seed(env):
+    """建表并写入测试数据，返回管理员 Token"""
+    os.environ.update(env)
+    # 配置在导入时读取环境变量，因此设置后再导入应用
+    from flask_jwt_extended import create_access_token
+    from app import create_app
+    from app.extensions import db
+    from app.models import User, Environment
+    from benchmarks.common import seed_fleet
+
+    app = create_app('production')
+    with app.app_context():
+        db.create_all()
+        Environment.init_default_environments()
+        admin = User(username='bench_admin', display_name='Bench', role='admin', is_active=True)
+        admin.set_password('bench123')
+        db.session.add(admin)
+        db.session.commit()
+        seed_fleet(datacenters=3, servers_per_dc=20, containers_per_server=3)
+        threads = app.config['SERVER_THREADS']
+        workers = app.config['SERVER_WORKERS']
+        return create_access_token(identity=str(admin.id)), threads, workers
+
+
+def start_server(env, *args):
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'flask', '--app', 'run', 'serve', '--bind', f'127.0.0.1:{PORT}', *args],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', PORT), timeout=1).close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError('服务未能启动')
+
+
+def stop_server(process):
+    process.terminate()
+    process.wait(30)
+
+
+def load(token, duration, during=None):
+    """CLIENTS 个线程持续请求，返回 (请求/秒, p50, p99, 失败数)"""
+    headers = {'Authorization': f'Bearer {token}'}
+    latencies, errors = [], []
+    stop_at = time.monotonic() + duration
+
+    def client(i):
+        url = ENDPOINTS[i % len(ENDPOINTS)]
+        while time.monotonic() < stop_at:
+            start = time.perf_counter()
+            try:
+                conn = http.client.HTTPConnection('127.0.0.1', PORT, timeout=30)
+                conn.request('GET', url, headers=headers)
+                status = conn.getresponse().status
+                conn.close()
+            except OSError as e:
+                errors.append(repr(e))
+                continue
+            if status != 200:
+                errors.append(status)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(CLIENTS)]
+    for thread in threads:
+        thread.start()
+    if during is not None:
+        during()
+    for thread in threads:
+        thread.join()
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99)] if latencies else 0
+    return len(latencies) / duration, statistics.median(latencies or [0]), p99, len(errors)
+
+
+def reload_server(env, *args):
+    time.sleep(1)
+    subprocess.run([sys.executable, '-m', 'flask', '--app', 'run', 'reload-server', *args],
+                   env=env, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def main():
+    with tempfile.TemporaryDirectory() as workdir:
+        env = _env(workdir)
+        token, threads, workers = seed(env)
+
+        profiles = [('werkzeug (--local)', ('--local',))]
+        try:
+            import gunicorn  # noqa: F401
+            profiles += [(f'gunicorn {n} x {threads}', ('--workers', str(n)))
+                         for n in sorted({1, workers, workers * 2})]
+        except ImportError:
+            print('gunicorn 未安装，只测试 werkzeug 服务')
+
+        print(f'{CLIENTS} clients, {DURATION}s per profile')
+        print(f'{"server":<22} {"req/s":>8} {"p50":>9} {"p99":>9} {"errors":>7}')
+        for name, args in profiles:
+            process = start_server(env, *args)
+            try:
+                load(token, 1)  # 预热
+                rate, p50, p99, errors = load(token, DURATION)
+            finally:
+                stop_server(process)
+            print(f'{name:<22} {rate:>8.1f} {p50:>7.1f}ms {p99:>7.1f}ms {errors:>7}')
+
+        if len(profiles) > 1:
+            print()
+            process = start_server(env, '--workers', str(workers))
+            try:
+                for label, args in (('reload (HUP)', ()), ('upgrade (USR2)', ('--upgrade',))):
+                    rate, p50, p99, errors = load(token, DURATION, lambda: reload_server(env, *args))
+                    print(f'{label:<22} {rate:>8.1f} {p50:>7.1f}ms {p99:>7.1f}ms {errors:>7}')
+            finally:
+                try:
+                    process.wait(10)
+                except subprocess.TimeoutExpired:  # 升级未完成，旧主进程仍在运行
+                    stop_server(process)
+                # 升级后主进程已更换：等待新主进程改回原 PID 文件后停止
+                deadline = time.monotonic() + 10
+                while time.monotonic() < deadline:
+                    try:
+                        with open(env['SERVER_PID_FILE']) as f:
+                            os.kill(int(f.read()), signal.SIGTERM)
+                        break
+                    except (FileNotFoundError, ValueError):
+                        time.sleep(0.2)
+                    except ProcessLookupError:
+                        break
+
+
+if __name__ == '__main__':
+    main()
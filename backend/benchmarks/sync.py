@@ -0,0 +1,55 @@
+"""增量同步基准
+
+10 个机房 × 60 台服务器（每台 3 个容器、6 个服务、1 个GPU），对比：
+- 全量同步（GET /api/sync，相当于前端重新加载全部集合）与修改 N 台服务器后的增量同步
+  的查询次数、响应字节数与耗时(ms)
+- 单台服务器更新并提交的耗时，含/不含变更日志写入
+"""
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.extensions import db
+from app.models import Server
+from app.utils.change_journal import _journal_flushed
+from benchmarks.common import create_bench_app, seed_fleet, measure
+
+
+def main():
+    app, client, headers, counter = create_bench_app()
+    seed_fleet(datacenters=10, servers_per_dc=60, containers_per_server=3)
+    servers = Server.query.order_by(Server.id).all()
+
+    def sync(since=None):
+        counter.reset()
+        response = client.get('/api/sync', headers=headers,
+                              query_string={} if since is None else {'since': since})
+        assert response.status_code == 200
+        return response.get_json()['data'], counter.count, len(response.data)
+
+    data, queries, size = sync()
+    cursor = data['next_since']
+    ms = measure(lambda: sync(), repeat=3)
+    print(f'{"sync":<16} {"queries":>8} {"bytes":>10} {"latency(ms)":>12}')
+    print(f'{"full":<16} {queries:>8} {size:>10} {ms:>12.2f}')
+
+    for changed in (0, 1, 10, 100):
+        for server in servers[:changed]:
+            server.description = f'{server.description}.'
+        db.session.commit()
+        data, queries, size = sync(cursor)
+        assert len(data['changes']['server']) == changed
+        ms = measure(lambda: sync(cursor))
+        print(f'{f"{changed} changed":<16} {queries:>8} {size:>10} {ms:>12.2f}')
+        cursor = data['next_since']
+
+    def update_one():
+        servers[0].description = f'{servers[0].description}.'
+        db.session.commit()
+
+    with_journal = measure(update_one, repeat=20)
+    event.remove(Session, 'after_flush', _journal_flushed)
+    without_journal = measure(update_one, repeat=20)
+    print(f'single update: {with_journal:.2f}ms with journal, {without_journal:.2f}ms without')
+
+
+if __name__ == '__main__':
+    main()
@@ -11,14 +11,39 @@ class Config:
     """基础配置"""
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
 
+    # 生产服务（flask serve）：gunicorn gthread 工作进程数（默认 CPU 核数，最多 8）与每进程线程数；
+    # 工作进程处理 SERVER_MAX_REQUESTS 个请求后平滑重启（0 不重启）；PID 文件用于 flask reload-server
+    SERVER_BIND = os.environ.get('SERVER_BIND', '0.0.0.0:5001')
+    SERVER_WORKERS = int(os.environ.get('SERVER_WORKERS', min(os.cpu_count() or 1, 8)))
+    SERVER_THREADS = int(os.environ.get('SERVER_THREADS', 8))
+    SERVER_TIMEOUT = int(os.environ.get('SERVER_TIMEOUT', 60))
+    SERVER_GRACEFUL_TIMEOUT = int(os.environ.get('SERVER_GRACEFUL_TIMEOUT', 30))
+    SERVER_KEEPALIVE = int(os.environ.get('SERVER_KEEPALIVE', 5))
+    SERVER_MAX_REQUESTS = int(os.environ.get('SERVER_MAX_REQUESTS', 10000))
+    SERVER_PID_FILE = os.environ.get('SERVER_PID_FILE', 'server.pid')
+    SERVER_ACCESS_LOG = os.environ.get('SERVER_ACCESS_LOG', 'false').lower() == 'true'
+
     # MySQL数据库配置 - 必须通过环境变量设置
     # 后备值使用SQLite用于本地开发（不含生产凭据）
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         'sqlite:///instance/it_assets_dev.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # 连接池按进程建立：默认大小为每进程线程数（每个请求线程同一时间最多占用一个连接），
+    # 另留后台线程（审计写入等）的溢出余量；数据库总连接数上限约为 SERVER_WORKERS × (DB_POOL_SIZE + DB_MAX_OVERFLOW)。
+    # DB_POOL_PRE_PING 关闭时省去每次取连接的探测往返，只探测空闲超过 DB_POOL_PING_IDLE_SECONDS 秒的连接，
+    # 其余断线由语句报错触发整个连接池重连（当前请求返回 503）
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', SERVER_THREADS))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 2))
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 30))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 300))
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'true').lower() == 'true'
+    DB_POOL_PING_IDLE_SECONDS = int(os.environ.get('DB_POOL_PING_IDLE_SECONDS', 30))
     SQLALCHEMY_ENGINE_OPTIONS = {
-        'pool_pre_ping': True,
-        'pool_recycle': 300,
+        'pool_pre_ping': DB_POOL_PRE_PING,
+        'pool_recycle': DB_POOL_RECYCLE,
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'pool_timeout': DB_POOL_TIMEOUT,
     }
 
     # JWT配置
@@ -29,6 +54,25 @@ class Config:
     JWT_HEADER_NAME = 'Authorization'
     JWT_HEADER_TYPE = 'Bearer'
     JWT_COOKIE_CSRF_PROTECT = False  # 禁用 CSRF 保护，因为只用 headers
+    # 登录保护：密码哈希线程池（0 表示在请求线程中计算）与排队上限；
+    # 令牌桶限流（进程内），来源IP计每次尝试，(用户名, 来源IP) 只计失败的尝试
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt')
+    LOGIN_HASH_WORKERS = int(os.environ.get('LOGIN_HASH_WORKERS', 2))
+    LOGIN_HASH_QUEUE = int(os.environ.get('LOGIN_HASH_QUEUE', 16))
+    LOGIN_HASH_TIMEOUT = float(os.environ.get('LOGIN_HASH_TIMEOUT', 10))
+    LOGIN_RATE_IP_BURST = int(os.environ.get('LOGIN_RATE_IP_BURST', 20))
+    LOGIN_RATE_IP_PER_MINUTE = int(os.environ.get('LOGIN_RATE_IP_PER_MINUTE', 30))
+    LOGIN_RATE_USER_BURST = int(os.environ.get('LOGIN_RATE_USER_BURST', 5))
+    LOGIN_RATE_USER_PER_MINUTE = int(os.environ.get('LOGIN_RATE_USER_PER_MINUTE', 5))
+    # 同一用户名来自所有IP的失败次数上限（曾在该IP登录成功的用户不受限制）
+    LOGIN_RATE_ACCOUNT_BURST = int(os.environ.get('LOGIN_RATE_ACCOUNT_BURST', 50))
+    LOGIN_RATE_ACCOUNT_PER_MINUTE = int(os.environ.get('LOGIN_RATE_ACCOUNT_PER_MINUTE', 20))
+
+    # 反向代理：信任的代理层数（X-Forwarded-For / X-Forwarded-Proto），0 表示直接对外服务
+    PROXY_FIX_X_FOR = int(os.environ.get('PROXY_FIX_X_FOR', 0))
+    PROXY_FIX_X_PROTO = int(os.environ.get('PROXY_FIX_X_PROTO', 0))
+    # Token 吊销：各工作进程确认吊销记录是否变化的间隔（秒），本进程的吊销立即生效
+    JWT_DENYLIST_REFRESH_SECONDS = int(os.environ.get('JWT_DENYLIST_REFRESH_SECONDS', 5))
 
     # CORS配置
     CORS_ORIGINS = ['http://localhost:5173', 'http://127.0.0.1:5173']
@@ -37,6 +81,58 @@ class Config:
     DEFAULT_PAGE_SIZE = 20
     MAX_PAGE_SIZE = 100
 
+    # 自动补全索引配置（进程内，超过条目上限时回退到数据库检索）
+    AUTOCOMPLETE_MAX_ENTRIES = int(os.environ.get('AUTOCOMPLETE_MAX_ENTRIES', 100000))
+    AUTOCOMPLETE_REFRESH_SECONDS = int(os.environ.get('AUTOCOMPLETE_REFRESH_SECONDS', 300))
+
+    # 端口占用索引：重建间隔（秒），用于吸收其他工作进程的写入
+    PORT_INDEX_REFRESH_SECONDS = int(os.environ.get('PORT_INDEX_REFRESH_SECONDS', 60))
+
+    # 用户身份缓存：权限检查使用的角色/启用状态在进程内缓存的秒数（0 关闭），
+    # 修改用户后本进程立即失效，其他工作进程最多延迟该时长
+    IDENTITY_CACHE_TTL = int(os.environ.get('IDENTITY_CACHE_TTL', 30))
+    IDENTITY_CACHE_MAX_ENTRIES = int(os.environ.get('IDENTITY_CACHE_MAX_ENTRIES', 10000))
+
+    # 响应缓存：读多写少接口的响应体，写入提交时按表失效；backend 为 memory 或 redis
+    RESPONSE_CACHE_ENABLED = os.environ.get('RESPONSE_CACHE_ENABLED', 'true').lower() == 'true'
+    RESPONSE_CACHE_BACKEND = os.environ.get('RESPONSE_CACHE_BACKEND', 'memory')
+    RESPONSE_CACHE_REDIS_URL = os.environ.get('RESPONSE_CACHE_REDIS_URL')
+    RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL', 30))
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 1024))
+
+    # 增量同步：单次最多读取的变更日志条数；日志保留天数（flask maintain-audit-logs 清理）
+    SYNC_PAGE_SIZE = int(os.environ.get('SYNC_PAGE_SIZE', 1000))
+    SYNC_JOURNAL_RETENTION_DAYS = int(os.environ.get('SYNC_JOURNAL_RETENTION_DAYS', 30))
+
+    # 变更事件推送（SSE）：backend 为 memory 或 redis；每个连接占用一个线程，连接数按进程限制；
+    # 连接积压超过队列上限时下发 resync；连接保持秒数到期后由客户端自动重连
+    EVENTS_ENABLED = os.environ.get('EVENTS_ENABLED', 'true').lower() == 'true'
+    EVENTS_BACKEND = os.environ.get('EVENTS_BACKEND', 'memory')
+    EVENTS_REDIS_URL = os.environ.get('EVENTS_REDIS_URL')
+    EVENTS_QUEUE_SIZE = int(os.environ.get('EVENTS_QUEUE_SIZE', 256))
+    EVENTS_MAX_SUBSCRIBERS = int(os.environ.get('EVENTS_MAX_SUBSCRIBERS', 100))
+    EVENTS_HEARTBEAT_SECONDS = int(os.environ.get('EVENTS_HEARTBEAT_SECONDS', 15))
+    EVENTS_STREAM_SECONDS = int(os.environ.get('EVENTS_STREAM_SECONDS', 300))
+    # 事件流 Token（POST /api/events/token）的有效期，只在建立连接时校验
+    EVENTS_TOKEN_SECONDS = int(os.environ.get('EVENTS_TOKEN_SECONDS', 60))
+
+    # 审计日志异步写入：后台线程按批写入，队列满时退化为同步写入
+    AUDIT_ASYNC = os.environ.get('AUDIT_ASYNC', 'true').lower() == 'true'
+    AUDIT_BATCH_SIZE = int(os.environ.get('AUDIT_BATCH_SIZE', 200))
+    AUDIT_FLUSH_INTERVAL = float(os.environ.get('AUDIT_FLUSH_INTERVAL', 0.5))
+    AUDIT_QUEUE_SIZE = int(os.environ.get('AUDIT_QUEUE_SIZE', 10000))
+    # 写入失败时按指数退避重试（首次间隔秒数），仍失败的行写入溢出目录（相对路径位于实例目录下），之后自动重新写入
+    AUDIT_WRITE_RETRIES = int(os.environ.get('AUDIT_WRITE_RETRIES', 3))
+    AUDIT_RETRY_BACKOFF = float(os.environ.get('AUDIT_RETRY_BACKOFF', 0.5))
+    AUDIT_SPILL_DIR = os.environ.get('AUDIT_SPILL_DIR', 'audit_spill')
+
+    # 审计日志按月分区与保留期：过期分区归档为 gzip NDJSON 后删除（flask maintain-audit-logs）
+    AUDIT_RETENTION_MONTHS = int(os.environ.get('AUDIT_RETENTION_MONTHS', 12))
+    AUDIT_ARCHIVE_DIR = os.environ.get('AUDIT_ARCHIVE_DIR', 'audit_archive')
+    AUDIT_PARTITIONS_AHEAD = int(os.environ.get('AUDIT_PARTITIONS_AHEAD', 3))
+    # 资源检查点：自上次检查点以来变更达到该条数时保存当前状态，限制按时间点还原的回放条数
+    AUDIT_CHECKPOINT_INTERVAL = int(os.environ.get('AUDIT_CHECKPOINT_INTERVAL', 50))
+
 
 class DevelopmentConfig(Config):
     """开发环境配置"""
@@ -54,6 +150,8 @@ class TestingConfig(Config):
     """测试环境配置"""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    SQLALCHEMY_ENGINE_OPTIONS = {}  # 内存数据库使用单连接的 StaticPool
+    AUDIT_ASYNC = False  # 内存数据库不支持跨线程写入
 
 
 config = {
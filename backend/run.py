@@ -1,6 +1,7 @@
 """Flask应用入口"""
 import os
 import random
+import click
 from app import create_app
 from app.extensions import db
 from app.models import User, Environment, Datacenter, Server, Container, Service, GPU
@@ -58,6 +59,107 @@ def create_admin():
     print(f'管理员 {username} 创建成功!')
 
 
+@app.cli.command('serve', with_appcontext=False)
+@click.option('--bind', default=None, help='监听地址，默认 SERVER_BIND')
+@click.option('--workers', type=int, default=None, help='工作进程数，默认 SERVER_WORKERS')
+@click.option('--local', is_flag=True, help='使用单进程多线程的 werkzeug 服务（不需要 gunicorn）')
+def serve(bind, workers, local):
+    """启动生产服务（gunicorn 多进程，应用在 fork 前加载）"""
+    from app.utils.serving import serve as run_server
+
+    run_server(app, bind=bind, workers=workers, local=local)
+
+
+@app.cli.command('reload-server')
+@click.option('--pid-file', default=None, help='主进程 PID 文件，默认 SERVER_PID_FILE')
+@click.option('--upgrade', is_flag=True, help='加载新代码：启动新主进程后停止旧主进程')
+def reload_server(pid_file, upgrade):
+    """平滑重载运行中的服务"""
+    from app.utils.serving import reload_server as reload
+
+    pid = reload(pid_file=pid_file, upgrade=upgrade)
+    print(f'已通知主进程 {pid} 重载' if not upgrade else f'新主进程 {pid} 已启动，旧主进程正在退出')
+
+
+@app.cli.command('rebuild-search-index')
+def rebuild_search_index():
+    """重建全文搜索索引"""
+    from app.utils.search_index import rebuild_index
+
+    stats = rebuild_index()
+    for resource_type, count in stats.items():
+        print(f'  - {resource_type}: {count} 条')
+    print('搜索索引重建完成!')
+
+
+@app.cli.command('rebuild-ip-index')
+def rebuild_ip_index():
+    """回填IP排序键"""
+    from app.utils.ip_index import rebuild_ip_keys
+
+    stats = rebuild_ip_keys()
+    for table, count in stats.items():
+        print(f'  - {table}: {count} 条')
+    print('IP索引回填完成!')
+
+
+@app.cli.command('maintain-audit-logs')
+@click.option('--retention-months', type=int, default=None, help='保留月数，默认 AUDIT_RETENTION_MONTHS')
+@click.option('--enable-partitioning', is_flag=True, help='把 MySQL 审计日志表转换为按月分区表')
+def maintain_audit_logs(retention_months, enable_partitioning):
+    """审计日志分区维护、过期归档、资源检查点与变更日志清理"""
+    from datetime import datetime, timedelta
+    from app.utils.audit_partitions import maintain, retention_cutoff
+    from app.utils.change_journal import prune_journal
+    from app.utils.resource_history import write_checkpoints, prune_checkpoints
+
+    retention_months = retention_months or app.config['AUDIT_RETENTION_MONTHS']
+    stats = maintain(
+        retention_months=retention_months,
+        archive_dir=app.config['AUDIT_ARCHIVE_DIR'],
+        ahead=app.config['AUDIT_PARTITIONS_AHEAD'],
+        enable=enable_partitioning,
+    )
+    checkpoints = write_checkpoints(app.config['AUDIT_CHECKPOINT_INTERVAL'])
+    pruned = prune_checkpoints(retention_cutoff(retention_months))
+    journal_pruned = prune_journal(
+        datetime.utcnow() - timedelta(days=app.config['SYNC_JOURNAL_RETENTION_DAYS'])
+    )
+    print(f'分区模式: {stats["mode"]}')
+    for name in stats['indexes']:
+        print(f'  - 新建索引: {name}')
+    for name in stats['partitions']:
+        print(f'  - 新建分区: {name}')
+    for name, count in stats['rotated'].items():
+        print(f'  - 移入分区 {name}: {count} 条')
+    for name, archive in stats['archived'].items():
+        print(f'  - 归档 {name}: {archive["rows"]} 条 -> {archive["file"]}')
+    for resource_type, count in checkpoints.items():
+        print(f'  - 检查点 {resource_type}: {count} 个')
+    if pruned:
+        print(f'  - 删除过期检查点: {pruned} 个')
+    if journal_pruned:
+        print(f'  - 删除过期变更日志: {journal_pruned} 条')
+    print('审计日志维护完成!')
+
+
+@app.cli.command('compress-audit-logs')
+@click.option('--batch-size', type=int, default=1000, help='每批处理的行数')
+@click.option('--dry-run', is_flag=True, help='只输出存储统计，不写入')
+def compress_audit_logs(batch_size, dry_run):
+    """压缩已有审计日志的变更内容与快照，并输出存储统计"""
+    from app.utils.audit_compression import compress_audit_logs as compress
+
+    stats = compress(batch_size=batch_size, dry_run=dry_run)
+    for column, item in stats.items():
+        ratio = item['compressed_bytes'] / item['original_bytes'] if item['original_bytes'] else 1
+        print(f'  - {column}: {item["rows"]} 行，已压缩 {item["compressed"]} 行，'
+              f'原文 {item["original_bytes"] / 2**20:.1f} MB，'
+              f'当前 {item["stored_bytes"] / 2**20:.1f} MB，'
+              f'压缩后 {item["compressed_bytes"] / 2**20:.1f} MB ({ratio:.0%})')
+    print('存储统计完成（未写入）' if dry_run else '审计日志压缩完成!')
+
+
 @app.cli.command('generate-data')
 def generate_data():
     """生成示例数据"""
@@ -232,4 +334,4 @@ def generate_data():
 
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5001, debug=True)
+    app.run(host='0.0.0.0', port=5001, debug=app.debug)
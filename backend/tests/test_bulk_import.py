@@ -0,0 +1,47 @@
+"""Excel 批量导入的块级失败测试"""
+from flask.globals import app_ctx
+from app.extensions import db
+from app.models import Server, Environment, User
+from app.utils.bulk_import import import_servers
+from benchmarks.common import create_bench_app, seed_fleet
+
+
+def server_row(name, internal_ip, environment):
+    return (name, 'bench-dc-0', environment, internal_ip)
+
+
+def test_chunk_conflict_rolls_back_only_that_chunk():
+    app, client, headers, counter = create_bench_app()
+    ctx = app_ctx._get_current_object()
+    try:
+        seed_fleet(datacenters=1, servers_per_dc=2, containers_per_server=0)
+        # 模拟数据库层约束：内网IP唯一
+        db.session.execute(db.text('CREATE UNIQUE INDEX ux_servers_internal_ip ON servers (internal_ip)'))
+        db.session.commit()
+        environment = Environment.query.first().name
+
+        rows = [
+            server_row('bench-srv-0-0', '10.9.0.1', environment),  # 行2：覆盖
+            server_row('new-a', '10.9.0.2', environment),          # 行3
+            server_row('new-b', '10.0.0.1', environment),          # 行4：与 bench-srv-0-1 冲突
+            server_row('new-c', '10.9.0.3', environment),          # 行5：与行4同块
+            server_row('new-d', '10.9.0.4', environment),          # 行6
+            server_row('new-e', '10.9.0.5', 'no-such-env'),        # 行7：校验失败
+        ]
+        result = import_servers(rows, User.query.first(), overwrite=True, chunk_size=2)
+        db.session.commit()
+
+        assert result['rows'] == 6
+        assert result['updated'] == 1
+        assert result['created'] == 2
+        assert len(result['errors']) == 2
+        assert result['errors'][0].startswith('行4-5: ')
+        assert result['errors'][1] == '行7: 环境 "no-such-env" 不存在'
+
+        names = {name for name, in db.session.query(Server.name)}
+        assert {'new-a', 'new-d'} <= names
+        assert not names & {'new-b', 'new-c', 'new-e'}
+        assert Server.query.filter_by(name='bench-srv-0-0').one().internal_ip == '10.9.0.1'
+    finally:
+        db.session.remove()
+        ctx.pop()
@@ -0,0 +1,32 @@
+"""服务器树查询次数测试"""
+import pytest
+from flask.globals import app_ctx
+from app.extensions import db
+from benchmarks.common import create_bench_app, seed_fleet
+
+
+def tree_query_count(servers_per_dc):
+    """在给定规模的机群上请求 expand_level=3 的服务器树，返回执行的SQL语句数"""
+    app, client, headers, counter = create_bench_app()
+    ctx = app_ctx._get_current_object()
+    try:
+        seed_fleet(datacenters=2, servers_per_dc=servers_per_dc, containers_per_server=3,
+                   services_per_container=2, gpus_per_server=1)
+        db.session.remove()  # 清空 identity map，按冷请求计数
+        counter.reset()
+        response = client.get('/api/servers/tree?expand_level=3', headers=headers)
+        assert response.status_code == 200
+        servers = response.get_json()['data']
+        assert len(servers) == 2 * servers_per_dc
+        containers = [c for s in servers for c in s['children'] if c['_type'] == 'container']
+        assert len(containers) == 2 * servers_per_dc * 3
+        assert all(len(c['children']) == 2 for c in containers)  # 第三层：服务
+        return counter.count
+    finally:
+        db.session.remove()
+        ctx.pop()
+
+
+@pytest.mark.parametrize('small, large', [(3, 15)])
+def test_tree_query_count_independent_of_fleet_size(small, large):
+    assert tree_query_count(small) == tree_query_count(large)
@@ -24,6 +24,11 @@ export const useAuthStore = defineStore('auth', () => {
     throw new Error(res.message)
   }
 
+  function setToken(accessToken) {
+    token.value = accessToken
+    localStorage.setItem('token', accessToken)
+  }
+
   async function logout() {
     try {
       await authApi.logout()
@@ -54,6 +59,7 @@ export const useAuthStore = defineStore('auth', () => {
     isAdmin,
     login,
     logout,
+    setToken,
     fetchCurrentUser
   }
 })